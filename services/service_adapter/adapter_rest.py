@@ -120,6 +120,8 @@ def apply_loan():
         data = request.get_json()
         client_id = data.get('client_id')
         request_text = data.get('request_text')
+        # Optionnel: "summary" pour ne pas générer les explications crédit détaillées
+        verbosity = data.get('verbosity')
         
         if not client_id or not request_text:
             return jsonify({
@@ -130,7 +132,7 @@ def apply_loan():
         logger.info(f"[Adapter] 📨 LoanApplication({client_id})")
         
         try:
-            soap_response = get_orchestrator_client().service.process_loan_request(client_id, request_text)
+            soap_response = get_orchestrator_client().service.process_loan_request(client_id, request_text, verbosity)
             
             # Récupérer les valeurs de manière sûre
             correlation_id = getattr(soap_response, 'correlation_id', '')
@@ -1,12 +1,24 @@
 # -*- coding: utf-8 -*-
 from spyne import (Application, rpc, ServiceBase, Unicode, Decimal, Boolean, 
-                   ComplexModel, Integer)
+                   ComplexModel, Integer, Array)
 from spyne.protocol.soap import Soap11
 from spyne.server.wsgi import WsgiApplication
 from spyne.model.fault import Fault
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from heapq import heappush, heapreplace
+import csv
 import logging
+import math
+import mmap
+import os
 import re
 import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+import numpy as np
 from zeep import Client as SoapClient
 from zeep.transports import Transport
 from requests.adapters import HTTPAdapter
@@ -54,6 +66,1080 @@ LOCAL_REGION_CACHE = {
 }
 
 
+# Région -> état (code postal USPS): niveau intermédiaire de la chaîne de repli
+REGION_STATES_FILE = os.getenv("APPRAISAL_REGION_STATES", "")
+REGION_STATES = {"boston": "ma", "nyc": "ny", "la": "ca"}
+if REGION_STATES_FILE:
+    with open(REGION_STATES_FILE, encoding="utf-8") as f:
+        REGION_STATES.update({region.lower(): state.lower() for region, state in json.load(f).items()})
+
+
+# ============ INDEX DE MARCHÉ ============
+
+PRICE_PER_M2_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Comparables: k plus proches voisins sur (surface, année, coordonnées si disponibles).
+# Chaque axe est divisé par son échelle: 100 m² ≈ 5 ans ≈ 0,01° (~1 km) en distance.
+KNN_NEIGHBOURS = int(os.getenv("APPRAISAL_KNN_NEIGHBOURS", "8"))
+KNN_SURFACE_SCALE = 100.0
+KNN_YEAR_SCALE = 5.0
+KNN_COORDINATE_SCALE = 0.01
+
+# Statistiques glissantes: demi-vie du poids d'une vente, tranches d'âge du bien (années)
+MARKET_HALF_LIFE_DAYS = float(os.getenv("APPRAISAL_MARKET_HALF_LIFE_DAYS", "90"))
+AGE_BUCKET_LIMITS = (5, 15, 30)
+AGE_BUCKET_LABELS = ("0-5", "6-15", "16-30", "31+")
+# Tendance = prix au m² récent / prix au m² moyen, bornée; ignorée sous 0,5% d'écart
+MARKET_TREND_LIMITS = (0.8, 1.25)
+MARKET_TREND_MIN_CHANGE = 0.005
+
+
+def _quantile(sorted_values, q):
+    """Quantile par interpolation linéaire (même définition que numpy par défaut)"""
+    position = q * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class SortedValues:
+    """
+    Liste triée par blocs: insertion en ~O(√n) (un petit bloc déplacé au lieu de toute
+    la liste), accès par rang pour les quantiles exacts
+    """
+    
+    CHUNK = 1024
+    __slots__ = ("_chunks", "_maxes", "_offsets", "_len")
+    
+    def __init__(self, values=()):
+        ordered = sorted(values)
+        self._chunks = [ordered[i:i + self.CHUNK] for i in range(0, len(ordered), self.CHUNK)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._offsets = None
+        self._len = len(ordered)
+    
+    def add(self, value):
+        self._len += 1
+        self._offsets = None
+        if not self._chunks:
+            self._chunks.append([value])
+            self._maxes.append(value)
+            return
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(value)
+            self._maxes[i] = value
+        else:
+            insort(self._chunks[i], value)
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * self.CHUNK:
+            self._chunks[i:i + 1] = [chunk[:self.CHUNK], chunk[self.CHUNK:]]
+            self._maxes[i:i + 1] = [chunk[self.CHUNK - 1], chunk[-1]]
+    
+    def __len__(self):
+        return self._len
+    
+    def __getitem__(self, rank):
+        if self._offsets is None:
+            self._offsets = list(accumulate(len(chunk) for chunk in self._chunks))
+        i = bisect_right(self._offsets, rank)
+        return self._chunks[i][rank - (self._offsets[i - 1] if i else 0)]
+
+
+def _is_number(value):
+    return type(value) in (int, float)
+
+
+def _validate_sale(sale):
+    price = sale.get("price")
+    surface = sale.get("surface")
+    year = sale.get("year")
+    if not _is_number(price) or price <= 0:
+        raise ValueError(f"Prix de vente invalide: {price!r}")
+    if not _is_number(surface) or surface <= 0:
+        raise ValueError(f"Surface invalide: {surface!r}")
+    if not _is_number(year):
+        raise ValueError(f"Année de construction invalide: {year!r}")
+    for key, limit in (("lat", 90), ("lon", 180)):
+        if key in sale and (not _is_number(sale[key]) or abs(sale[key]) > limit):
+            raise ValueError(f"Coordonnée {key} invalide: {sale[key]!r}")
+    return price, surface, year
+
+
+def _has_coordinates(sale):
+    return "lat" in sale and "lon" in sale
+
+
+def _knn_point(surface, year, lat=None, lon=None):
+    point = [surface / KNN_SURFACE_SCALE, year / KNN_YEAR_SCALE]
+    if lat is not None:
+        point += [lat / KNN_COORDINATE_SCALE, lon / KNN_COORDINATE_SCALE]
+    return point
+
+
+class KDTree:
+    """
+    KD-tree implicite: les points sont permutés de sorte que le nœud [lo, hi) soit coupé
+    en mid = (lo + hi) // 2 sur la dimension split_dims[mid] à la valeur split_values[mid]
+    (gauche [lo, mid), droite [mid, hi)). Aucun objet nœud: l'arbre tient dans trois
+    tableaux contigus.
+    """
+    
+    LEAF_SIZE = 64
+    __slots__ = ("points", "split_dims", "split_values")
+    
+    def __init__(self, points, split_dims, split_values):
+        self.points = points
+        self.split_dims = split_dims
+        self.split_values = split_values
+    
+    @classmethod
+    def build(cls, points):
+        """Construit l'arbre (médianes par argpartition); retourne (arbre, permutation)"""
+        n = len(points)
+        order = np.arange(n)
+        split_dims = np.zeros(n, dtype=np.int8)
+        split_values = np.zeros(n)
+        stack = [(0, n)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= cls.LEAF_SIZE:
+                continue
+            block = points[order[lo:hi]]
+            dim = int(np.argmax(np.ptp(block, axis=0)))
+            mid = (lo + hi) // 2
+            order[lo:hi] = order[lo:hi][np.argpartition(block[:, dim], mid - lo)]
+            split_dims[mid] = dim
+            split_values[mid] = points[order[mid], dim]
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+        return cls(points[order], split_dims, split_values), order
+    
+    def __len__(self):
+        return len(self.points)
+    
+    def nearest(self, query, weights, k):
+        """k plus proches voisins: [(-distance², rang)] en tas (distance pondérée par axe)"""
+        points, split_dims, split_values = self.points, self.split_dims, self.split_values
+        leaf_size = self.LEAF_SIZE
+        query_values, weight_values = query.tolist(), weights.tolist()
+        heap = []
+        worst = math.inf
+        stack = [(0, len(points), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= worst:
+                continue
+            if hi - lo > leaf_size:
+                mid = (lo + hi) // 2
+                dim = split_dims[mid]
+                diff = query_values[dim] - split_values[mid]
+                gap = max(bound, weight_values[dim] * diff * diff)
+                if diff < 0:
+                    stack.append((mid, hi, gap))
+                    stack.append((lo, mid, bound))
+                else:
+                    stack.append((lo, mid, gap))
+                    stack.append((mid, hi, bound))
+                continue
+            distances = ((points[lo:hi] - query) ** 2 * weights).sum(axis=1)
+            for offset in np.flatnonzero(distances < worst).tolist():
+                distance = distances[offset]
+                if distance >= worst:
+                    continue
+                if len(heap) < k:
+                    heappush(heap, (-distance, lo + offset))
+                else:
+                    heapreplace(heap, (-distance, lo + offset))
+                if len(heap) == k:
+                    worst = -heap[0][0]
+        return heap
+
+
+class ComparablesIndex:
+    """
+    Comparables d'une région: KD-tree sur les ventes indexées + tampon des ventes
+    récentes parcouru en force brute (vectorisée). Le tampon est fusionné dans l'arbre
+    dès qu'il dépasse ~8√n ventes: requête en O(log n + √n), jamais un parcours complet.
+    Immuable: chaque ajout publie un nouvel index, les lectures se font sans verrou.
+    """
+    
+    MIN_BUFFER = 256
+    __slots__ = ("dims", "tree", "tree_values", "buffer_points", "buffer_values")
+    
+    def __init__(self, dims, tree=None, tree_values=None, buffer_points=None, buffer_values=None):
+        self.dims = dims
+        self.tree = tree
+        self.tree_values = tree_values
+        self.buffer_points = buffer_points if buffer_points is not None else np.empty((0, dims))
+        self.buffer_values = buffer_values if buffer_values is not None else np.empty(0)
+    
+    def __len__(self):
+        return (len(self.tree) if self.tree is not None else 0) + len(self.buffer_values)
+    
+    def with_sales(self, points, values):
+        """Nouvel index incluant les ventes (points déjà mis à l'échelle, valeurs = prix au m²)"""
+        buffer_points = np.concatenate([self.buffer_points, points])
+        buffer_values = np.concatenate([self.buffer_values, values])
+        indexed = len(self.tree) if self.tree is not None else 0
+        if len(buffer_values) <= max(self.MIN_BUFFER, 8 * math.isqrt(indexed)):
+            return ComparablesIndex(self.dims, self.tree, self.tree_values, buffer_points, buffer_values)
+        if self.tree is not None:
+            buffer_points = np.concatenate([self.tree.points, buffer_points])
+            buffer_values = np.concatenate([self.tree_values, buffer_values])
+        tree, order = KDTree.build(buffer_points)
+        return ComparablesIndex(self.dims, tree, buffer_values[order])
+    
+    def nearest(self, query, weights, k):
+        """Retourne (distances, prix au m²) des k ventes les plus proches, par distance croissante"""
+        distances = []
+        values = []
+        if self.tree is not None:
+            for negative, rank in self.tree.nearest(query, weights, k):
+                distances.append(-negative)
+                values.append(self.tree_values[rank])
+        if len(self.buffer_values):
+            buffer_distances = ((self.buffer_points - query) ** 2 * weights).sum(axis=1)
+            distances = np.concatenate([distances, buffer_distances])
+            values = np.concatenate([values, self.buffer_values])
+        distances = np.asarray(distances, dtype=float)
+        values = np.asarray(values, dtype=float)
+        keep = np.argsort(distances, kind="stable")[:k]
+        return np.sqrt(distances[keep]), values[keep]
+
+
+def _weighted_price_per_m2(distances, prices_per_m2):
+    """Moyenne pondérée par l'inverse de la distance (1 / (1 + d), bornée pour d = 0)"""
+    weights = 1.0 / (1.0 + distances)
+    return float((weights * prices_per_m2).sum() / weights.sum())
+
+
+def _age_buckets(years):
+    """Nombre de ventes par tranche d'âge (même référence 2024 que l'évaluation)"""
+    ages = 2024 - np.round(np.asarray(years, dtype=float))
+    counts = np.bincount(np.searchsorted(AGE_BUCKET_LIMITS, ages), minlength=len(AGE_BUCKET_LABELS))
+    return counts.tolist()
+
+
+class RollingMarketStats:
+    """
+    Statistiques glissantes d'une région, mises à jour par lot en O(taille du lot):
+    - moyenne du prix au m² à décroissance exponentielle (demi-vie half_life_seconds)
+    - esquisse de quantiles du prix au m² (histogramme logarithmique, erreur relative
+      SKETCH_ACCURACY) pondérée de la même façon
+    - nombre de ventes par tranche d'âge du bien
+    Décroissance "vers l'avant": une vente ajoutée à t pèse exp(λ·(t - origine)); le
+    passage du temps ne demande aucun recalcul, les poids sont renormalisés au besoin.
+    """
+    
+    SKETCH_ACCURACY = 0.01
+    _LOG_GAMMA = math.log((1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY))
+    __slots__ = ("_rate", "_origin", "_weight", "_weighted_sum", "_bins", "_count", "_sum", "age_counts")
+    
+    def __init__(self, half_life_seconds, origin):
+        self._rate = math.log(2) / half_life_seconds
+        self._origin = origin
+        self._weight = 0.0
+        self._weighted_sum = 0.0
+        self._bins = {}
+        self._count = 0
+        self._sum = 0.0
+        self.age_counts = [0] * len(AGE_BUCKET_LABELS)
+    
+    def add(self, prices_per_m2, years, now):
+        values = np.asarray(prices_per_m2, dtype=float)
+        if not len(values):
+            return
+        exponent = self._rate * (now - self._origin)
+        if exponent > 50:
+            self._rescale(now)
+            exponent = 0.0
+        weight = math.exp(exponent)
+        total = float(values.sum())
+        self._weight += weight * len(values)
+        self._weighted_sum += weight * total
+        self._count += len(values)
+        self._sum += total
+        keys, counts = np.unique(np.ceil(np.log(values) / self._LOG_GAMMA).astype(np.int64),
+                                 return_counts=True)
+        bins = self._bins
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            bins[key] = bins.get(key, 0.0) + weight * count
+        self.age_counts = [a + b for a, b in zip(self.age_counts, _age_buckets(years))]
+    
+    def _rescale(self, now):
+        factor = math.exp(-self._rate * (now - self._origin))
+        self._origin = now
+        self._weight *= factor
+        self._weighted_sum *= factor
+        self._bins = {key: weight * factor for key, weight in self._bins.items()}
+    
+    def summary(self):
+        """Moyenne et quantiles récents du prix au m², tendance, ventes par tranche d'âge"""
+        if not self._count:
+            return None
+        keys = sorted(self._bins)
+        cumulative = list(accumulate(self._bins[key] for key in keys))
+        gamma = math.exp(self._LOG_GAMMA)
+        quantiles = {}
+        for q in PRICE_PER_M2_QUANTILES:
+            i = min(bisect_left(cumulative, q * cumulative[-1]), len(keys) - 1)
+            quantiles[q] = 2 * gamma ** keys[i] / (gamma + 1)
+        recent = self._weighted_sum / self._weight
+        trend = recent / (self._sum / self._count)
+        if abs(trend - 1) < MARKET_TREND_MIN_CHANGE:
+            trend = 1.0
+        return {
+            "price_per_m2": recent,
+            "quantiles": quantiles,
+            "trend": min(max(trend, MARKET_TREND_LIMITS[0]), MARKET_TREND_LIMITS[1]),
+            "age_counts": list(self.age_counts)
+        }
+
+
+class RegionMarket:
+    """
+    Ventes d'une région et agrégats de marché.
+    Les agrégats (moyennes, médiane, quantiles du prix au m²) sont maintenus à chaque
+    ajout de ventes puis publiés d'un bloc dans stats: la lecture est O(1), sans verrou.
+    Les coordonnées entrent dans la recherche des comparables si toutes les ventes du
+    premier lot en ont; elles sont alors exigées pour les ventes suivantes.
+    Une région chargée depuis un fichier de marché (from_mapped) lit ses ventes dans le
+    mapping; ses agrégats incrémentaux ne sont construits qu'au premier ajout.
+    stats["recent"] reprend les statistiques glissantes (RollingMarketStats).
+    """
+    
+    __slots__ = ("name", "base_price_m2", "generation", "stats", "knn", "rolling",
+                 "_prices", "_prices_per_m2", "_price_sum", "_surface_sum", "_mapped", "_clock")
+    
+    def __init__(self, name, base_price_m2=None, clock=time.time):
+        self.name = name
+        self._clock = clock
+        self.rolling = RollingMarketStats(MARKET_HALF_LIFE_DAYS * 86400, clock())
+        self.base_price_m2 = base_price_m2
+        self.generation = 0
+        self.stats = None
+        self.knn = None
+        self._prices = SortedValues()
+        self._prices_per_m2 = SortedValues()
+        self._price_sum = 0
+        self._surface_sum = 0
+        self._mapped = None
+    
+    @classmethod
+    def from_mapped(cls, name, base_price_m2, records, stats, knn, clock=time.time):
+        market = cls(name, base_price_m2, clock)
+        market.generation = stats["generation"] if stats else 0
+        market.stats = stats
+        market.knn = knn
+        market._mapped = records
+        return market
+    
+    def _materialize(self):
+        """Agrégats incrémentaux depuis les enregistrements mappés (copie privée, une fois)"""
+        records, self._mapped = self._mapped, None
+        prices = records["price"].tolist()
+        self._prices = SortedValues(prices)
+        self._prices_per_m2 = SortedValues(records["price_per_m2"].tolist())
+        self._price_sum = sum(prices)
+        self._surface_sum = float(records["point"][:, 0].sum()) * KNN_SURFACE_SCALE
+        self.rolling.add(records["price_per_m2"], records["point"][:, 1] * KNN_YEAR_SCALE, self._clock())
+    
+    def add(self, sales):
+        """
+        Ajoute des ventes (appelé sous le verrou de MarketIndex); tout le lot est validé
+        avant la première modification: ValueError sans effet de bord
+        """
+        knn = self.knn
+        if knn is None:
+            with_coordinates = bool(sales) and all(_has_coordinates(sale) for sale in sales)
+            knn = ComparablesIndex(4 if with_coordinates else 2)
+        with_coordinates = knn.dims == 4
+        points = []
+        prices = []
+        prices_per_m2 = []
+        years = []
+        for sale in sales:
+            price, surface, year = _validate_sale(sale)
+            years.append(year)
+            if with_coordinates and not _has_coordinates(sale):
+                raise ValueError(f"Coordonnées requises pour la région {self.name}")
+            points.append(_knn_point(surface, year, *((sale["lat"], sale["lon"]) if with_coordinates else ())))
+            prices.append(price)
+            prices_per_m2.append(price / surface)
+        if self._mapped is not None:
+            self._materialize()
+        self._price_sum += sum(prices)
+        self._surface_sum += sum(sale["surface"] for sale in sales)
+        if not len(self._prices):
+            # Chargement initial: un seul tri
+            self._prices = SortedValues(prices)
+            self._prices_per_m2 = SortedValues(prices_per_m2)
+        else:
+            for price, price_per_m2 in zip(prices, prices_per_m2):
+                self._prices.add(price)
+                self._prices_per_m2.add(price_per_m2)
+        if sales:
+            knn = knn.with_sales(np.array(points, dtype=float).reshape(-1, knn.dims),
+                                 np.array(prices_per_m2, dtype=float))
+        self.knn = knn
+        self.rolling.add(prices_per_m2, years, self._clock())
+        self.generation += 1
+        self.stats = self._summarize()
+    
+    def nearest(self, surface, year, k=None, lat=None, lon=None):
+        """(distances, prix au m²) des k ventes les plus proches; coordonnées ignorées si absentes"""
+        knn = self.knn
+        if knn is None or not len(knn):
+            return np.empty(0), np.empty(0)
+        if knn.dims == 4:
+            use_coordinates = lat is not None and lon is not None
+            query = np.array(_knn_point(surface, year, lat or 0.0, lon or 0.0))
+            weights = np.array([1.0, 1.0] + [1.0 if use_coordinates else 0.0] * 2)
+        else:
+            query = np.array(_knn_point(surface, year))
+            weights = np.ones(2)
+        return knn.nearest(query, weights, k or KNN_NEIGHBOURS)
+    
+    def _summarize(self):
+        count = len(self._prices)
+        if not count:
+            return None
+        return {
+            "count": count,
+            "mean_price": self._price_sum / count,
+            "mean_surface": self._surface_sum / count,
+            "median_price": _quantile(self._prices, 0.5),
+            "price_per_m2": {q: _quantile(self._prices_per_m2, q) for q in PRICE_PER_M2_QUANTILES},
+            "recent": self.rolling.summary(),
+            "generation": self.generation
+        }
+
+
+class MarketAggregate:
+    """
+    Agrégat précalculé d'un niveau de repli (état, national) sur le prix au m² de ses
+    régions, pondéré par leur nombre de ventes: médiane moyenne, dispersion interne
+    (écart interquartile relatif) et écart entre régions. Immuable, mis à jour en O(1)
+    par ajout de ventes en retirant puis en ajoutant la contribution de la région.
+    """
+    
+    __slots__ = ("count", "regions", "_median_sum", "_median_square_sum", "_spread_sum")
+    
+    def __init__(self, count=0, regions=0, median_sum=0.0, median_square_sum=0.0, spread_sum=0.0):
+        self.count = count
+        self.regions = regions
+        self._median_sum = median_sum
+        self._median_square_sum = median_square_sum
+        self._spread_sum = spread_sum
+    
+    def with_region(self, old_stats, new_stats):
+        """Nouvel agrégat où la contribution old_stats de la région est remplacée par new_stats"""
+        totals = [self.count, self.regions, self._median_sum, self._median_square_sum, self._spread_sum]
+        for sign, stats in ((-1, old_stats), (1, new_stats)):
+            if stats is None:
+                continue
+            count, quantiles = stats["count"], stats["price_per_m2"]
+            median = quantiles[0.5]
+            for i, value in enumerate((count, 1, count * median, count * median * median,
+                                       count * (quantiles[0.75] - quantiles[0.25]) / median)):
+                totals[i] += sign * value
+        return MarketAggregate(*totals)
+    
+    @property
+    def price_per_m2(self):
+        return self._median_sum / self.count
+    
+    @property
+    def dispersion(self):
+        """Écart interquartile relatif: interne aux régions + entre régions (σ × 1,349)"""
+        mean = self.price_per_m2
+        variance = max(self._median_square_sum / self.count - mean * mean, 0.0)
+        return (self._spread_sum + 1.349 * math.sqrt(variance) * self.count / mean) / self.count
+
+
+class MarketIndex:
+    """
+    Index région -> RegionMarket; les écritures sont sérialisées, les lectures libres.
+    Tient aussi les agrégats des niveaux de repli: ("state", code) via REGION_STATES et
+    ("national", None).
+    """
+    
+    def __init__(self, clock=time.time):
+        self._regions = {}
+        self._aggregates = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._clock = clock
+    
+    def subscribe(self, listener):
+        """listener(région) appelé sous le verrou d'écriture après chaque ajout de ventes"""
+        self._listeners.append(listener)
+    
+    @classmethod
+    def from_regions(cls, regions, clock=time.time):
+        """Construit l'index depuis {région: {"base_price_m2", "comparables"}}"""
+        index = cls(clock)
+        for name, market in regions.items():
+            index.add_sales(name, market.get("comparables", []), market.get("base_price_m2"))
+        return index
+    
+    def add_sales(self, region, sales, base_price_m2=None):
+        """Ajoute des ventes (région créée au besoin); ValueError si une vente est invalide"""
+        region = region.lower()
+        sales = list(sales)
+        with self._lock:
+            market = self._regions.get(region)
+            if market is None:
+                market = RegionMarket(region, base_price_m2, self._clock)
+            elif base_price_m2 is not None:
+                market.base_price_m2 = base_price_m2
+            previous = market.stats
+            market.add(sales)
+            self._regions[region] = market
+            self._update_aggregates(region, previous, market.stats)
+            for listener in self._listeners:
+                listener(region)
+        return market
+    
+    @classmethod
+    def from_file(cls, path, clock=time.time):
+        """Index adossé à un fichier de marché mappé en lecture seule (voir write_market_data)"""
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(data, _MARKET_HEADER, 1)[0]
+        if header["magic"] != MARKET_DATA_MAGIC or header["version"] != MARKET_DATA_VERSION:
+            raise ValueError(f"{path}: fichier de marché inconnu ou de version non supportée")
+        if (header["leaf_size"] != KDTree.LEAF_SIZE
+                or tuple(header["scales"]) != (KNN_SURFACE_SCALE, KNN_YEAR_SCALE, KNN_COORDINATE_SCALE)):
+            raise ValueError(f"{path}: paramètres d'index différents, reconvertir le fichier")
+        region_count, record_count = int(header["region_count"]), int(header["record_count"])
+        records_offset, split_values_offset, split_dims_offset = _market_data_offsets(region_count, record_count)
+        regions = np.frombuffer(data, _MARKET_REGION, region_count, _MARKET_HEADER_SIZE)
+        records = np.frombuffer(data, _MARKET_RECORD, record_count, records_offset)
+        split_values = np.frombuffer(data, "<f8", record_count, split_values_offset)
+        split_dims = np.frombuffer(data, "<i1", record_count, split_dims_offset)
+        
+        index = cls(clock)
+        for region in regions:
+            first, count, dims = int(region["first"]), int(region["count"]), int(region["dims"])
+            name = region["name"].decode("utf-8")
+            base_price_m2 = float(region["base_price_m2"])
+            region_records = records[first:first + count]
+            tree = KDTree(region_records["point"][:, :dims], split_dims[first:first + count],
+                          split_values[first:first + count]) if count else None
+            knn = ComparablesIndex(dims, tree, region_records["price_per_m2"] if count else None)
+            index._regions[name] = RegionMarket.from_mapped(
+                name, None if math.isnan(base_price_m2) else base_price_m2, region_records,
+                _stats_from_row(region["stats"], count), knn, clock)
+            index._update_aggregates(name, None, index._regions[name].stats)
+        return index
+    
+    def _update_aggregates(self, region, old_stats, new_stats):
+        levels = [("national", None)]
+        if region in REGION_STATES:
+            levels.append(("state", REGION_STATES[region]))
+        for level in levels:
+            aggregate = self._aggregates.get(level, MarketAggregate())
+            self._aggregates[level] = aggregate.with_region(old_stats, new_stats)
+    
+    def aggregate(self, level, key=None):
+        """Agrégat du niveau ("state", code) ou ("national", None); None sans vente"""
+        aggregate = self._aggregates.get((level, key))
+        return aggregate if aggregate is not None and aggregate.count else None
+    
+    def get(self, region):
+        return self._regions.get(region.lower())
+    
+    def regions(self):
+        return list(self._regions)
+    
+    def __contains__(self, region):
+        return region.lower() in self._regions
+    
+    def __len__(self):
+        return len(self._regions)
+
+
+# ============ FICHIER DE MARCHÉ (MMAP) ============
+#
+# En-tête (64 o) | table des régions (nom, dims, prix de base, premier enregistrement,
+# nombre, agrégats) | enregistrements de taille fixe (point KNN mis à l'échelle, prix,
+# prix au m²), triés par région puis dans l'ordre du KD-tree | split_values (f8) |
+# split_dims (i1), alignés sur les enregistrements. Tout est little-endian.
+
+MARKET_DATA_FILE = os.getenv("APPRAISAL_MARKET_DATA", "")
+MARKET_DATA_MAGIC = b"SOAMKT01"
+MARKET_DATA_VERSION = 2
+
+_MARKET_HEADER_SIZE = 64
+_MARKET_HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("leaf_size", "<u4"),
+                           ("region_count", "<u8"), ("record_count", "<u8"), ("scales", "<f8", (3,))])
+_MARKET_REGION = np.dtype([("name", "S56"), ("dims", "<u8"), ("base_price_m2", "<f8"),
+                           ("first", "<u8"), ("count", "<u8"), ("stats", "<f8", (13,))])
+_MARKET_RECORD = np.dtype([("point", "<f8", (4,)), ("price", "<f8"), ("price_per_m2", "<f8")])
+
+
+def _market_data_offsets(region_count, record_count):
+    records_offset = _MARKET_HEADER_SIZE + region_count * _MARKET_REGION.itemsize
+    split_values_offset = records_offset + record_count * _MARKET_RECORD.itemsize
+    return records_offset, split_values_offset, split_values_offset + record_count * 8
+
+
+def _stats_from_row(row, count):
+    """
+    Ligne d'agrégats (moyenne prix, moyenne surface, médiane, 5 quantiles du prix au m²,
+    moyenne du prix au m², ventes par tranche d'âge) -> dict stats
+    """
+    if not count:
+        return None
+    values = row.tolist()
+    quantiles = dict(zip(PRICE_PER_M2_QUANTILES, values[3:8]))
+    return {
+        "count": count,
+        "mean_price": values[0],
+        "mean_surface": values[1],
+        "median_price": values[2],
+        "price_per_m2": quantiles,
+        # Ventes du fichier datées du chargement: statistiques récentes = statistiques totales
+        "recent": {"price_per_m2": values[8], "quantiles": dict(quantiles), "trend": 1.0,
+                   "age_counts": [int(v) for v in values[9:]]},
+        "generation": 1
+    }
+
+
+def write_market_data(regions, path):
+    """
+    Écrit {région: {"base_price_m2", "comparables"}} au format mappable (fichier
+    temporaire puis renommage: un service peut garder l'ancien fichier mappé).
+    Retourne (nombre de régions, nombre de ventes).
+    """
+    table = np.zeros(len(regions), dtype=_MARKET_REGION)
+    blocks = []
+    first = 0
+    for row, (name, market) in zip(table, sorted(regions.items())):
+        encoded = name.lower().encode("utf-8")
+        if len(encoded) > _MARKET_REGION["name"].itemsize:
+            raise ValueError(f"Nom de région trop long: {name!r}")
+        sales = list(market.get("comparables", []))
+        for sale in sales:
+            _validate_sale(sale)
+        dims = 4 if sales and all(_has_coordinates(sale) for sale in sales) else 2
+        records = np.zeros(len(sales), dtype=_MARKET_RECORD)
+        split_dims = np.zeros(len(sales), dtype=np.int8)
+        split_values = np.zeros(len(sales))
+        if sales:
+            points = np.array([_knn_point(sale["surface"], sale["year"],
+                                          *((sale["lat"], sale["lon"]) if dims == 4 else ()))
+                               for sale in sales], dtype=float)
+            prices = np.array([sale["price"] for sale in sales], dtype=float)
+            surfaces = np.array([sale["surface"] for sale in sales], dtype=float)
+            tree, order = KDTree.build(points)
+            records["point"][:, :dims] = tree.points
+            records["price"] = prices[order]
+            records["price_per_m2"] = (prices / surfaces)[order]
+            split_dims, split_values = tree.split_dims, tree.split_values
+            row["stats"] = [prices.mean(), surfaces.mean(), np.quantile(prices, 0.5),
+                            *np.quantile(prices / surfaces, PRICE_PER_M2_QUANTILES),
+                            (prices / surfaces).mean(), *_age_buckets([sale["year"] for sale in sales])]
+        base_price_m2 = market.get("base_price_m2")
+        row["name"] = encoded
+        row["dims"] = dims
+        row["base_price_m2"] = math.nan if base_price_m2 is None else base_price_m2
+        row["first"] = first
+        row["count"] = len(sales)
+        blocks.append((records, split_values, split_dims))
+        first += len(sales)
+    
+    header = np.zeros(1, dtype=_MARKET_HEADER)
+    header["magic"] = MARKET_DATA_MAGIC
+    header["version"] = MARKET_DATA_VERSION
+    header["leaf_size"] = KDTree.LEAF_SIZE
+    header["region_count"] = len(regions)
+    header["record_count"] = first
+    header["scales"] = (KNN_SURFACE_SCALE, KNN_YEAR_SCALE, KNN_COORDINATE_SCALE)
+    
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.tobytes().ljust(_MARKET_HEADER_SIZE, b"\0"))
+        f.write(table.tobytes())
+        for section in range(3):
+            for block in blocks:
+                f.write(block[section].tobytes())
+    os.replace(temp_path, path)
+    return len(regions), first
+
+
+def _read_market_source(path):
+    """
+    Source de conversion: .json au format de LOCAL_REGION_CACHE, ou .csv avec les colonnes
+    region, price, surface, year [, lat, lon, base_price_m2]
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    
+    regions = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                sale = {"price": float(row["price"]), "surface": float(row["surface"]),
+                        "year": int(row["year"])}
+                if row.get("lat") and row.get("lon"):
+                    sale["lat"] = float(row["lat"])
+                    sale["lon"] = float(row["lon"])
+                region = regions.setdefault(row["region"].strip().lower(), {"comparables": []})
+                if row.get("base_price_m2"):
+                    region["base_price_m2"] = float(row["base_price_m2"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}, ligne {reader.line_num}: {e}")
+            region["comparables"].append(sale)
+    return regions
+
+
+def convert_market_data(source, destination):
+    """Convertit un fichier CSV/JSON de ventes au format mappable"""
+    return write_market_data(_read_market_source(source), destination)
+
+
+if MARKET_DATA_FILE:
+    MARKET_INDEX = MarketIndex.from_file(MARKET_DATA_FILE)
+    logger.info(f"[Appraisal] Données de marché mappées: {MARKET_DATA_FILE} ({len(MARKET_INDEX)} régions)")
+else:
+    MARKET_INDEX = MarketIndex.from_regions(LOCAL_REGION_CACHE)
+
+
+# ============ NORMALISATION D'ADRESSE ============
+
+REGION_ALIASES_FILE = os.getenv("APPRAISAL_REGION_ALIASES", "")
+
+# Région -> noms usuels, quartiers et préfixes postaux ("021xx" = ZIP 021..)
+REGION_ALIASES = {
+    "boston": ["boston", "back bay", "beacon hill", "south boston", "dorchester", "roxbury",
+               "jamaica plain", "021xx", "022xx"],
+    "nyc": ["nyc", "new york", "new york city", "manhattan", "brooklyn", "queens", "bronx",
+            "staten island", "harlem", "100xx", "101xx", "102xx", "103xx", "104xx", "110xx",
+            "111xx", "112xx", "113xx", "114xx", "116xx"],
+    "la": ["la", "l a", "los angeles", "hollywood", "900xx", "901xx"],
+}
+
+# Alias courts ("la"): seulement en début ou fin de segment, pour ne pas lire "rue de la Paix"
+SHORT_ALIAS_LENGTH = 2
+
+
+def _strip_accents(text):
+    """Minuscules, sans accents"""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    if text.isascii():
+        return text
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+_ADDRESS_TOKEN = re.compile(r"[a-z0-9]+")
+_POSTAL_CODE = re.compile(r"\d{3}(?:\d\d|xx)")
+
+
+def _address_tokens(text):
+    """Tokens d'adresse (texte déjà normalisé): un ZIP 12345 ou un alias 123xx devient '#123'"""
+    return ["#" + token[:3] if len(token) == 5 and _POSTAL_CODE.fullmatch(token) else token
+            for token in _ADDRESS_TOKEN.findall(text)]
+
+
+class AddressNormalizer:
+    """
+    Trie de tokens alias -> région, compilé une fois.
+    match() parcourt l'adresse de gauche à droite et retient la correspondance la plus
+    à droite (la plus longue à position égale): ville, état et ZIP sont en fin d'adresse.
+    Dans la ligne de rue (premier segment commençant par un numéro, suivi d'autres
+    segments), seul un alias terminant le segment compte: "22 Boston Road" n'est pas Boston.
+    """
+    
+    __slots__ = ("_root", "_max_tokens", "size")
+    
+    def __init__(self, aliases):
+        self._root = {}
+        self._max_tokens = 1
+        self.size = 0
+        for region, names in aliases.items():
+            for name in names:
+                tokens = _address_tokens(_strip_accents(name))
+                if not tokens:
+                    continue
+                node = self._root
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                short = len(tokens) == 1 and len(tokens[0]) <= SHORT_ALIAS_LENGTH
+                node[None] = (region.lower(), short)
+                self._max_tokens = max(self._max_tokens, len(tokens))
+                self.size += 1
+    
+    def match(self, address):
+        """Clé de région reconnue dans l'adresse, ou None"""
+        region = None
+        segments = _strip_accents(_safe_to_str(address)).split(",")
+        for position, segment in enumerate(segments):
+            tokens = _address_tokens(segment)
+            last = len(tokens) - 1
+            street_line = position == 0 and len(segments) > 1 and tokens and tokens[0].isdigit()
+            for start in range(len(tokens)):
+                node = self._root
+                for end in range(start, min(start + self._max_tokens, last + 1)):
+                    node = node.get(tokens[end])
+                    if node is None:
+                        break
+                    entry = node.get(None)
+                    if entry is None or (street_line and end != last):
+                        continue
+                    if not entry[1] or start == 0 or end == last:
+                        region = entry[0]
+        return region
+
+
+def load_region_aliases(path=None):
+    """Alias intégrés + nom de chaque région indexée + fichier JSON optionnel {région: [alias]}"""
+    aliases = {region: list(names) for region, names in REGION_ALIASES.items()}
+    for region in MARKET_INDEX.regions():
+        aliases.setdefault(region, []).append(region)
+    path = path or REGION_ALIASES_FILE
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for region, names in json.load(f).items():
+                aliases.setdefault(region, []).extend(names)
+    return aliases
+
+
+ADDRESS_NORMALIZER = AddressNormalizer(load_region_aliases())
+
+# États: code USPS + nom (les codes de 2 lettres suivent la règle des alias courts)
+STATE_NAMES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california",
+    "co": "colorado", "ct": "connecticut", "de": "delaware", "dc": "district of columbia",
+    "fl": "florida", "ga": "georgia", "hi": "hawaii", "id": "idaho", "il": "illinois",
+    "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky", "la": "louisiana",
+    "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+    "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york",
+    "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon",
+    "pa": "pennsylvania", "ri": "rhode island", "sc": "south carolina", "sd": "south dakota",
+    "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia",
+    "wa": "washington", "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+}
+
+STATE_NORMALIZER = AddressNormalizer({code: [code, name] for code, name in STATE_NAMES.items()})
+
+
+# ============ REPLI HIÉRARCHIQUE ET CONFIANCE ============
+
+# Confiance = poids du niveau × n / (n + CONFIDENCE_PRIOR_SALES) / (1 + dispersion du prix au m²);
+# sous APPRAISAL_MIN_CONFIDENCE l'évaluation est renvoyée avec le statut EXPERT_REVIEW
+VALUATION_LEVEL_WEIGHTS = {"city": 1.0, "state": 0.8, "national": 0.6}
+CONFIDENCE_PRIOR_SALES = 2
+MIN_VALUATION_CONFIDENCE = float(os.getenv("APPRAISAL_MIN_CONFIDENCE", "0.5"))
+
+
+def _valuation_confidence(level, count, dispersion):
+    return VALUATION_LEVEL_WEIGHTS[level] * count / (count + CONFIDENCE_PRIOR_SALES) / (1 + dispersion)
+
+
+def _region_dispersion(stats):
+    quantiles = stats["price_per_m2"]
+    return (quantiles[0.75] - quantiles[0.25]) / quantiles[0.5]
+
+
+def _fallback_market(address, city):
+    """(niveau, clé, agrégat) du premier niveau disposant de ventes: état, puis national"""
+    state = REGION_STATES.get(city) or STATE_NORMALIZER.match(address)
+    for level, key in (("state", state), ("national", None)):
+        if level == "state" and state is None:
+            continue
+        aggregate = MARKET_INDEX.aggregate(level, key)
+        if aggregate is not None:
+            return level, key, aggregate
+    return None
+
+
+# ============ BANDES D'INCERTITUDE (MONTE-CARLO) ============
+
+# Tirages vectorisés: prix au m² (bootstrap bayésien des comparables pondérés, ou loi
+# log-normale de la dispersion du niveau de repli) × bruit de surface × bruit du facteur d'âge
+MONTE_CARLO_DRAWS = int(os.getenv("APPRAISAL_MONTE_CARLO_DRAWS", "10000"))
+VALUATION_BAND_LEVEL = float(os.getenv("APPRAISAL_VALUATION_BAND_LEVEL", "0.9"))
+MONTE_CARLO_SURFACE_SD = 0.02
+MONTE_CARLO_AGE_SD = 0.03
+MONTE_CARLO_SEED = 2024
+
+
+def _valuation_band(surface, age_factor, trend=1.0, distances=None, prices_per_m2=None,
+                    price_per_m2=None, dispersion=None, draws=None):
+    """
+    (bas, haut) de l'intervalle VALUATION_BAND_LEVEL de la valeur, en un seul passage numpy.
+    Comparables: chaque tirage repondère les k ventes (poids 1 / (1 + d) × Exp(1)).
+    Repli: prix au m² = price_per_m2 × exp(N(0, dispersion / 1,349)), IQR relatif -> écart-type.
+    Graine fixe: même bien, même intervalle (cohérent avec le cache).
+    """
+    draws = draws or MONTE_CARLO_DRAWS
+    rng = np.random.default_rng(MONTE_CARLO_SEED)
+    if prices_per_m2 is not None:
+        weights = 1.0 / (1.0 + distances)
+        # Un seul produit matriciel: numérateur et dénominateur de la moyenne repondérée
+        totals = (rng.standard_exponential((draws, len(weights)))
+                  @ np.stack([weights * prices_per_m2, weights], axis=1))
+        sampled = totals[:, 0] / totals[:, 1]
+    else:
+        sampled = price_per_m2 * np.exp(rng.standard_normal(draws) * (dispersion / 1.349))
+    # Bruits log-normaux indépendants: un seul tirage d'écart-type combiné
+    noise_sd = math.hypot(MONTE_CARLO_SURFACE_SD, MONTE_CARLO_AGE_SD)
+    values = sampled * np.exp(rng.standard_normal(draws) * noise_sd)
+    tail = int((1 - VALUATION_BAND_LEVEL) / 2 * (draws - 1))
+    values.partition((tail, draws - 1 - tail))
+    scale = surface * trend * age_factor
+    return int(values[tail] * scale), int(values[draws - 1 - tail] * scale)
+
+
+# ============ CACHE DES ÉVALUATIONS ============
+
+VALUATION_CACHE_MAX_ENTRIES = int(os.getenv("APPRAISAL_VALUATION_CACHE_MAX_ENTRIES", "10000"))
+VALUATION_CACHE_TTL_SECONDS = float(os.getenv("APPRAISAL_VALUATION_CACHE_TTL_SECONDS", "3600"))
+
+
+def _valuation_key(address, surface, year, lat, lon, description):
+    """Clé: adresse et description normalisées + attributs qui entrent dans l'évaluation"""
+    return (" ".join(_address_tokens(_strip_accents(address))), surface, year, lat, lon,
+            _risk_text(description).strip())
+
+
+class ValuationCache:
+    """
+    Évaluations récentes, LRU borné à max_entries.
+    Une entrée n'est servie que si elle a moins de ttl_seconds et si sa région désigne
+    toujours le même marché à la même génération; un ajout de ventes purge en plus les
+    entrées de la région (abonnement à MARKET_INDEX).
+    """
+    
+    def __init__(self, max_entries=VALUATION_CACHE_MAX_ENTRIES,
+                 ttl_seconds=VALUATION_CACHE_TTL_SECONDS, clock=time.time):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_region = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evicted = 0
+    
+    def get(self, key, market_index):
+        """Évaluation en cache (dict) ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            region, market, generation, stored_at, result = entry
+            if self._clock() - stored_at > self.ttl_seconds:
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            if market_index.get(region) is not market or market.generation != generation:
+                self._drop(key)
+                self.invalidated += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key, region, market, generation, result):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (region, market, generation, self._clock(), result)
+            self._keys_by_region.setdefault(region, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evicted += 1
+    
+    def invalidate_region(self, region):
+        with self._lock:
+            keys = self._keys_by_region.pop(region, ())
+            for key in keys:
+                del self._entries[key]
+            self.invalidated += len(keys)
+    
+    def _drop(self, key):
+        region = self._entries.pop(key)[0]
+        keys = self._keys_by_region[region]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_region[region]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+VALUATION_CACHE = ValuationCache()
+MARKET_INDEX.subscribe(VALUATION_CACHE.invalidate_region)
+
+
+class MarketStats(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    region = Unicode(min_occurs=1)
+    sales_count = Integer(min_occurs=1)
+    mean_price = Decimal(min_occurs=1)
+    median_price = Decimal(min_occurs=1)
+    mean_surface = Decimal(min_occurs=1)
+    price_per_m2_p10 = Decimal(min_occurs=1)
+    price_per_m2_p25 = Decimal(min_occurs=1)
+    price_per_m2_p50 = Decimal(min_occurs=1)
+    price_per_m2_p75 = Decimal(min_occurs=1)
+    price_per_m2_p90 = Decimal(min_occurs=1)
+    recent_price_per_m2 = Decimal(min_occurs=1)
+    recent_price_per_m2_p10 = Decimal(min_occurs=1)
+    recent_price_per_m2_p50 = Decimal(min_occurs=1)
+    recent_price_per_m2_p90 = Decimal(min_occurs=1)
+    market_trend = Decimal(min_occurs=1)
+    sales_age_0_5 = Integer(min_occurs=1)
+    sales_age_6_15 = Integer(min_occurs=1)
+    sales_age_16_30 = Integer(min_occurs=1)
+    sales_age_31_plus = Integer(min_occurs=1)
+    generation = Integer(min_occurs=1)
+
+
+class SaleRecord(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    price = Decimal(min_occurs=1)
+    surface = Decimal(min_occurs=1)
+    year = Integer(min_occurs=1)
+    latitude = Decimal
+    longitude = Decimal
+
+
+class IngestReport(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    region = Unicode(min_occurs=1)
+    accepted = Integer(min_occurs=1)
+    sales_count = Integer(min_occurs=1)
+    generation = Integer(min_occurs=1)
+    elapsed_seconds = Decimal(min_occurs=1)
+    sales_per_second = Decimal(min_occurs=1)
+
+
 class PropertyEvaluation(ComplexModel):
     __namespace__ = "urn:solvency.verification.service:v1"
     property_address = Unicode(min_occurs=1)
@@ -61,6 +1147,24 @@ class PropertyEvaluation(ComplexModel):
     is_compliant = Boolean(min_occurs=1)
     valuation_reason = Unicode(min_occurs=1)
     evaluation_status = Unicode(min_occurs=1)
+    risk_terms = Array(Unicode)
+    confidence = Decimal
+    valuation_level = Unicode
+    value_low = Decimal
+    value_high = Decimal
+    region = Unicode
+
+
+class ValuationCacheStats(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    entries = Integer(min_occurs=1)
+    hits = Integer(min_occurs=1)
+    misses = Integer(min_occurs=1)
+    hit_rate = Decimal(min_occurs=1)
+    expired = Integer(min_occurs=1)
+    invalidated = Integer(min_occurs=1)
+    evicted = Integer(min_occurs=1)
+    ttl_seconds = Decimal(min_occurs=1)
 
 
 def _safe_to_int(value):
@@ -95,11 +1199,14 @@ class AppraisalService(ServiceBase):
     - Retourne avis d'expert si région inconnue
     """
     
-    @rpc(Unicode, Unicode, Unicode, Decimal, Integer, Integer, _returns=PropertyEvaluation)
+    @rpc(Unicode, Unicode, Unicode, Decimal, Integer, Integer, Decimal, Decimal,
+         _returns=PropertyEvaluation)
     def evaluate_property(ctx, property_address, property_description, client_id, 
-                         loan_amount, property_surface, construction_year):
+                         loan_amount, property_surface, construction_year,
+                         latitude=None, longitude=None):
         """
         Évaluation de propriété - Extraction ville, recherche marché, calcul valeur
+        latitude/longitude (optionnelles): affinent le choix des comparables
         """
         
         try:
@@ -114,26 +1221,18 @@ class AppraisalService(ServiceBase):
             if not addr_str or len(addr_str.strip()) < 3:
                 raise Fault("Property.ValidationError", "Adresse de propriété invalide")
             
-            city = _extract_city_from_address(addr_str)
-            
-            if city.lower() not in LOCAL_REGION_CACHE:
-                logger.warning(f"[Appraisal] ⚠️ Région '{city}' inconnue")
-                raise Fault("Property.RegionNotFound", 
-                           f"La région '{city}' n'est pas dans notre base. Expertise requise.")
-            
-            market = LOCAL_REGION_CACHE[city.lower()]
-            comparables = market.get("comparables", [])
-            
-            if comparables:
-                avg_price = sum(c["price"] for c in comparables) / len(comparables)
-                avg_surface = sum(c["surface"] for c in comparables) / len(comparables)
-            else:
-                avg_price = 400000.0
-                avg_surface = 100.0
+            lat_val = _safe_to_float(latitude) if latitude is not None else None
+            lon_val = _safe_to_float(longitude) if longitude is not None else None
+            description = _safe_to_str(property_description)
+            cache_key = _valuation_key(addr_str, surface_val, year_val, lat_val, lon_val, description)
+            cached = VALUATION_CACHE.get(cache_key, MARKET_INDEX)
+            if cached is not None:
+                logger.info(f"[Appraisal] ✓ Valeur (cache): ${cached['estimated_value']:,}")
+                return PropertyEvaluation(property_address=addr_str, **cached)
             
-            # Ajustements basés sur surface et âge
-            surface_diff = float(surface_val) - avg_surface
-            surface_factor = 1.0 + (surface_diff * 0.005)
+            city = _extract_city_from_address(addr_str)
+            market = MARKET_INDEX.get(city)
+            stats = market.stats if market is not None else None
             
             property_age = 2024 - year_val
             if property_age <= 5:
@@ -145,23 +1244,71 @@ class AppraisalService(ServiceBase):
             else:
                 age_factor = 0.85
             
-            estimated_value = int(avg_price * surface_factor * age_factor)
-            is_compliant = _check_compliance(addr_str, year_val)
+            comparables = 0
+            trend = 1.0
+            level = "city"
+            band = (None, None)
+            if stats is not None:
+                generation = market.generation
+                # Comparables: k ventes les plus proches (surface, année, position),
+                # prix au m² pondéré par la proximité de chaque comparable
+                distances, prices_per_m2 = market.nearest(surface_val, year_val, lat=lat_val, lon=lon_val)
+                comparables = len(prices_per_m2)
+                price_per_m2 = _weighted_price_per_m2(distances, prices_per_m2)
+                estimated_value = int(price_per_m2 * surface_val * age_factor)
+                # Tendance: prix au m² récent (décroissance exponentielle) / prix au m² moyen
+                trend = stats["recent"]["trend"]
+                if trend != 1.0:
+                    estimated_value = int(estimated_value * trend)
+                confidence = _valuation_confidence(level, stats["count"], _region_dispersion(stats))
+                band = _valuation_band(surface_val, age_factor, trend, distances, prices_per_m2)
+            else:
+                # Pas de vente locale: repli sur l'agrégat de l'état, puis national
+                fallback = _fallback_market(addr_str, city)
+                if fallback is not None:
+                    level, key, aggregate = fallback
+                    estimated_value = int(aggregate.price_per_m2 * surface_val * age_factor)
+                    confidence = _valuation_confidence(level, aggregate.count, aggregate.dispersion)
+                    band = _valuation_band(surface_val, age_factor, price_per_m2=aggregate.price_per_m2,
+                                           dispersion=aggregate.dispersion)
+                    logger.info(f"[Appraisal] Région '{city}' sans ventes: repli {level} {key or ''}")
+                elif market is not None:
+                    surface_factor = 1.0 + ((float(surface_val) - 100.0) * 0.005)
+                    estimated_value = int(400000.0 * surface_factor * age_factor)
+                    confidence = 0.0
+                else:
+                    logger.warning(f"[Appraisal] ⚠️ Région '{city}' inconnue")
+                    raise Fault("Property.RegionNotFound", 
+                               f"La région '{city}' n'est pas dans notre base. Expertise requise.")
+            status = "COMPLETED" if confidence >= MIN_VALUATION_CONFIDENCE else "EXPERT_REVIEW"
+            is_compliant, risk_terms = _check_compliance(addr_str, year_val, description)
             
             # Explication humanisée
             reason = _build_appraisal_explanation(
-                estimated_value, city, surface_val, property_age, age_factor, is_compliant
+                estimated_value, city, surface_val, property_age, age_factor, is_compliant,
+                comparables=comparables, risk_terms=risk_terms, trend=trend,
+                level=level, confidence=confidence, band=band
             )
             
-            logger.info(f"[Appraisal] ✓ Valeur: ${estimated_value:,} | {city} | Conforme: {is_compliant}")
+            logger.info(f"[Appraisal] ✓ Valeur: ${estimated_value:,} | {city} | Conforme: {is_compliant} "
+                        f"| Confiance: {confidence:.2f} ({level})")
             
-            return PropertyEvaluation(
-                property_address=addr_str,
-                estimated_value=estimated_value,
-                is_compliant=is_compliant,
-                valuation_reason=reason,
-                evaluation_status="COMPLETED"
-            )
+            result = {
+                "estimated_value": estimated_value,
+                "is_compliant": is_compliant,
+                "valuation_reason": reason,
+                "evaluation_status": status,
+                "risk_terms": risk_terms,
+                "confidence": round(confidence, 4),
+                "valuation_level": level,
+                "value_low": band[0],
+                "value_high": band[1],
+                "region": city
+            }
+            # Les replis (agrégats en O(1)) ne sont pas mis en cache: ils dépendent de toutes les régions
+            if stats is not None:
+                VALUATION_CACHE.put(cache_key, city, market, generation, result)
+            return PropertyEvaluation(property_address=addr_str, **result)
             
         except Fault as f:
             raise
@@ -170,8 +1317,104 @@ class AppraisalService(ServiceBase):
             raise Fault("Server.AppraisalError", f"Évaluation échouée: {str(e)}")
 
 
+class MarketDataService(ServiceBase):
+    """Consultation des agrégats de marché par région"""
+    
+    @rpc(Unicode, _returns=MarketStats)
+    def get_market_stats(ctx, region):
+        logger.info(f"[Appraisal] GetMarketStats({region})")
+        market = MARKET_INDEX.get(_safe_to_str(region))
+        stats = market.stats if market is not None else None
+        if stats is None:
+            raise Fault("Property.RegionNotFound", f"La région '{region}' n'est pas dans notre base.")
+        
+        quantiles = stats["price_per_m2"]
+        recent = stats["recent"]
+        age_counts = recent["age_counts"]
+        return MarketStats(
+            region=market.name,
+            sales_count=stats["count"],
+            mean_price=round(stats["mean_price"], 2),
+            median_price=round(stats["median_price"], 2),
+            mean_surface=round(stats["mean_surface"], 2),
+            price_per_m2_p10=round(quantiles[0.1], 2),
+            price_per_m2_p25=round(quantiles[0.25], 2),
+            price_per_m2_p50=round(quantiles[0.5], 2),
+            price_per_m2_p75=round(quantiles[0.75], 2),
+            price_per_m2_p90=round(quantiles[0.9], 2),
+            recent_price_per_m2=round(recent["price_per_m2"], 2),
+            recent_price_per_m2_p10=round(recent["quantiles"][0.1], 2),
+            recent_price_per_m2_p50=round(recent["quantiles"][0.5], 2),
+            recent_price_per_m2_p90=round(recent["quantiles"][0.9], 2),
+            market_trend=round(recent["trend"], 4),
+            sales_age_0_5=age_counts[0],
+            sales_age_6_15=age_counts[1],
+            sales_age_16_30=age_counts[2],
+            sales_age_31_plus=age_counts[3],
+            generation=stats["generation"]
+        )
+    
+    @rpc(Unicode, Array(SaleRecord), _returns=IngestReport)
+    def ingest_sales(ctx, region, sales):
+        """Ajoute un lot de ventes à une région (créée au besoin); statistiques mises à jour"""
+        region_str = _safe_to_str(region).strip()
+        sales = list(sales or [])
+        logger.info(f"[Appraisal] IngestSales({region_str}) - {len(sales)} vente(s)")
+        if not region_str:
+            raise Fault("Market.ValidationError", "Région manquante")
+        
+        records = []
+        for sale in sales:
+            record = {"price": _safe_to_float(sale.price), "surface": _safe_to_float(sale.surface),
+                      "year": _safe_to_int(sale.year)}
+            if sale.latitude is not None and sale.longitude is not None:
+                record["lat"] = _safe_to_float(sale.latitude)
+                record["lon"] = _safe_to_float(sale.longitude)
+            records.append(record)
+        
+        started = time.perf_counter()
+        try:
+            market = MARKET_INDEX.add_sales(region_str, records)
+        except ValueError as e:
+            raise Fault("Market.ValidationError", str(e))
+        elapsed = time.perf_counter() - started
+        
+        logger.info(f"[Appraisal] ✓ {len(records)} vente(s) ajoutée(s) à {market.name} "
+                    f"en {elapsed * 1000:.1f}ms")
+        return IngestReport(
+            region=market.name,
+            accepted=len(records),
+            sales_count=market.stats["count"] if market.stats is not None else 0,
+            generation=market.generation,
+            elapsed_seconds=round(elapsed, 6),
+            sales_per_second=round(len(records) / elapsed, 1) if elapsed > 0 else 0
+        )
+
+
+class ValuationCacheService(ServiceBase):
+    """Métriques du cache des évaluations"""
+    
+    @rpc(_returns=ValuationCacheStats)
+    def get_valuation_cache_stats(ctx):
+        logger.info("[Appraisal] GetValuationCacheStats")
+        stats = VALUATION_CACHE.stats()
+        return ValuationCacheStats(
+            entries=stats["entries"],
+            hits=stats["hits"],
+            misses=stats["misses"],
+            hit_rate=round(stats["hit_rate"], 4),
+            expired=stats["expired"],
+            invalidated=stats["invalidated"],
+            evicted=stats["evicted"],
+            ttl_seconds=stats["ttl_seconds"]
+        )
+
+
 def _extract_city_from_address(address):
-    """Extrait la ville de l'adresse"""
+    """Extrait la région de l'adresse: alias reconnus, sinon premier mot du dernier segment"""
+    region = ADDRESS_NORMALIZER.match(address)
+    if region is not None:
+        return region
     addr_str = _safe_to_str(address).lower()
     parts = addr_str.split(',')
     if len(parts) >= 1:
@@ -181,29 +1424,125 @@ def _extract_city_from_address(address):
     return "default"
 
 
-def _check_compliance(address, construction_year):
-    """Vérification de conformité"""
+# ============ CONFORMITÉ: LEXIQUE DE RISQUES ============
+
+RISK_LEXICON_FILE = os.getenv("APPRAISAL_RISK_LEXICON", "")
+
+# Termes comparés mot à mot: les formes fléchies utiles sont listées explicitement
+RISK_LEXICON = (
+    "dispute", "disputed", "damage", "damaged", "flood", "flooded", "flooding", "flood zone",
+    "condemned", "fire damage", "asbestos", "lead paint", "mold", "moldy", "termite", "termites",
+    "subsidence", "foreclosure", "structural crack", "structural cracks", "uninhabitable",
+    "squatter", "squatters",
+    "non-conforme", "non-conformes", "dangereux", "dangereuse", "effondrement", "effondré",
+    "interdit", "interdite", "zone rouge", "litige", "endommagé", "endommagée", "inondation",
+    "inondé", "inondée", "inondable", "insalubre", "incendie", "incendié", "amiante",
+    "plomb", "moisissure", "moisissures", "mérule", "affaissement", "saisie immobilière",
+    "arrêté de péril", "squat", "squatté",
+)
+
+
+def _risk_text(text):
+    """Texte comparable au lexique: sans accents, ponctuation réduite à un espace"""
+    return re.sub(r"[^a-z0-9]+", " ", _strip_accents(text))
+
+
+class RiskScanner:
+    """
+    Automate d'Aho-Corasick sur le lexique de risques: un seul passage linéaire sur le
+    texte quel que soit le nombre de termes. Insensible à la casse et aux accents;
+    un terme doit couvrir des mots entiers ("plomb" ne correspond pas à "plomberie").
+    """
+    
+    __slots__ = ("_goto", "_fail", "_outputs", "size")
+    
+    def __init__(self, terms):
+        goto = [{}]
+        outputs = [()]
+        seen = set()
+        for term in terms:
+            key = _risk_text(term).strip()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            state = 0
+            for char in key:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] = ((term, len(key)),)
+        
+        # Liens d'échec en largeur; chaque état hérite des termes de son suffixe
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] += outputs[fail[next_state]]
+        self._goto, self._fail, self._outputs = goto, fail, outputs
+        self.size = len(seen)
+    
+    def scan(self, *texts):
+        """Termes du lexique présents dans les textes, dans l'ordre d'apparition"""
+        text = "\n".join(_risk_text(t) for t in texts)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            if position + 1 < len(text) and text[position + 1] not in " \n":
+                continue
+            for term, length in outputs[state]:
+                start = position - length + 1
+                if start == 0 or text[start - 1] in " \n":
+                    found.setdefault(term, None)
+        return list(found)
+
+
+def load_risk_lexicon(path=None):
+    """Lexique intégré + fichier optionnel (un terme par ligne, # pour commenter)"""
+    terms = list(RISK_LEXICON)
+    path = path or RISK_LEXICON_FILE
+    if path:
+        with open(path, encoding="utf-8") as f:
+            terms.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return terms
+
+
+RISK_SCANNER = RiskScanner(load_risk_lexicon())
+
+
+def _check_compliance(address, construction_year, description=""):
+    """Vérification de conformité: (conforme, termes de risque détectés)"""
     year_int = _safe_to_int(construction_year) if construction_year else 2000
     
     if year_int < 1970:
         logger.warning(f"[Appraisal] ✗ Propriété antérieure à 1970")
-        return False
-    
-    risk_keywords = [
-        "dispute", "damage", "flood", "condemned",
-        "non-conforme", "dangereux", "effondrement", "interdit", "zone rouge"
-    ]
+        return False, []
     
-    text = (_safe_to_str(address) + " " + _safe_to_str(construction_year)).lower()
-    for keyword in risk_keywords:
-        if keyword in text:
-            logger.warning(f"[Appraisal] ✗ Risque détecté: {keyword}")
-            return False
+    risk_terms = RISK_SCANNER.scan(address, description)
+    if risk_terms:
+        logger.warning(f"[Appraisal] ✗ Risque détecté: {', '.join(risk_terms)}")
+        return False, risk_terms
     
-    return True
+    return True, []
 
 
-def _build_appraisal_explanation(value, city, surface, age, age_factor, compliant):
+def _build_appraisal_explanation(value, city, surface, age, age_factor, compliant, comparables=0,
+                                 risk_terms=(), trend=1.0, level="city", confidence=None, band=(None, None)):
     """Construit une explication humanisée de l'évaluation"""
     
     value_str = f"${value:,}"
@@ -232,12 +1571,28 @@ def _build_appraisal_explanation(value, city, surface, age, age_factor, complian
         "✓ La propriété respecte toutes les normes de conformité."
         if compliant else
         "✗ La propriété présente des problèmes de conformité."
+        + (f" Risques: {', '.join(risk_terms)}." if risk_terms else "")
     )
     
+    # Niveau de référence et confiance
+    level_note = {
+        "state": "Référence: prix au m² de l'état (aucune vente locale). ",
+        "national": "Référence: indice national (aucune vente locale ni dans l'état). "
+    }.get(level, "")
+    if confidence is not None:
+        level_note += f"Confiance: {confidence:.0%}" + (
+            " (expertise recommandée). " if confidence < MIN_VALUATION_CONFIDENCE else ". ")
+    
+    band_note = (f" (intervalle {VALUATION_BAND_LEVEL:.0%}: ${band[0]:,} - ${band[1]:,})"
+                 if band[0] is not None else "")
+    
     explanation = (
-        f"Valeur estimée: {value_str}. "
+        f"Valeur estimée: {value_str}{band_note}. "
         f"Région: {city.capitalize()}. "
         f"Surface: {surface_note}. "
+        f"{f'Comparables: {comparables} ventes les plus proches. ' if comparables else ''}"
+        f"{f'Tendance du marché: {(trend - 1) * 100:+.1f}%. ' if trend != 1.0 else ''}"
+        f"{level_note}"
         f"État: {age_desc} ({age_detail}). "
         f"{compliance_text}"
     )
@@ -246,7 +1601,7 @@ def _build_appraisal_explanation(value, city, surface, age, age_factor, complian
 
 
 application = Application(
-    [AppraisalService],
+    [AppraisalService, MarketDataService, ValuationCacheService],
     tns='urn:solvency.verification.appraisal:v1',
     in_protocol=Soap11(validator='lxml'),
     out_protocol=Soap11()
@@ -255,6 +1610,20 @@ application = Application(
 wsgi_application = WsgiApplication(application)
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Service Appraisal (SOAP) et outils de données de marché")
+    subparsers = parser.add_subparsers(dest="command")
+    convert_parser = subparsers.add_parser("convert", help="Convertit des ventes CSV/JSON au format mappable")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    args = parser.parse_args()
+    
+    if args.command == "convert":
+        region_count, sale_count = convert_market_data(args.source, args.destination)
+        print(f"{args.destination}: {region_count} régions, {sale_count} ventes")
+        raise SystemExit(0)
+    
     from wsgiref.simple_server import make_server
     logger.info("[Appraisal] 🚀 Démarrage sur :5005")
     server = make_server('0.0.0.0', 5005, wsgi_application)
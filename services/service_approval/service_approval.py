@@ -1,9 +1,22 @@
 from spyne import (Application, rpc, ServiceBase, Unicode, Decimal, Integer, 
-                   Boolean, ComplexModel)
+                   Boolean, ComplexModel, Array)
 from spyne.protocol.soap import Soap11
 from spyne.server.wsgi import WsgiApplication
 from spyne.model.fault import Fault
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+import hashlib
+import json
 import logging
+import math
+import os
+import threading
+import time
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -44,6 +57,144 @@ class ApprovalDecision(ComplexModel):
     justification = Unicode(min_occurs=1)
     risk_level = Unicode(min_occurs=1)
     simple_explanation = Unicode(min_occurs=1)
+    monthly_payment = Decimal
+    total_interest = Decimal
+    post_loan_dti = Decimal
+
+
+class AmortizationRow(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    month = Integer(min_occurs=1)
+    payment = Decimal(min_occurs=1)
+    interest = Decimal(min_occurs=1)
+    principal = Decimal(min_occurs=1)
+    balance = Decimal(min_occurs=1)
+
+
+class AmortizationSchedule(ComplexModel):
+    """Page [first_month, first_month + len(rows)) du tableau d'amortissement"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    monthly_payment = Decimal(min_occurs=1)
+    total_interest = Decimal(min_occurs=1)
+    total_months = Integer(min_occurs=1)
+    first_month = Integer(min_occurs=1)
+    rows = Array(AmortizationRow)
+
+
+class RulesStatus(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    version = Unicode(min_occurs=1)
+    source = Unicode(min_occurs=1)
+    checksum = Unicode(min_occurs=1)
+    loaded_at = Unicode(min_occurs=1)
+
+
+class RateSheetCell(ComplexModel):
+    """Cellule de la grille: score dans [score_min, score_max], LTV et DTI dans ]min, max]"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    score_min = Integer(min_occurs=1)
+    score_max = Integer(min_occurs=1)
+    ltv_min = Decimal(min_occurs=1)
+    ltv_max = Decimal(min_occurs=1)
+    dti_min = Decimal(min_occurs=1)
+    dti_max = Decimal(min_occurs=1)
+    risk_level = Unicode(min_occurs=1)
+    justification = Unicode(min_occurs=1)
+    rate_min = Decimal(min_occurs=1)
+    rate_max = Decimal(min_occurs=1)
+
+
+class RateSheet(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    version = Unicode(min_occurs=1)
+    base_rate = Decimal(min_occurs=1)
+    min_rate = Decimal(min_occurs=1)
+    max_rate = Decimal(min_occurs=1)
+    cells = Array(RateSheetCell)
+
+
+class WhatIfProfile(ComplexModel):
+    """Profil de base: valeurs des entrées qui ne varient pas dans la grille"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    debt = Decimal
+    late_payments = Integer
+    has_bankruptcy = Boolean
+    monthly_income = Decimal
+    monthly_expenses = Decimal
+    loan_amount = Decimal
+    property_value = Decimal
+    property_compliant = Boolean
+
+
+class WhatIfAxis(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    name = Unicode(min_occurs=1)
+    start = Decimal(min_occurs=1)
+    stop = Decimal(min_occurs=1)
+    steps = Integer(min_occurs=1)
+
+
+class WhatIfOutcome(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    approved = Boolean(min_occurs=1)
+    risk_level = Unicode(min_occurs=1)
+    justification = Unicode(min_occurs=1)
+
+
+class WhatIfGrid(ComplexModel):
+    """Résultats aplatis (ordre C: le dernier axe varie le plus vite)"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    shape = Array(Integer)
+    scores = Array(Integer)
+    is_solvent = Array(Boolean)
+    outcome_codes = Array(Integer)
+    outcomes = Array(WhatIfOutcome)
+    interest_rates = Array(Decimal)
+
+
+class ExposureBucket(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    key = Unicode(min_occurs=1)
+    count = Integer(min_occurs=1)
+    exposure = Decimal(min_occurs=1)
+    weighted_ltv = Decimal(min_occurs=1)
+    cap = Decimal
+
+
+class PortfolioExposure(ComplexModel):
+    """Encours approuvé depuis le démarrage du service"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    count = Integer(min_occurs=1)
+    exposure = Decimal(min_occurs=1)
+    weighted_ltv = Decimal(min_occurs=1)
+    regions = Array(ExposureBucket)
+    risk_levels = Array(ExposureBucket)
+
+
+class LoanBatch(ComplexModel):
+    """Demandes en colonnes (même longueur); property_values_low et loan_durations optionnelles"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    credit_scores = Array(Integer)
+    solvency_statuses = Array(Unicode)
+    property_values = Array(Decimal)
+    loan_amounts = Array(Decimal)
+    property_compliant = Array(Boolean)
+    monthly_incomes = Array(Decimal)
+    monthly_expenses = Array(Decimal)
+    property_values_low = Array(Decimal)
+    loan_durations = Array(Integer)
+
+
+class ApprovalBatch(ComplexModel):
+    """Décisions par ligne; outcome_codes indexe outcomes (risque, justification)"""
+    __namespace__ = "urn:solvency.verification.service:v1"
+    approved = Array(Boolean)
+    outcome_codes = Array(Integer)
+    outcomes = Array(WhatIfOutcome)
+    interest_rates = Array(Decimal)
+    monthly_payments = Array(Decimal)
+    post_loan_dti = Array(Decimal)
+    explanations = Array(Unicode)
 
 
 class ApprovalService(ServiceBase):
@@ -52,18 +203,31 @@ class ApprovalService(ServiceBase):
     Combine solvabilité + évaluation propriété + génère la décision
     """
     
-    BASE_RATE = 3.0
-    
-    @rpc(Integer, Unicode, Decimal, Decimal, Boolean, Decimal, Decimal, 
-         _returns=ApprovalDecision)
+    @rpc(Integer, Unicode, Decimal, Decimal, Boolean, Decimal, Decimal, Boolean, Decimal, Integer, Unicode,
+         Unicode, _returns=ApprovalDecision)
     def approve_loan(ctx, credit_score, solvency_status, property_value, 
-                    loan_amount, property_compliant, monthly_income, monthly_expenses):
+                    loan_amount, property_compliant, monthly_income, monthly_expenses,
+                    include_explanation=None, property_value_low=None, loan_duration=None, region=None,
+                    correlation_id=None):
         """
         Décision d'approbation basée sur :
         1. Score de crédit et solvabilité
         2. LTV (Loan-to-Value ratio)
         3. DTI (Debt-to-Income ratio)
         4. Conformité de la propriété
+        include_explanation=False: simple_explanation vide (non générée); défaut: générée
+        property_value_low (optionnelle): borne basse de l'intervalle d'évaluation, utilisée
+        pour le LTV si elle est inférieure à property_value
+        loan_duration (optionnelle, années): mensualité au taux proposé, puis DTI après prêt
+        (dépenses + mensualité) / revenu, refusé au-delà de max_post_loan_dti
+        Un refus (y compris DTI après prêt ou plafond) porte le taux de son niveau de risque,
+        mensualité recalculée à ce taux
+        region (optionnelle): refusé si l'encours de sa région ou de son niveau de risque
+        dépasserait un plafond de concentration
+        correlation_id (optionnel): la décision est ajoutée au journal des décisions
+        (APPROVAL_DECISIONS_LOG), source du portefeuille du stress test; un prêt approuvé
+        réserve son encours (une seule fois par demande, libéré si la demande est refusée);
+        sans correlation_id, simple cotation: plafonds vérifiés, rien n'est réservé ni journalisé
         """
         logger.info(f"[Approval] ApprovalRequest - Score: {credit_score}")
         
@@ -76,22 +240,83 @@ class ApprovalService(ServiceBase):
             income_val = _safe_to_float(monthly_income)
             expenses_val = _safe_to_float(monthly_expenses)
             compliant_val = _safe_to_bool(property_compliant)
+            if property_value_low is not None and 0 < _safe_to_float(property_value_low) < property_value_val:
+                property_value_val = _safe_to_float(property_value_low)
             
             # Calculs des ratios
             ltv = (loan_amount_val / property_value_val * 100) if property_value_val > 0 else 100
             dti = (expenses_val / income_val * 100) if income_val > 0 else 100
             
+            # Une seule version des règles pour toute la décision (rechargement concurrent)
+            rules = _RULES
             approved, risk_level, justification = _make_decision(
-                credit_score_val, solvency_str, ltv, dti, compliant_val
+                credit_score_val, solvency_str, ltv, dti, compliant_val, rules
             )
             
             interest_rate = _calculate_interest_rate(
-                credit_score_val, risk_level, ltv, dti
+                credit_score_val, risk_level, ltv, dti, rules
             )
             
-            simple_explanation = _generate_explanation(
-                approved, credit_score_val, risk_level, ltv, dti, compliant_val, justification
-            )
+            # Accessibilité: mensualité du prêt ajoutée aux dépenses courantes
+            monthly_payment = total_interest = post_loan_dti = None
+            duration_val = _safe_to_int(loan_duration) if loan_duration is not None else 0
+            has_term = duration_val > 0 and loan_amount_val > 0
+            if has_term:
+                monthly_payment, total_interest = amortization_terms(loan_amount_val, interest_rate, duration_val)
+                post_loan_dti = _post_loan_dti(expenses_val, income_val, monthly_payment)
+                if approved and post_loan_dti > rules.max_post_loan_dti:
+                    approved, risk_level, justification = rules.reject_post_loan_dti
+            
+            if approved:
+                region_key = _region_key(region)
+                caps = (rules.max_region_exposure.get(region_key, rules.max_region_exposure.get("*")),
+                        rules.max_risk_exposure.get(risk_level, rules.max_risk_exposure.get("*")))
+                if correlation_id:
+                    # Réservé <=> journalisé ci-dessous (DECISIONS_LOG), même condition
+                    exceeded = EXPOSURE_BOOK.book(correlation_id, region_key, risk_level,
+                                                  loan_amount_val, ltv, *caps)
+                else:
+                    exceeded = EXPOSURE_BOOK.check(region_key, risk_level, loan_amount_val, *caps)
+                if exceeded == "region":
+                    approved, risk_level, justification = rules.reject_region_exposure
+                elif exceeded == "risk_level":
+                    approved, risk_level, justification = rules.reject_risk_exposure
+            if not approved and correlation_id:
+                EXPOSURE_BOOK.release(correlation_id)
+            
+            # Refus tardifs (DTI après prêt, plafonds): taux du niveau de risque final, comme
+            # pour les autres refus, et mensualité recalculée à ce taux
+            final_rate = _calculate_interest_rate(credit_score_val, risk_level, ltv, dti, rules)
+            if final_rate != interest_rate:
+                interest_rate = final_rate
+                if has_term:
+                    monthly_payment, total_interest = amortization_terms(
+                        loan_amount_val, interest_rate, duration_val)
+                    post_loan_dti = _post_loan_dti(expenses_val, income_val, monthly_payment)
+            
+            simple_explanation = ""
+            if include_explanation is None or _safe_to_bool(include_explanation):
+                simple_explanation = _generate_explanation(
+                    approved, credit_score_val, risk_level, ltv, dti, compliant_val, justification, rules
+                )
+            
+            if correlation_id:
+                DECISIONS_LOG.append({
+                    "correlation_id": str(correlation_id),
+                    "decided_at": datetime.utcnow().isoformat(),
+                    "approved": approved,
+                    "risk_level": risk_level,
+                    "loan_amount": loan_amount_val,
+                    "loan_duration": duration_val,
+                    "property_value": property_value_val,
+                    "region": _region_key(region),
+                    "property_compliant": compliant_val,
+                    "credit_score": credit_score_val,
+                    "monthly_income": income_val,
+                    "monthly_expenses": expenses_val,
+                    "interest_rate": interest_rate,
+                    "ltv": round(ltv, 4)
+                })
             
             decision_text = "✅ APPROUVÉE" if approved else "❌ REJETÉE"
             logger.info(f"[Approval] Décision: {decision_text} | Taux: {interest_rate}% | Risque: {risk_level}")
@@ -102,106 +327,1297 @@ class ApprovalService(ServiceBase):
                 interest_rate=interest_rate,
                 justification=justification,
                 risk_level=risk_level,
-                simple_explanation=simple_explanation
+                simple_explanation=simple_explanation,
+                monthly_payment=round(monthly_payment, 2) if monthly_payment is not None else None,
+                total_interest=round(total_interest, 2) if total_interest is not None else None,
+                post_loan_dti=round(post_loan_dti, 2) if post_loan_dti is not None else None
             )
             
         except Exception as e:
             logger.error(f"[Approval] Erreur: {str(e)}", exc_info=True)
             raise Fault("Server.ApprovalError", f"Erreur de décision: {str(e)}")
+    
+    @rpc(WhatIfProfile, Array(WhatIfAxis), _returns=WhatIfGrid)
+    def what_if_grid(ctx, profile, axes):
+        """
+        Analyse de sensibilité: score -> solvabilité -> décision -> taux sur la grille
+        cartésienne des axes (debt, late_payments, monthly_income, monthly_expenses,
+        loan_amount, property_value), en une passe vectorisée.
+        Mêmes résultats que compute_credit_score / decide_solvency / approve_loan point par point.
+        """
+        axes = axes or []
+        logger.info(f"[Approval] WhatIfGrid({', '.join(f'{a.name}×{a.steps}' for a in axes)})")
+        
+        try:
+            grid_axes = _grid_axes(axes)
+        except ValueError as e:
+            raise Fault("WhatIf.ValidationError", str(e))
+        
+        base = {
+            "debt": _safe_to_float(profile.debt) if profile else 0.0,
+            "late_payments": _safe_to_int(profile.late_payments) if profile else 0,
+            "monthly_income": _safe_to_float(profile.monthly_income) if profile else 0.0,
+            "monthly_expenses": _safe_to_float(profile.monthly_expenses) if profile else 0.0,
+            "loan_amount": _safe_to_float(profile.loan_amount) if profile else 0.0,
+            "property_value": _safe_to_float(profile.property_value) if profile else 0.0
+        }
+        has_bankruptcy = _safe_to_bool(profile.has_bankruptcy) if profile else False
+        compliant = _safe_to_bool(profile.property_compliant) if profile else False
+        
+        try:
+            result = what_if_grid(base, grid_axes, has_bankruptcy, compliant)
+            rules = result["rules"]
+            logger.info(f"[Approval] ✓ Grille {result['scores'].size} points | "
+                        f"{int(result['approved'].sum())} approuvés")
+            return WhatIfGrid(
+                shape=list(result["scores"].shape),
+                scores=result["scores"].ravel().tolist(),
+                is_solvent=result["is_solvent"].ravel().tolist(),
+                outcome_codes=result["outcome_codes"].ravel().tolist(),
+                outcomes=[WhatIfOutcome(approved=a, risk_level=r, justification=j)
+                          for a, r, j in rules.outcomes],
+                interest_rates=result["interest_rates"].ravel().tolist()
+            )
+        except Exception as e:
+            logger.error(f"[Approval] Erreur grille: {str(e)}", exc_info=True)
+            raise Fault("Server.ApprovalError", f"Erreur de calcul de la grille: {str(e)}")
+    
+    @rpc(LoanBatch, Boolean, _returns=ApprovalBatch)
+    def approve_loans_batch(ctx, batch, include_explanations=None):
+        """
+        approve_loan sur un lot en colonnes (re-décision nocturne), en une passe vectorisée.
+        include_explanations=True: explications générées (sinon non calculées)
+        """
+        columns = {name: getattr(batch, name, None) or [] if batch else []
+                   for name in ("credit_scores", "solvency_statuses", "property_values", "loan_amounts",
+                                "property_compliant", "monthly_incomes", "monthly_expenses")}
+        optional = {name: getattr(batch, name, None) if batch else None
+                    for name in ("property_values_low", "loan_durations")}
+        rows = len(columns["credit_scores"])
+        logger.info(f"[Approval] ApprovalBatch - {rows} demandes")
+        
+        lengths = {len(values) for values in [*columns.values(), *(v for v in optional.values() if v)]}
+        if lengths != {rows}:
+            raise Fault("Batch.ValidationError", "Colonnes de longueurs différentes")
+        if not 0 < rows <= APPROVAL_BATCH_MAX_ROWS:
+            raise Fault("Batch.ValidationError", f"Entre 1 et {APPROVAL_BATCH_MAX_ROWS} demandes attendues")
+        
+        try:
+            result = approve_loans_batch(
+                [_safe_to_int(v) for v in columns["credit_scores"]],
+                [str(v) if v else "not_solvent" for v in columns["solvency_statuses"]],
+                [_safe_to_float(v) for v in columns["property_values"]],
+                [_safe_to_float(v) for v in columns["loan_amounts"]],
+                [_safe_to_bool(v) for v in columns["property_compliant"]],
+                [_safe_to_float(v) for v in columns["monthly_incomes"]],
+                [_safe_to_float(v) for v in columns["monthly_expenses"]],
+                [_safe_to_float(v) for v in optional["property_values_low"]] if optional["property_values_low"] else None,
+                [_safe_to_int(v) for v in optional["loan_durations"]] if optional["loan_durations"] else None
+            )
+            logger.info(f"[Approval] ✓ Lot: {int(result['approved'].sum())}/{rows} approuvés")
+            
+            def rounded(key):
+                if key not in result:
+                    return None
+                return [round(v, 2) if v == v else None for v in result[key].tolist()]
+            
+            return ApprovalBatch(
+                approved=result["approved"].tolist(),
+                outcome_codes=result["outcome_codes"].tolist(),
+                outcomes=[WhatIfOutcome(approved=a, risk_level=r, justification=j)
+                          for a, r, j in result["outcomes"]],
+                interest_rates=result["interest_rates"].tolist(),
+                monthly_payments=rounded("monthly_payments"),
+                post_loan_dti=rounded("post_loan_dti"),
+                explanations=_batch_explanations(result) if _safe_to_bool(include_explanations) else None
+            )
+        except Exception as e:
+            logger.error(f"[Approval] Erreur lot: {str(e)}", exc_info=True)
+            raise Fault("Server.ApprovalError", f"Erreur de décision par lot: {str(e)}")
+
+
+class ExposureService(ServiceBase):
+    """Concentration du portefeuille approuvé (agrégats tenus à jour, lus sans parcours des prêts)"""
+    
+    @rpc(Unicode, Unicode, _returns=PortfolioExposure)
+    def get_portfolio_exposure(ctx, region=None, risk_level=None):
+        """Toutes les régions et tous les niveaux, ou seulement la région / le niveau demandés"""
+        rules = _RULES
+        logger.info(f"[Approval] PortfolioExposure(région={region or '*'}, risque={risk_level or '*'})")
+        by_risk = EXPOSURE_BOOK.snapshot("risk_level")
+        count = sum(c for c, _, _ in by_risk.values())
+        exposure = sum(e for _, e, _ in by_risk.values())
+        ltv_exposure = sum(e * l for _, e, l in by_risk.values())
+        
+        def buckets(dimension, key, caps, normalize):
+            snapshot = (EXPOSURE_BOOK.snapshot(dimension, normalize(key)) if key is not None
+                        else EXPOSURE_BOOK.snapshot(dimension))
+            return [ExposureBucket(key=k, count=c, exposure=round(e, 2), weighted_ltv=round(l, 2),
+                                   cap=caps.get(k, caps.get("*")))
+                    for k, (c, e, l) in sorted(snapshot.items())]
+        
+        return PortfolioExposure(
+            count=count,
+            exposure=round(exposure, 2),
+            weighted_ltv=round(ltv_exposure / exposure, 2) if exposure else 0.0,
+            regions=buckets("region", region, rules.max_region_exposure, _region_key),
+            risk_levels=buckets("risk_level", risk_level, rules.max_risk_exposure, str)
+        )
+
+
+class RulesAdminService(ServiceBase):
+    """Rechargement à chaud des règles de décision (seuils, paliers LTV/DTI, primes de risque)"""
+    
+    @rpc(_returns=RulesStatus)
+    def reload_rules(ctx):
+        logger.info(f"[Approval] ReloadRules({RULES_FILE or 'défaut'})")
+        try:
+            rules = reload_rules()
+        except FileNotFoundError as e:
+            raise Fault("Rules.FileNotFound", str(e))
+        except ValueError as e:
+            logger.error(f"[Approval] ✗ Règles refusées: {str(e)}")
+            raise Fault("Rules.ValidationError", str(e))
+        return _rules_status(rules)
+    
+    @rpc(_returns=RulesStatus)
+    def get_rules_status(ctx):
+        return _rules_status(_RULES)
+
+
+class AmortizationService(ServiceBase):
+    """Tableau d'amortissement d'un prêt, consulté par pages"""
+    
+    @rpc(Decimal, Decimal, Integer, Integer, Integer, _returns=AmortizationSchedule)
+    def get_amortization_schedule(ctx, loan_amount, interest_rate, loan_duration,
+                                  first_month=None, months=None):
+        """Mois first_month (défaut 1) à first_month + months - 1 (au plus AMORTIZATION_PAGE_MAX)"""
+        loan_val = _safe_to_float(loan_amount)
+        rate_val = _safe_to_float(interest_rate)
+        duration_val = _safe_to_int(loan_duration)
+        logger.info(f"[Approval] AmortizationSchedule - {loan_val:.0f} à {rate_val}% sur {duration_val} ans")
+        if loan_val <= 0 or rate_val < 0 or not 0 < duration_val <= 40:
+            raise Fault("Amortization.ValidationError",
+                        "Montant > 0, taux >= 0 et durée entre 1 et 40 ans attendus")
+        
+        first = max(1, _safe_to_int(first_month) if first_month is not None else 1)
+        count = min(AMORTIZATION_PAGE_MAX, _safe_to_int(months) if months is not None else AMORTIZATION_PAGE_MAX)
+        payment, total_interest = amortization_terms(loan_val, rate_val, duration_val)
+        rows = []
+        if count > 0:
+            # Une seule tranche, limitée à la page demandée
+            for chunk in amortization_schedule(loan_val, rate_val, duration_val, first, chunk_months=count):
+                rows = [AmortizationRow(month=m, payment=round(p, 2), interest=round(i, 2),
+                                        principal=round(c, 2), balance=round(b, 2))
+                        for m, p, i, c, b in zip(*(chunk[key].tolist() for key in
+                                                   ("month", "payment", "interest", "principal", "balance")))]
+                break
+        return AmortizationSchedule(
+            monthly_payment=round(payment, 2),
+            total_interest=round(total_interest, 2),
+            total_months=duration_val * 12,
+            first_month=first,
+            rows=rows
+        )
 
 
-def _make_decision(credit_score, solvency_status, ltv, dti, property_compliant):
-    """Logique de décision avec seuils"""
+class PricingService(ServiceBase):
+    """Grille de tarification publiée (précalculée au chargement des règles)"""
+    
+    @rpc(_returns=RateSheet)
+    def get_rate_sheet(ctx):
+        rules = _RULES
+        logger.info(f"[Approval] RateSheet({rules.version}) - {len(rules.rate_sheet)} cellules")
+        return RateSheet(
+            version=rules.version,
+            base_rate=rules.base_rate,
+            min_rate=rules.min_rate,
+            max_rate=rules.max_rate,
+            cells=[RateSheetCell(**dict(cell, rate_min=round(cell["rate_min"], 4),
+                                        rate_max=round(cell["rate_max"], 4)))
+                   for cell in rules.rate_sheet]
+        )
+
+
+def _rules_status(rules):
+    return RulesStatus(
+        version=rules.version,
+        source=rules.source,
+        checksum=rules.checksum,
+        loaded_at=rules.loaded_at.isoformat()
+    )
+
+
+# ============ RÈGLES DE DÉCISION ============
+
+# Fichier partagé avec le service Business (chaque service ne lit que ses sections);
+# vide = règles par défaut ci-dessous
+RULES_FILE = os.getenv("DECISION_RULES_FILE", "")
+
+DEFAULT_RULES = {
+    "version": "défaut",
+    # Sections du service Business, utilisées ici par what_if_grid
+    "scoring": {"base": 1000, "debt_weight": 0.1, "late_payment_penalty": 50,
+                "bankruptcy_penalty": 200},
+    "solvency": {"min_score": 700, "min_monthly_savings": 0},
+    "approval": {
+        # Refus, évalués dans l'ordre: conformité, score, solvabilité, LTV, DTI
+        "min_score": 600,
+        "max_ltv": 95,
+        "max_dti": 50,
+        # (dépenses + mensualité du prêt) / revenu, vérifié quand la durée est connue;
+        # les dépenses incluent le coût de la vie, d'où un plafond plus haut que max_dti
+        "max_post_loan_dti": 90,
+        # Plafonds d'encours approuvé (montants): par région (nombre, ou {"*": défaut, région: plafond})
+        # et par niveau de risque ({niveau: plafond}); null = sans plafond
+        "concentration": {"max_region_exposure": None, "max_risk_exposure": {}},
+        # Paliers d'approbation: le premier satisfait s'applique
+        "tiers": [
+            {"min_score": 800, "max_ltv": 80, "max_dti": 35,
+             "risk_level": "FAIBLE", "justification": "Profil excellent"},
+            {"min_score": 700, "max_ltv": 85, "max_dti": 40,
+             "risk_level": "MOYEN", "justification": "Profil satisfaisant"},
+            {"min_score": 650, "max_ltv": 90, "max_dti": 45,
+             "risk_level": "MOYEN_ÉLEVÉ", "justification": "Profil acceptable"}
+        ],
+        "fallback": {"risk_level": "ÉLEVÉ",
+                     "justification": "Profil limité - approbation conditionnelle"}
+    },
+    "pricing": {
+        "base_rate": 3.0,
+        "min_rate": 2.5,
+        "max_rate": 8.0,
+        "risk_premiums": {
+            "FAIBLE": 0.0,
+            "MOYEN": 0.75,
+            "MOYEN_ÉLEVÉ": 1.5,
+            "ÉLEVÉ": 2.5,
+            "TRÈS_ÉLEVÉ": 4.0
+        },
+        # Ajustements par tranche de 100 points autour d'un pivot
+        # (score: symétrique; LTV/DTI: uniquement au-dessus du pivot)
+        "score_adjustment": {"pivot": 800, "per_100": 0.3},
+        "ltv_adjustment": {"pivot": 80, "per_100": 0.2},
+        "dti_adjustment": {"pivot": 40, "per_100": 0.15}
+    }
+}
+
+MAX_SCORE = 1000
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what}: nombre attendu ({value!r})")
+    return value
+
+
+def _score_threshold(value, what):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= MAX_SCORE:
+        raise ValueError(f"{what}: score entier entre 0 et {MAX_SCORE} attendu ({value!r})")
+    return value
+
+
+def _adjustment(pricing, name):
+    adjustment = pricing[name]
+    return (_number(adjustment.get("pivot"), f"pricing.{name}.pivot"),
+            _number(adjustment.get("per_100"), f"pricing.{name}.per_100"))
+
+
+def _exposure_caps(value, what, normalize):
+    """Plafonds: None -> aucun; nombre -> tous ("*"); dict {clé normalisée ou "*": plafond}"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        value = {"*": value}
+    return {(key if key == "*" else normalize(str(key).strip())): _number(cap, f"{what}.{key}")
+            for key, cap in value.items() if cap is not None}
+
+
+class DecisionRules:
+    """
+    Règles compilées (immuables), évaluées en temps constant:
+    - score -> table des paliers (1001 entrées)
+    - LTV / DTI -> indice par recherche dichotomique sur les seuils distincts
+    - table[LTV][DTI] -> premier palier d'approbation satisfait, précalculé
+      pour toutes les combinaisons (et sa version numpy tier_codes pour what_if_grid)
+    Une nouvelle instance remplace l'ancienne d'un bloc lors d'un rechargement.
+    """
+    
+    def __init__(self, spec, source="défaut", checksum="-"):
+        self.version = str(spec.get("version", "sans version"))
+        self.source = source
+        self.checksum = checksum
+        self.loaded_at = datetime.utcnow()
+        
+        scoring = spec["scoring"]
+        self.score_base = _number(scoring.get("base"), "scoring.base")
+        self.debt_weight = _number(scoring.get("debt_weight"), "scoring.debt_weight")
+        self.late_payment_penalty = _number(scoring.get("late_payment_penalty"),
+                                            "scoring.late_payment_penalty")
+        self.bankruptcy_penalty = _number(scoring.get("bankruptcy_penalty"),
+                                          "scoring.bankruptcy_penalty")
+        
+        approval = spec["approval"]
+        self.min_score = _score_threshold(approval.get("min_score"), "approval.min_score")
+        self.max_ltv = _number(approval.get("max_ltv"), "approval.max_ltv")
+        self.max_dti = _number(approval.get("max_dti"), "approval.max_dti")
+        self.reject_compliance = (False, "TRÈS_ÉLEVÉ", "La propriété ne respecte pas les normes de conformité")
+        self.reject_score = (False, "TRÈS_ÉLEVÉ", "Score de crédit insuffisant")
+        self.reject_solvency = (False, "ÉLEVÉ", "Profil de solvabilité insuffisant")
+        self.reject_ltv = (False, "ÉLEVÉ", f"Ratio LTV trop élevé (> {self.max_ltv:g}%)")
+        self.reject_dti = (False, "MOYEN", f"Ratio DTI trop élevé (> {self.max_dti:g}%)")
+        self.max_post_loan_dti = _number(approval.get("max_post_loan_dti", 90), "approval.max_post_loan_dti")
+        self.reject_post_loan_dti = (False, "ÉLEVÉ",
+                                     f"Mensualité trop lourde: DTI après prêt > {self.max_post_loan_dti:g}%")
+        concentration = approval.get("concentration") or {}
+        self.max_region_exposure = _exposure_caps(concentration.get("max_region_exposure"),
+                                                  "approval.concentration.max_region_exposure", str.lower)
+        self.max_risk_exposure = _exposure_caps(concentration.get("max_risk_exposure"),
+                                                "approval.concentration.max_risk_exposure", str)
+        self.reject_region_exposure = (False, "ÉLEVÉ", "Plafond d'exposition de la région atteint")
+        self.reject_risk_exposure = (False, "ÉLEVÉ", "Plafond d'exposition du niveau de risque atteint")
+        
+        tiers = approval["tiers"]
+        if not isinstance(tiers, list):
+            raise ValueError("approval.tiers: liste attendue")
+        tier_rules = []
+        for i, tier in enumerate(tiers):
+            tier_rules.append((
+                _score_threshold(tier.get("min_score"), f"approval.tiers[{i}].min_score"),
+                _number(tier.get("max_ltv"), f"approval.tiers[{i}].max_ltv"),
+                _number(tier.get("max_dti"), f"approval.tiers[{i}].max_dti"),
+                (True, str(tier["risk_level"]), str(tier["justification"]))
+            ))
+        fallback = approval["fallback"]
+        fallback = (True, str(fallback["risk_level"]), str(fallback["justification"]))
+        
+        # Issues possibles, numérotées (codes de what_if_grid): refus puis paliers puis défaut
+        rejections = (self.reject_compliance, self.reject_score, self.reject_solvency,
+                      self.reject_ltv, self.reject_dti)
+        self.outcomes = (*rejections, *(t[3] for t in tier_rules), fallback)
+        fallback_code = len(self.outcomes) - 1
+        
+        score_steps = sorted({t[0] for t in tier_rules})
+        self.ltv_steps = sorted({t[1] for t in tier_rules})
+        self.dti_steps = sorted({t[2] for t in tier_rules})
+        # Palier LTV j <=> ltv_steps[j-1] < ltv <= ltv_steps[j] (bisect_left), idem DTI;
+        # table[j][k] = code du premier palier satisfait pour un score donné
+        tables = {}
+        for score in sorted({0, *score_steps}):
+            tables[score] = [
+                [next((len(rejections) + i for i, (min_score, max_ltv, max_dti, _) in enumerate(tier_rules)
+                       if score >= min_score
+                       and j <= self.ltv_steps.index(max_ltv)
+                       and k <= self.dti_steps.index(max_dti)), fallback_code)
+                 for k in range(len(self.dti_steps) + 1)]
+                for j in range(len(self.ltv_steps) + 1)
+            ]
+        codes_by_score = [tables[max(step for step in tables if step <= score)]
+                          for score in range(MAX_SCORE + 1)]
+        # Score -> table des issues (tuples partagés entre scores d'un même palier)
+        shared = {step: tuple(tuple(self.outcomes[code] for code in row) for row in table)
+                  for step, table in tables.items()}
+        self.tiers_by_score = tuple(
+            shared[max(step for step in tables if step <= score)] for score in range(MAX_SCORE + 1)
+        )
+        # Version numpy [score, palier LTV, palier DTI] -> code, pour le calcul vectorisé
+        self.tier_codes = np.array(codes_by_score, dtype=np.int64)
+        
+        solvency = spec["solvency"]
+        self.solvency_min_score = _score_threshold(solvency.get("min_score"), "solvency.min_score")
+        self.min_monthly_savings = _number(solvency.get("min_monthly_savings", 0),
+                                           "solvency.min_monthly_savings")
+        
+        pricing = spec["pricing"]
+        self.base_rate = _number(pricing.get("base_rate"), "pricing.base_rate")
+        self.min_rate = _number(pricing.get("min_rate"), "pricing.min_rate")
+        self.max_rate = _number(pricing.get("max_rate"), "pricing.max_rate")
+        if self.min_rate > self.max_rate:
+            raise ValueError("pricing: min_rate > max_rate")
+        self.risk_premiums = {
+            str(level): _number(premium, f"pricing.risk_premiums.{level}")
+            for level, premium in pricing["risk_premiums"].items()
+        }
+        self.score_pivot, self.score_per_100 = _adjustment(pricing, "score_adjustment")
+        self.ltv_pivot, self.ltv_per_100 = _adjustment(pricing, "ltv_adjustment")
+        self.dti_pivot, self.dti_per_100 = _adjustment(pricing, "dti_adjustment")
+        # Tables par code d'issue: outcomes, puis le refus sur le DTI après prêt (code len(outcomes))
+        coded_outcomes = (*self.outcomes, self.reject_post_loan_dti)
+        self.outcome_approved = np.array([approved for approved, _, _ in coded_outcomes])
+        self.outcome_premiums = np.array([self.risk_premiums.get(risk_level, 0.0)
+                                          for _, risk_level, _ in coded_outcomes])
+        
+        # Grille de tarification: base + prime + ajustement score précalculés par niveau de
+        # risque et par score entier, dans l'ordre d'addition de la formule (résultat identique);
+        # seuls les ajustements LTV/DTI, linéaires au-delà du pivot, restent à calculer
+        score_adj = (self.score_pivot - np.arange(MAX_SCORE + 1)) / 100 * self.score_per_100
+        levels = {None: 0.0, **self.risk_premiums}
+        grid = {level: self.base_rate + premium + score_adj for level, premium in levels.items()}
+        self.score_rates = {level: tuple(rates.tolist()) for level, rates in grid.items()}
+        # Version numpy [code d'issue, score] pour _decide_batch
+        self.outcome_rates = np.array([grid.get(risk_level, grid[None]) for _, risk_level, _ in coded_outcomes])
+        self.rate_sheet = self._rate_sheet(score_steps)
+    
+    def credit_scores(self, debt, late_payments, has_bankruptcy):
+        """Score de la section "scoring", mêmes opérations float64 que le service Business"""
+        raw = (self.score_base - self.debt_weight * debt
+               - self.late_payment_penalty * late_payments
+               - np.where(has_bankruptcy, self.bankruptcy_penalty, 0))
+        return np.clip(np.trunc(raw), 0, MAX_SCORE).astype(np.int64)
+    
+    def interest_rate(self, credit_score, risk_level, ltv, dti):
+        """Taux: partie score lue dans la grille (score entier dans [0, MAX_SCORE]), sinon formule"""
+        if type(credit_score) is int and 0 <= credit_score <= MAX_SCORE:
+            rates = self.score_rates.get(risk_level) or self.score_rates[None]
+            rate = rates[credit_score]
+        else:
+            rate = (self.base_rate + self.risk_premiums.get(risk_level, 0.0)
+                    + (self.score_pivot - credit_score) / 100 * self.score_per_100)
+        ltv_adj = max(0, (ltv - self.ltv_pivot) / 100 * self.ltv_per_100)
+        dti_adj = max(0, (dti - self.dti_pivot) / 100 * self.dti_per_100)
+        return max(self.min_rate, min(self.max_rate, rate + ltv_adj + dti_adj))
+    
+    def _rate_sheet(self, score_steps):
+        """
+        Grille publiée: une cellule par tranche score × LTV × DTI approuvable (issue constante
+        dans la cellule), avec le taux au meilleur coin (score haut, LTV/DTI bas) et au pire.
+        Bornes LTV/DTI: ]min, max].
+        """
+        scores = sorted({self.min_score, *(step for step in score_steps if step > self.min_score)})
+        score_ranges = list(zip(scores, [step - 1 for step in scores[1:]] + [MAX_SCORE]))
+        
+        def ranges(steps, cap):
+            uppers = [step for step in steps if step < cap] + [cap]
+            return list(zip([0, *uppers[:-1]], uppers))
+        
+        cells = []
+        for score_min, score_max in score_ranges:
+            tiers = self.tiers_by_score[score_min]
+            for ltv_min, ltv_max in ranges(self.ltv_steps, self.max_ltv):
+                for dti_min, dti_max in ranges(self.dti_steps, self.max_dti):
+                    _, risk_level, justification = \
+                        tiers[bisect_left(self.ltv_steps, ltv_max)][bisect_left(self.dti_steps, dti_max)]
+                    cells.append({
+                        "score_min": score_min, "score_max": score_max,
+                        "ltv_min": ltv_min, "ltv_max": ltv_max,
+                        "dti_min": dti_min, "dti_max": dti_max,
+                        "risk_level": risk_level, "justification": justification,
+                        "rate_min": self.interest_rate(score_max, risk_level, ltv_min, dti_min),
+                        "rate_max": self.interest_rate(score_min, risk_level, ltv_max, dti_max)
+                    })
+        return tuple(cells)
+
+
+def load_rules(path=None):
+    """Compile les règles du fichier (sections absentes -> défaut); lève ValueError si invalide"""
+    path = RULES_FILE if path is None else path
+    if not path:
+        return DecisionRules(DEFAULT_RULES)
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        spec = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"JSON invalide: {str(e)}")
+    if not isinstance(spec, dict):
+        raise ValueError("Objet JSON attendu")
+    merged = dict(DEFAULT_RULES, **{k: v for k, v in spec.items() if k in DEFAULT_RULES})
+    try:
+        return DecisionRules(merged, source=path, checksum=hashlib.sha256(raw).hexdigest()[:12])
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Règle incomplète: {str(e)}")
+
+
+def reload_rules(path=None):
+    """Recompile puis remplace les règles actives (les requêtes en cours gardent l'ancienne version)"""
+    global _RULES
+    rules = load_rules(path)
+    _RULES = rules
+    logger.info(f"[Approval] ✓ Règles chargées: {rules.version} ({rules.source})")
+    return rules
+
+
+try:
+    _RULES = load_rules()
+except (OSError, ValueError) as e:
+    logger.warning(f"[Approval] ⚠️ Règles {RULES_FILE} illisibles ({str(e)}), règles par défaut")
+    _RULES = DecisionRules(DEFAULT_RULES)
+
+
+def _make_decision(credit_score, solvency_status, ltv, dti, property_compliant, rules=None):
+    """Logique de décision avec seuils (règles compilées)"""
+    rules = rules or _RULES
     
     if not property_compliant:
-        return False, "TRÈS_ÉLEVÉ", "La propriété ne respecte pas les normes de conformité"
+        return rules.reject_compliance
     
-    if credit_score < 600:
-        return False, "TRÈS_ÉLEVÉ", "Score de crédit insuffisant"
+    if credit_score < rules.min_score:
+        return rules.reject_score
     
     if solvency_status != "solvent":
-        return False, "ÉLEVÉ", "Profil de solvabilité insuffisant"
+        return rules.reject_solvency
+    
+    if ltv > rules.max_ltv:
+        return rules.reject_ltv
+    
+    if dti > rules.max_dti:
+        return rules.reject_dti
     
-    if ltv > 95:
-        return False, "ÉLEVÉ", "Ratio LTV trop élevé (> 95%)"
+    # Ici credit_score >= min_score >= 0
+    tiers = rules.tiers_by_score[credit_score if credit_score <= MAX_SCORE else MAX_SCORE]
+    return tiers[bisect_left(rules.ltv_steps, ltv)][bisect_left(rules.dti_steps, dti)]
+
+
+def _calculate_interest_rate(credit_score, risk_level, ltv, dti, rules=None):
+    """
+    Calcule le taux d'intérêt basé sur le profil de risque (grille précalculée):
+    base + prime du niveau de risque + ajustements score, LTV et DTI, borné à [min_rate, max_rate]
+    """
+    rules = rules or _RULES
+    return rules.interest_rate(credit_score, risk_level, ltv, dti)
+
+
+# ============ AMORTISSEMENT ============
+
+# Tableau produit par tranches (jamais matérialisé en entier: 40 ans = 480 lignes par prêt)
+AMORTIZATION_CHUNK_MONTHS = 120
+AMORTIZATION_PAGE_MAX = int(os.getenv("APPROVAL_AMORTIZATION_PAGE_MAX", "120"))
+
+
+def amortization_terms(principal, annual_rate, years):
+    """
+    Mensualité et intérêts totaux d'un prêt à mensualités constantes; scalaires ou tableaux
+    numpy de même forme (calcul vectorisé par lot). Taux annuel en %, durée en années.
+    """
+    if all(type(v) in (int, float) for v in (principal, annual_rate, years)):
+        # Prêt unitaire (approve_loan): math, sans surcoût numpy
+        months, rate = years * 12, annual_rate / 1200
+        payment = principal * rate / -math.expm1(-months * math.log1p(rate)) if rate > 0 else principal / months
+        return payment, payment * months - principal
+    principal = np.asarray(principal, dtype=float)
+    months = np.asarray(years, dtype=float) * 12
+    rate = np.asarray(annual_rate, dtype=float) / 1200
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = np.where(rate > 0, principal * rate / -np.expm1(-months * np.log1p(rate)),
+                           principal / months)
+    total_interest = payment * months - principal
+    return payment, total_interest
+
+
+def amortization_schedule(principal, annual_rate, years, first_month=1, chunk_months=AMORTIZATION_CHUNK_MONTHS):
+    """
+    Générateur de tranches du tableau (dict de tableaux numpy month, payment, interest,
+    principal, balance) à partir de first_month. Chaque tranche repart du solde exact en
+    forme close B_k = P(1+r)^k - M((1+r)^k - 1)/r: une page lointaine ne coûte pas plus
+    qu'une autre, et rien n'est calculé au-delà de ce qui est consommé.
+    """
+    total_months = int(round(years * 12))
+    payment, _ = amortization_terms(principal, annual_rate, years)
+    rate = annual_rate / 1200
+    for start in range(max(1, first_month), total_months + 1, chunk_months):
+        month = np.arange(start, min(start + chunk_months, total_months + 1))
+        if rate > 0:
+            growth = np.power(1 + rate, month - 1)
+            opening = principal * growth - payment * (growth - 1) / rate
+        else:
+            opening = principal - payment * (month - 1)
+        interest = opening * rate
+        yield {
+            "month": month,
+            "payment": np.full(len(month), payment),
+            "interest": interest,
+            "principal": payment - interest,
+            # Dernière mensualité: solde nul (arrondis flottants)
+            "balance": np.where(month == total_months, 0.0, np.maximum(opening - (payment - interest), 0.0))
+        }
+
+
+def _post_loan_dti(monthly_expenses, monthly_income, monthly_payment):
+    return (monthly_expenses + monthly_payment) / monthly_income * 100 if monthly_income > 0 else 100
+
+
+# ============ ANALYSE DE SENSIBILITÉ (WHAT-IF) ============
+
+WHAT_IF_AXES = ("debt", "late_payments", "monthly_income", "monthly_expenses",
+                "loan_amount", "property_value")
+WHAT_IF_MAX_POINTS = int(os.getenv("APPROVAL_WHAT_IF_MAX_POINTS", "250000"))
+
+
+def _grid_axes(axes):
+    """[(nom, valeurs)] validés; late_payments tronqué à l'entier comme int() en unitaire"""
+    if not axes:
+        raise ValueError("Au moins un axe est requis")
+    names = [axis.name for axis in axes]
+    unknown = [name for name in names if name not in WHAT_IF_AXES]
+    if unknown:
+        raise ValueError(f"Axe(s) inconnu(s): {', '.join(map(str, unknown))} "
+                         f"(attendus: {', '.join(WHAT_IF_AXES)})")
+    if len(set(names)) != len(names):
+        raise ValueError("Axe en double")
+    points = 1
+    grid = []
+    for axis in axes:
+        steps = _safe_to_int(axis.steps)
+        if steps < 1:
+            raise ValueError(f"{axis.name}: steps >= 1 attendu")
+        points *= steps
+        values = np.linspace(_safe_to_float(axis.start), _safe_to_float(axis.stop), steps)
+        if axis.name == "late_payments":
+            values = np.trunc(values).astype(np.int64)
+        grid.append((axis.name, values))
+    if points > WHAT_IF_MAX_POINTS:
+        raise ValueError(f"Grille trop grande ({points} points > {WHAT_IF_MAX_POINTS})")
+    return grid
+
+
+def what_if_grid(base, axes, has_bankruptcy, property_compliant, rules=None):
+    """
+    Chaîne complète score -> solvabilité -> décision -> taux sur la grille des axes.
+    base: valeurs scalaires des entrées; axes: [(nom, valeurs)], un axe par dimension.
+    Même ordre d'opérations en float64 que le calcul unitaire, donc résultats identiques.
+    """
+    rules = rules or _RULES
+    inputs = dict(base)
+    for dim, (name, values) in enumerate(axes):
+        shape = [1] * len(axes)
+        shape[dim] = len(values)
+        inputs[name] = values.reshape(shape)
+    shape = tuple(len(values) for _, values in axes)
+    
+    scores = np.broadcast_to(rules.credit_scores(
+        np.asarray(inputs["debt"], dtype=np.float64),
+        np.asarray(inputs["late_payments"], dtype=np.int64),
+        has_bankruptcy
+    ), shape)
+    
+    income = np.broadcast_to(np.asarray(inputs["monthly_income"], dtype=np.float64), shape)
+    expenses = np.broadcast_to(np.asarray(inputs["monthly_expenses"], dtype=np.float64), shape)
+    loan = np.asarray(inputs["loan_amount"], dtype=np.float64)
+    value = np.asarray(inputs["property_value"], dtype=np.float64)
+    
+    is_solvent = (scores >= rules.solvency_min_score) & (income > expenses + rules.min_monthly_savings)
     
-    if dti > 50:
-        return False, "MOYEN", "Ratio DTI trop élevé (> 50%)"
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ltv = np.broadcast_to(np.where(value > 0, loan / value * 100, 100), shape)
+        dti = np.where(income > 0, expenses / income * 100, 100)
     
-    if credit_score >= 800 and ltv <= 80 and dti <= 35:
-        return True, "FAIBLE", "Profil excellent"
-    elif credit_score >= 700 and ltv <= 85 and dti <= 40:
-        return True, "MOYEN", "Profil satisfaisant"
-    elif credit_score >= 650 and ltv <= 90 and dti <= 45:
-        return True, "MOYEN_ÉLEVÉ", "Profil acceptable"
+    codes, rates = _decide_batch(scores, is_solvent, ltv, dti, np.full(shape, bool(property_compliant)), rules)
+    
+    return {
+        "rules": rules,
+        "scores": scores,
+        "is_solvent": is_solvent,
+        "outcome_codes": codes,
+        "approved": rules.outcome_approved[codes],
+        "interest_rates": rates
+    }
+
+
+def _decide_batch(scores, is_solvent, ltv, dti, compliant, rules):
+    """_make_decision + _calculate_interest_rate sur des tableaux de même forme: (codes d'issue, taux)"""
+    tier = rules.tier_codes[np.clip(scores, 0, MAX_SCORE),
+                            np.searchsorted(rules.ltv_steps, ltv, side="left"),
+                            np.searchsorted(rules.dti_steps, dti, side="left")]
+    # Refus dans l'ordre de _make_decision (codes 0 à 4 = rules.outcomes[0:5])
+    codes = np.select(
+        [~compliant, scores < rules.min_score, ~is_solvent, ltv > rules.max_ltv, dti > rules.max_dti],
+        [0, 1, 2, 3, 4], default=tier
+    )
+    return codes, _batch_rates(codes, scores, ltv, dti, rules)
+
+
+def _batch_rates(codes, scores, ltv, dti, rules):
+    """Taux par code d'issue (refus sur le DTI après prêt compris, code len(rules.outcomes))"""
+    # Scores hors [0, MAX_SCORE] (lot non borné): taux par la formule
+    outside = (scores < 0) | (scores > MAX_SCORE)
+    if outside.any():
+        clipped = np.clip(scores, 0, MAX_SCORE)
     else:
-        return True, "ÉLEVÉ", "Profil limité - approbation conditionnelle"
+        clipped = scores
+    ltv_adj = np.maximum(0, (ltv - rules.ltv_pivot) / 100 * rules.ltv_per_100)
+    dti_adj = np.maximum(0, (dti - rules.dti_pivot) / 100 * rules.dti_per_100)
+    score_rates = rules.outcome_rates[codes, clipped]
+    if clipped is not scores:
+        score_rates = np.where(outside, rules.base_rate + rules.outcome_premiums[codes]
+                               + (rules.score_pivot - scores) / 100 * rules.score_per_100, score_rates)
+    final_rate = score_rates + ltv_adj + dti_adj
+    return np.maximum(rules.min_rate, np.minimum(rules.max_rate, final_rate))
+
+
+# ============ JOURNAL DES DÉCISIONS ============
+
+# Append-only (vide = non journalisé, ex: tests unitaires)
+APPROVAL_DECISIONS_LOG = os.getenv("APPROVAL_DECISIONS_LOG", "")
+
+
+class DecisionLog:
+    """
+    Décisions d'approbation: une ligne JSON par appel d'approve_loan avec correlation_id.
+    Jamais compacté ni évincé (contrairement au working set des demandes du service CRUD):
+    source complète du portefeuille. La dernière décision d'une demande l'emporte.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+    
+    def append(self, decision):
+        if self._file is None:
+            return
+        line = json.dumps(decision, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+    
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def _read_jsonl(path):
+    """Entrées d'un fichier JSON Lines (lignes vides ou tronquées ignorées)"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"[Approval] ⚠️ Ligne illisible ignorée: {path}")
+
+
+def latest_decisions(path):
+    """correlation_id -> dernière décision du journal"""
+    decisions = {}
+    if path and os.path.exists(path):
+        for entry in _read_jsonl(path):
+            if entry.get("correlation_id"):
+                decisions[entry["correlation_id"]] = entry
+    return decisions
+
 
+DECISIONS_LOG = DecisionLog(APPROVAL_DECISIONS_LOG or None)
 
-def _calculate_interest_rate(credit_score, risk_level, ltv, dti):
-    """Calcule le taux d'intérêt basé sur le profil de risque"""
-    base_rate = ApprovalService.BASE_RATE
+
+# ============ CONCENTRATION DU PORTEFEUILLE ============
+
+EXPOSURE_LOCK_STRIPES = 16
+
+
+class ExposureBook:
+    """
+    Encours des prêts approuvés, par région et par niveau de risque: nombre, montant total,
+    LTV pondéré par le montant. Chaque réservation est rattachée à son correlation_id: une
+    nouvelle décision pour la même demande remplace la précédente (pas de double comptage),
+    un refus la libère. Initialisé au démarrage depuis le journal des décisions.
+    Plafonds vérifiés en O(1) sous le verrou de la bande de chaque clé (deux approbations
+    de régions et niveaux différents ne se bloquent pas). Le total se déduit des niveaux de risque.
+    """
+    
+    DIMENSIONS = ("region", "risk_level")
+    
+    def __init__(self, stripes=EXPOSURE_LOCK_STRIPES):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        # (dimension, clé) -> [nombre, encours, somme montant × LTV]
+        self._buckets = {}
+        # correlation_id -> (région, niveau de risque, montant, LTV)
+        self._bookings = {}
+    
+    def check(self, region, risk_level, amount, region_cap=None, risk_cap=None):
+        """Cotation: dimension dont le plafond serait dépassé, ou None; rien n'est réservé"""
+        booking = (region, risk_level, amount, None)
+        with self._locked(None, booking):
+            return self._exceeded(booking, None, region_cap, risk_cap)
+    
+    def book(self, correlation_id, region, risk_level, amount, ltv, region_cap=None, risk_cap=None):
+        """
+        Réserve l'encours de la demande (remplace sa réservation précédente) si aucun plafond
+        n'est dépassé; sinon retourne la dimension en dépassement, sans rien modifier.
+        correlation_id obligatoire: toute réservation doit pouvoir être remplacée, libérée
+        et retrouvée dans le journal des décisions (sans identifiant: check()).
+        """
+        if not correlation_id:
+            raise ValueError("correlation_id requis pour réserver un encours (cotation: check)")
+        booking = (region, risk_level, amount, ltv)
+        while True:
+            previous = self._bookings.get(correlation_id)
+            with self._locked(correlation_id, booking, previous):
+                # Réservation modifiée entre la lecture et le verrou: nouvelle tentative
+                if self._bookings.get(correlation_id) != previous:
+                    continue
+                exceeded = self._exceeded(booking, previous, region_cap, risk_cap)
+                if exceeded is None:
+                    if previous:
+                        self._apply(previous, -1)
+                    self._apply(booking, 1)
+                    self._bookings[correlation_id] = booking
+                return exceeded
+    
+    def release(self, correlation_id):
+        """Libère la réservation de la demande (décision devenue un refus)"""
+        while True:
+            previous = self._bookings.get(correlation_id)
+            if previous is None:
+                return
+            with self._locked(correlation_id, previous):
+                if self._bookings.get(correlation_id) != previous:
+                    continue
+                self._apply(previous, -1)
+                del self._bookings[correlation_id]
+                return
+    
+    def seed(self, decisions):
+        """Réservations des dernières décisions approuvées (journal des décisions), sans plafonds"""
+        for correlation_id, decision in decisions.items():
+            if decision.get("approved"):
+                self.book(correlation_id, decision.get("region", ""), decision["risk_level"],
+                          float(decision["loan_amount"]), float(decision["ltv"]))
+        logger.info(f"[Approval] ✓ Encours initialisé: {len(self._bookings)} prêts approuvés")
+    
+    def snapshot(self, dimension, key=None):
+        """{clé: (nombre, encours, LTV pondéré)} d'une dimension, ou de la seule clé demandée"""
+        keys = [(dimension, key)] if key is not None else [k for k in list(self._buckets) if k[0] == dimension]
+        result = {}
+        for bucket_key in keys:
+            with self._locks[hash(bucket_key) % len(self._locks)]:
+                bucket = self._buckets.get(bucket_key)
+                if bucket is None:
+                    continue
+                count, exposure, ltv_exposure = bucket
+            result[bucket_key[1]] = (count, exposure, ltv_exposure / exposure if exposure else 0.0)
+        return result
+    
+    @staticmethod
+    def _keys(booking):
+        if booking is None:
+            return (None, None)
+        return (("region", booking[0]), ("risk_level", booking[1]))
+    
+    def _exceeded(self, booking, previous, region_cap, risk_cap):
+        """Dimension en dépassement si booking remplaçait previous (sous les verrous des clés)"""
+        amount = booking[2]
+        for (dimension, key), cap, previous_key in zip(
+                self._keys(booking), (region_cap, risk_cap), self._keys(previous)):
+            if cap is None:
+                continue
+            bucket = self._buckets.get((dimension, key))
+            current = bucket[1] if bucket else 0.0
+            if previous_key == (dimension, key):
+                current -= previous[2]
+            if current + amount > cap:
+                return dimension
+        return None
     
-    risk_premiums = {
-        "FAIBLE": 0.0,
-        "MOYEN": 0.75,
-        "MOYEN_ÉLEVÉ": 1.5,
-        "ÉLEVÉ": 2.5,
-        "TRÈS_ÉLEVÉ": 4.0
+    @contextmanager
+    def _locked(self, correlation_id, *bookings):
+        """Verrous des bandes de la demande et des clés touchées, dans l'ordre croissant (pas d'interblocage)"""
+        keys = ([("booking", correlation_id)] if correlation_id else []) + [
+            key for booking in bookings if booking for key in self._keys(booking)]
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+    
+    def _apply(self, booking, sign):
+        region, risk_level, amount, ltv = booking
+        for key in self._keys(booking):
+            bucket = self._buckets.setdefault(key, [0, 0.0, 0.0])
+            bucket[0] += sign
+            bucket[1] += sign * amount
+            bucket[2] += sign * amount * ltv
+            if bucket[0] == 0:
+                del self._buckets[key]
+
+
+EXPOSURE_BOOK = ExposureBook()
+EXPOSURE_BOOK.seed(latest_decisions(APPROVAL_DECISIONS_LOG))
+
+
+def _region_key(region):
+    return str(region or "").strip().lower()
+
+
+# ============ DÉCISIONS PAR LOT ============
+
+APPROVAL_BATCH_MAX_ROWS = int(os.getenv("APPROVAL_BATCH_MAX_ROWS", "100000"))
+
+
+def approve_loans_batch(credit_scores, solvency_statuses, property_values, loan_amounts, property_compliant,
+                        monthly_incomes, monthly_expenses, property_values_low=None, loan_durations=None,
+                        rules=None):
+    """
+    approve_loan sur des colonnes de même longueur: cascade de refus par masques numpy.
+    Codes d'issue: rules.outcomes, puis le refus sur le DTI après prêt (dernier code de outcomes).
+    Avec loan_durations: mensualité, intérêts et DTI après prêt (NaN si durée ou montant nul).
+    Mêmes résultats que le calcul unitaire, ligne par ligne, hors plafonds de concentration
+    (décision seule: rien n'est ajouté à EXPOSURE_BOOK).
+    """
+    rules = rules or _RULES
+    scores = np.asarray(credit_scores, dtype=np.int64)
+    is_solvent = np.asarray(solvency_statuses, dtype=object) == "solvent"
+    value = np.asarray(property_values, dtype=np.float64)
+    loan = np.asarray(loan_amounts, dtype=np.float64)
+    compliant = np.asarray(property_compliant, dtype=bool)
+    income = np.asarray(monthly_incomes, dtype=np.float64)
+    expenses = np.asarray(monthly_expenses, dtype=np.float64)
+    if property_values_low is not None:
+        low = np.asarray(property_values_low, dtype=np.float64)
+        value = np.where((low > 0) & (low < value), low, value)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ltv = np.where(value > 0, loan / value * 100, 100)
+        dti = np.where(income > 0, expenses / income * 100, 100)
+    codes, rates = _decide_batch(scores, is_solvent, ltv, dti, compliant, rules)
+    approved = rules.outcome_approved[codes]
+    result = {
+        "rules": rules,
+        "outcomes": (*rules.outcomes, rules.reject_post_loan_dti),
+        "scores": scores,
+        "ltv": ltv,
+        "dti": dti,
+        "compliant": compliant,
+        "interest_rates": rates
     }
     
-    score_adj = (800 - credit_score) / 100 * 0.3
-    ltv_adj = max(0, (ltv - 80) / 100 * 0.2)
-    dti_adj = max(0, (dti - 40) / 100 * 0.15)
+    if loan_durations is not None:
+        years = np.asarray(loan_durations, dtype=np.int64)
+        has_term = (years > 0) & (loan > 0)
+        
+        def affordability(rates):
+            payment, total_interest = amortization_terms(loan, rates, np.where(has_term, years, 1))
+            payment = np.where(has_term, payment, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                post_loan_dti = np.where(income > 0, (expenses + payment) / income * 100, 100)
+            return payment, np.where(has_term, total_interest, np.nan), np.where(has_term, post_loan_dti, np.nan)
+        
+        payment, total_interest, post_loan_dti = affordability(rates)
+        rejected = approved & (post_loan_dti > rules.max_post_loan_dti)
+        if rejected.any():
+            # Comme approve_loan: taux du refus, mensualité recalculée à ce taux
+            codes = np.where(rejected, len(rules.outcomes), codes)
+            rates = result["interest_rates"] = _batch_rates(codes, scores, ltv, dti, rules)
+            payment, total_interest, post_loan_dti = affordability(rates)
+        approved = approved & ~rejected
+        result.update(monthly_payments=payment, total_interest=total_interest, post_loan_dti=post_loan_dti)
+    
+    result.update(outcome_codes=codes, approved=approved)
+    return result
+
+
+def _batch_explanations(result):
+    """Explications simples du lot (générées à la demande uniquement)"""
+    rules, outcomes = result["rules"], result["outcomes"]
+    explanations = []
+    for code, score, ltv, dti, compliant in zip(
+            result["outcome_codes"].tolist(), result["scores"].tolist(), result["ltv"].tolist(),
+            result["dti"].tolist(), result["compliant"].tolist()):
+        approved, risk_level, justification = outcomes[code]
+        explanations.append(_generate_explanation(approved, score, risk_level, ltv, dti, compliant,
+                                                  justification, rules))
+    return explanations
+
+
+# ============ STRESS TEST DU PORTEFEUILLE ============
+
+STRESS_WORKERS = int(os.getenv("APPROVAL_STRESS_WORKERS", "0"))  # 0: un processus par cœur
+STRESS_CHUNK_LOANS = int(os.getenv("APPROVAL_STRESS_CHUNK_LOANS", "65536"))
+# Sommes accumulées par scénario (moyennes et totaux dérivés à la fin)
+STRESS_METRICS = ("approved", "exposure", "rejected_exposure", "ltv", "post_loan_dti", "interest_rate",
+                  "payment_increase", "negative_equity", "negative_equity_shortfall",
+                  "ltv_breaches", "dti_breaches")
+
+
+class Portfolio:
+    """
+    Prêts approuvés en colonnes numpy (une ligne par prêt), régions codées en entiers
+    (regions[code]) pour appliquer les baisses de valeur par région sans dictionnaire.
+    interest_rate à 0: taux d'origine inconnu, recalculé avec les règles courantes.
+    """
     
-    risk_prem = risk_premiums.get(risk_level, 0.0)
-    final_rate = base_rate + risk_prem + score_adj + ltv_adj + dti_adj
+    FIELDS = ("loan_amount", "loan_duration", "property_value", "credit_score",
+              "monthly_income", "monthly_expenses", "interest_rate")
     
-    return max(2.5, min(8.0, final_rate))
+    def __init__(self, columns, region_codes, regions, compliant):
+        self.loan_amount, self.loan_duration, self.property_value, self.credit_score, \
+            self.monthly_income, self.monthly_expenses, self.interest_rate = columns
+        self.region_codes = region_codes
+        self.regions = regions
+        self.compliant = compliant
+        # Période des décisions couvertes (journal des décisions), None si inconnue
+        self.decided_from = self.decided_to = None
+    
+    def __len__(self):
+        return len(self.loan_amount)
+    
+    @classmethod
+    def from_records(cls, records):
+        """Prêts (dicts de FIELDS + region, property_compliant); incomplets ignorés (ValueError si aucun)"""
+        values = {name: [] for name in cls.FIELDS}
+        region_index, region_codes, compliant = {}, [], []
+        skipped = 0
+        for record in records:
+            try:
+                row = [float(record.get(name) or 0) for name in cls.FIELDS]
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            # Montant, durée, valeur et revenu sont indispensables au recalcul
+            if min(row[0], row[1], row[2], row[4]) <= 0:
+                skipped += 1
+                continue
+            for name, value in zip(cls.FIELDS, row):
+                values[name].append(value)
+            region = str(record.get("region") or "").strip().lower()
+            region_codes.append(region_index.setdefault(region, len(region_index)))
+            compliant.append(_safe_to_bool(record.get("property_compliant", True)))
+        if skipped:
+            logger.warning(f"[Approval] ⚠️ {skipped} prêt(s) incomplet(s) ignoré(s)")
+        if not compliant:
+            raise ValueError("Portefeuille vide: aucun prêt exploitable")
+        columns = [np.array(values[name], dtype=np.float64) for name in cls.FIELDS]
+        columns[3] = np.clip(columns[3], 0, MAX_SCORE).astype(np.int64)
+        return cls(columns, np.array(region_codes, dtype=np.int32), tuple(region_index),
+                   np.array(compliant, dtype=bool))
+    
+    def chunk(self, start, stop):
+        return (self.loan_amount[start:stop], self.loan_duration[start:stop], self.property_value[start:stop],
+                self.credit_score[start:stop], self.monthly_income[start:stop],
+                self.monthly_expenses[start:stop], self.interest_rate[start:stop],
+                self.region_codes[start:stop], self.compliant[start:stop])
+
+
+def load_portfolio(path):
+    """
+    Prêts approuvés d'un fichier JSON Lines: soit le journal des décisions (APPROVAL_DECISIONS_LOG,
+    dernière décision par correlation_id, approuvées retenues), soit un prêt par ligne (champs de
+    Portfolio.FIELDS, statut APPROVED par défaut). Période couverte: decided_from / decided_to.
+    """
+    decisions = {}
+    loans = []
+    for entry in _read_jsonl(path):
+        if entry.get("correlation_id") and "approved" in entry:
+            decisions[entry["correlation_id"]] = entry
+        elif entry.get("status", "APPROVED") == "APPROVED":
+            loans.append(entry)
+    approved = [decision for decision in decisions.values() if decision["approved"]]
+    portfolio = Portfolio.from_records(loans + approved)
+    dates = sorted(decision["decided_at"] for decision in approved if decision.get("decided_at"))
+    if dates:
+        portfolio.decided_from, portfolio.decided_to = dates[0], dates[-1]
+    return portfolio
 
 
-def _generate_explanation(approved, credit_score, risk_level, ltv, dti, compliant, justification):
+def _stress_scenarios(scenarios, regions):
+    """
+    Scénarios {"name", "rate_bp", "value_drop_pct", "income_drop_pct"} -> noms et tableaux:
+    décalage de taux (points), facteur de revenu, facteur de valeur [scénario, code région].
+    value_drop_pct: nombre, ou {"*": défaut, région: baisse} (régions sans casse).
+    """
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError("Liste de scénarios non vide attendue")
+    names, rate_shift, income_factor, value_factor = [], [], [], []
+    for i, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError(f"scénario {i}: objet attendu")
+        names.append(str(scenario.get("name") or f"scénario {i + 1}"))
+        rate_shift.append(_number(scenario.get("rate_bp", 0), f"scénario {i}.rate_bp") / 100)
+        income_drop = _number(scenario.get("income_drop_pct", 0), f"scénario {i}.income_drop_pct")
+        drops = scenario.get("value_drop_pct", 0)
+        if not isinstance(drops, dict):
+            drops = {"*": drops}
+        drops = {str(region).strip().lower(): _number(drop, f"scénario {i}.value_drop_pct.{region}")
+                 for region, drop in drops.items()}
+        region_drops = [drops.get(region, drops.get("*", 0)) for region in regions]
+        if not all(-100 <= drop < 100 for drop in [income_drop, *region_drops]):
+            raise ValueError(f"scénario {i}: baisses entre -100 et 100% (exclu) attendues")
+        income_factor.append(1 - income_drop / 100)
+        value_factor.append([1 - drop / 100 for drop in region_drops])
+    return names, (np.array(rate_shift), np.array(income_factor), np.array(value_factor).reshape(len(names), -1))
+
+
+def _stress_chunk(chunk, scenarios, rules):
+    """Sommes STRESS_METRICS [scénario, métrique] et effectifs par issue [scénario, code] d'une tranche"""
+    loan, years, value, scores, income, expenses, rate, region, compliant = chunk
+    rate_shift, income_factor, value_factor = scenarios
+    # Code supplémentaire: approuvé par les règles mais refusé sur le DTI après prêt
+    post_loan_code = len(rules.outcomes)
+    
+    def decide(value, income, shift):
+        """Décision d'approve_loan (refus sur le DTI après prêt compris), grille de taux décalée de shift"""
+        is_solvent = (scores >= rules.solvency_min_score) & (income > expenses + rules.min_monthly_savings)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ltv = np.where(value > 0, loan / value * 100, 100)
+            dti = np.where(income > 0, expenses / income * 100, 100)
+        codes, rates = _decide_batch(scores, is_solvent, ltv, dti, compliant, rules)
+        
+        def affordability(rates):
+            payment, _ = amortization_terms(loan, rates, years)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return payment, np.where(income > 0, (expenses + payment) / income * 100, 100)
+        
+        # Choc de marché: toute la grille de taux est décalée, bornes comprises
+        rates = rates + shift
+        payment, post_loan_dti = affordability(rates)
+        dti_breach = post_loan_dti > rules.max_post_loan_dti
+        rejected = rules.outcome_approved[codes] & dti_breach
+        if rejected.any():
+            # Comme approve_loan: taux du refus, mensualité recalculée à ce taux
+            codes = np.where(rejected, post_loan_code, codes)
+            rates = _batch_rates(codes, scores, ltv, dti, rules) + shift
+            payment, post_loan_dti = affordability(rates)
+        return ltv, codes, rates, payment, post_loan_dti, dti_breach
+    
+    base_rates = decide(value, income, 0)[2]
+    base_payment, _ = amortization_terms(loan, np.where(rate > 0, rate, base_rates), years)
+    
+    sums = np.zeros((len(rate_shift), len(STRESS_METRICS)))
+    counts = np.zeros((len(rate_shift), post_loan_code + 1), dtype=np.int64)
+    for s in range(len(rate_shift)):
+        stressed_value = value * value_factor[s][region]
+        stressed_income = income * income_factor[s]
+        ltv, codes, rates, payment, post_loan_dti, dti_breach = decide(
+            stressed_value, stressed_income, rate_shift[s])
+        approved = rules.outcome_approved[codes]
+        shortfall = loan - stressed_value
+        sums[s] = (
+            approved.sum(), loan.sum(), loan[~approved].sum(), ltv.sum(), post_loan_dti.sum(), rates.sum(),
+            (payment - base_payment).sum(), (shortfall > 0).sum(), shortfall[shortfall > 0].sum(),
+            (ltv > rules.max_ltv).sum(), dti_breach.sum()
+        )
+        counts[s] = np.bincount(codes, minlength=post_loan_code + 1)
+    return sums, counts
+
+
+def stress_test(portfolio, scenarios, rules=None, workers=None, chunk_loans=None):
+    """
+    Stress test du portefeuille: pour chaque scénario (taux +x pb, valeur -y% par région,
+    revenu -z%), LTV, DTI après prêt, issue et taux recalculés pour tous les prêts, puis
+    agrégés. Les tranches de prêts sont réparties sur un pool de processus (workers=1: en ligne).
+    """
+    rules = rules or _RULES
+    workers = workers or STRESS_WORKERS or os.cpu_count() or 1
+    chunk_loans = chunk_loans or STRESS_CHUNK_LOANS
+    names, arrays = _stress_scenarios(scenarios, portfolio.regions)
+    chunks = [portfolio.chunk(start, start + chunk_loans) for start in range(0, len(portfolio), chunk_loans)]
+    
+    started = time.perf_counter()
+    if workers == 1 or len(chunks) == 1:
+        results = [_stress_chunk(chunk, arrays, rules) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            results = list(executor.map(_stress_chunk, chunks, repeat(arrays), repeat(rules)))
+    sums = sum(r[0] for r in results)
+    counts = sum(r[1] for r in results)
+    logger.info(f"[Approval] ✓ Stress test: {len(portfolio)} prêts × {len(names)} scénarios "
+                f"({(time.perf_counter() - started) * 1000:.0f}ms, {workers} processus)")
+    
+    loans = len(portfolio)
+    outcomes = (*rules.outcomes, rules.reject_post_loan_dti)
+    report = []
+    for name, total, count in zip(names, sums, counts):
+        metrics = dict(zip(STRESS_METRICS, total.tolist()))
+        risk_levels, rejections = {}, {}
+        for (approved, risk_level, justification), n in zip(outcomes, count.tolist()):
+            if n:
+                target, key = (risk_levels, risk_level) if approved else (rejections, justification)
+                target[key] = target.get(key, 0) + n
+        report.append({
+            "name": name,
+            "loans": loans,
+            "decided_from": portfolio.decided_from,
+            "decided_to": portfolio.decided_to,
+            "exposure": round(metrics["exposure"], 2),
+            "approved": int(metrics["approved"]),
+            "rejected": loans - int(metrics["approved"]),
+            "rejected_exposure": round(metrics["rejected_exposure"], 2),
+            "mean_ltv": round(metrics["ltv"] / loans, 2),
+            "mean_post_loan_dti": round(metrics["post_loan_dti"] / loans, 2),
+            "mean_interest_rate": round(metrics["interest_rate"] / loans, 4),
+            "mean_payment_increase": round(metrics["payment_increase"] / loans, 2),
+            "negative_equity": int(metrics["negative_equity"]),
+            "negative_equity_shortfall": round(metrics["negative_equity_shortfall"], 2),
+            "ltv_breaches": int(metrics["ltv_breaches"]),
+            "dti_breaches": int(metrics["dti_breaches"]),
+            "risk_levels": risk_levels,
+            "rejections": rejections
+        })
+    return report
+
+
+# ============ EXPLICATIONS ============
+
+# Textes ne dépendant que de la tranche de décision: construits une seule fois
+APPROVAL_EXPLANATIONS = {
+    "approved_low_risk": (
+        "Votre dossier est approuvé avec une évaluation très favorable. "
+        "Vous bénéficiez d'un taux d'intérêt compétitif basé sur votre excellent profil financier."
+    ),
+    "approved_standard": (
+        "Votre dossier est approuvé avec une bonne évaluation. "
+        "Les conditions standard de crédit s'appliquent à votre situation."
+    ),
+    "approved_conditional": (
+        "Votre dossier a été approuvé. "
+        "Veuillez consulter les détails pour connaître les conditions spécifiques applicables."
+    ),
+    "rejected_compliance": (
+        "Malheureusement, la propriété ne répond pas aux critères de conformité requis par notre établissement."
+    ),
+    "rejected_score": (
+        "Votre score de crédit est actuellement insuffisant. "
+        "Nous vous recommandons de nous recontacter après amélioration de votre profil."
+    ),
+    "rejected_dti": (
+        "Vos charges mensuelles dépassent le seuil acceptable. "
+        "Réduire vos dépenses permettrait de reconsidérer votre demande."
+    ),
+    "rejected_other": (
+        "Votre demande ne peut pas être approuvée actuellement. Motif: {justification}. "
+        "Nous restons disponibles pour discuter de solutions alternatives."
+    )
+}
+
+
+@lru_cache(maxsize=256)
+def _rejection_explanation(justification):
+    """Les justifications forment un petit ensemble fini (règles): rendu mis en cache"""
+    return APPROVAL_EXPLANATIONS["rejected_other"].format(justification=justification)
+
+
+def _generate_explanation(approved, credit_score, risk_level, ltv, dti, compliant, justification,
+                          rules=None):
     """Génère une explication simple et compréhensible pour l'utilisateur"""
+    rules = rules or _RULES
     if approved:
         if risk_level == "FAIBLE":
-            return (
-                "Votre dossier est approuvé avec une évaluation très favorable. "
-                "Vous bénéficiez d'un taux d'intérêt compétitif basé sur votre excellent profil financier."
-            )
+            return APPROVAL_EXPLANATIONS["approved_low_risk"]
         elif risk_level == "MOYEN":
-            return (
-                "Votre dossier est approuvé avec une bonne évaluation. "
-                "Les conditions standard de crédit s'appliquent à votre situation."
-            )
+            return APPROVAL_EXPLANATIONS["approved_standard"]
         else:
-            return (
-                "Votre dossier a été approuvé. "
-                "Veuillez consulter les détails pour connaître les conditions spécifiques applicables."
-            )
+            return APPROVAL_EXPLANATIONS["approved_conditional"]
     else:
         if not compliant:
-            return (
-                "Malheureusement, la propriété ne répond pas aux critères de conformité requis par notre établissement."
-            )
-        elif credit_score < 600:
-            return (
-                "Votre score de crédit est actuellement insuffisant. "
-                "Nous vous recommandons de nous recontacter après amélioration de votre profil."
-            )
-        elif dti > 50:
-            return (
-                "Vos charges mensuelles dépassent le seuil acceptable. "
-                "Réduire vos dépenses permettrait de reconsidérer votre demande."
-            )
+            return APPROVAL_EXPLANATIONS["rejected_compliance"]
+        elif credit_score < rules.min_score:
+            return APPROVAL_EXPLANATIONS["rejected_score"]
+        elif dti > rules.max_dti:
+            return APPROVAL_EXPLANATIONS["rejected_dti"]
         else:
-            return (
-                f"Votre demande ne peut pas être approuvée actuellement. Motif: {justification}. "
-                "Nous restons disponibles pour discuter de solutions alternatives."
-            )
+            return _rejection_explanation(justification)
 
 
 application = Application(
-    [ApprovalService],
+    [ApprovalService, RulesAdminService, AmortizationService, PricingService, ExposureService],
     tns='urn:solvency.verification.approval:v1',
     in_protocol=Soap11(validator='lxml'),
     out_protocol=Soap11()
@@ -210,6 +1626,23 @@ application = Application(
 wsgi_application = WsgiApplication(application)
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Service Approval (SOAP) et stress test du portefeuille")
+    subparsers = parser.add_subparsers(dest="command")
+    stress_parser = subparsers.add_parser("stress", help="Stress test des prêts approuvés (journal des décisions ou JSONL)")
+    stress_parser.add_argument("portfolio")
+    stress_parser.add_argument("scenarios", help="Fichier JSON: liste de scénarios")
+    stress_parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    
+    if args.command == "stress":
+        with open(args.scenarios, encoding="utf-8") as f:
+            scenario_list = json.load(f)
+        report = stress_test(load_portfolio(args.portfolio), scenario_list, workers=args.workers)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        raise SystemExit(0)
+    
     from wsgiref.simple_server import make_server
     logger.info("[Approval] 🚀 Démarrage sur :5007")
     server = make_server('0.0.0.0', 5007, wsgi_application)
@@ -1,10 +1,15 @@
 from spyne import (Application, rpc, ServiceBase, Unicode, Decimal, Integer, 
-                   Boolean, ComplexModel)
+                   Boolean, ComplexModel, Array)
 from spyne.protocol.soap import Soap11
 from spyne.server.wsgi import WsgiApplication
 from spyne.model.fault import Fault
+import hashlib
+import json
 import logging
+import os
+from datetime import datetime
 from decimal import Decimal as PyDecimal
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,6 +19,7 @@ class CreditScore(ComplexModel):
     __namespace__ = "urn:solvency.verification.service:v1"
     score = Integer(min_occurs=1)
     grade = Unicode(min_occurs=1)
+    scoring_version = Unicode
 
 
 class SolvencyDecision(ComplexModel):
@@ -22,6 +28,21 @@ class SolvencyDecision(ComplexModel):
     is_solvent = Boolean(min_occurs=1)
 
 
+class CreditScoreBatch(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    scores = Array(Integer)
+    grades = Array(Unicode)
+    is_solvent = Array(Boolean)
+
+
+class RulesStatus(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    version = Unicode(min_occurs=1)
+    source = Unicode(min_occurs=1)
+    checksum = Unicode(min_occurs=1)
+    loaded_at = Unicode(min_occurs=1)
+
+
 class ExplanationData(ComplexModel):
     __namespace__ = "urn:solvency.verification.service:v1"
     credit_score_explanation = Unicode(min_occurs=1)
@@ -32,7 +53,8 @@ class ExplanationData(ComplexModel):
 class CreditScoringService(ServiceBase):
     """
     Service de calcul du score de crédit
-    Formule: 1000 - 0.1*dette - 50*retards - (faillite?200:0)
+    Formule (section "scoring" des règles, par défaut):
+    1000 - 0.1*dette - 50*retards - (faillite?200:0)
     """
     
     @rpc(Unicode, Decimal, Integer, Boolean, _returns=CreditScore)
@@ -42,24 +64,73 @@ class CreditScoringService(ServiceBase):
         try:
             debt_val = float(debt) if debt else 0
             late_pay_val = int(late_payments) if late_payments else 0
-            bankruptcy_penalty = 200 if has_bankruptcy else 0
-            
-            score = int(1000 - 0.1 * debt_val - 50 * late_pay_val - bankruptcy_penalty)
-            score = max(0, min(1000, score))
             
-            grade = _get_grade(score)
+            rules = _RULES
+            score = rules.credit_score(debt_val, late_pay_val, bool(has_bankruptcy))
+            grade = rules.grade_table[score]
             logger.info(f"[Business] Score: {score} ({grade})")
             
-            return CreditScore(score=score, grade=grade)
+            return CreditScore(score=score, grade=grade, scoring_version=rules.scoring_version)
         except Exception as e:
             logger.error(f"[Business] Erreur scoring: {str(e)}")
             raise Fault("Server.CalculationError", f"Erreur de calcul: {str(e)}")
+    
+    @rpc(Integer, _returns=CreditScore)
+    def grade_credit_score(ctx, score):
+        """
+        Grade d'un score déjà calculé (index de scores du service CRUD), sans recalcul.
+        scoring_version permet à l'appelant de vérifier que le score a été calculé
+        avec la même formule que les règles actives.
+        """
+        logger.info(f"[Business] GradeScore(score={score})")
+        if score is None:
+            raise Fault("Score.ValidationError", "score requis")
+        
+        rules = _RULES
+        return CreditScore(score=score, grade=rules.grade_of(score),
+                           scoring_version=rules.scoring_version)
+    
+    @rpc(Array(Decimal), Array(Integer), Array(Boolean), Array(Decimal), Array(Decimal),
+         _returns=CreditScoreBatch)
+    def compute_credit_scores_batch(ctx, debts, late_payments, has_bankruptcy,
+                                    monthly_incomes, monthly_expenses):
+        """
+        Scoring en lot (colonnes de même longueur), mêmes résultats que compute_credit_score.
+        Revenus/dépenses optionnels, à fournir ensemble: is_solvent est alors calculé.
+        """
+        n = len(debts or [])
+        logger.info(f"[Business] ComputeScoresBatch({n} clients)")
+        
+        if (monthly_incomes is None) != (monthly_expenses is None):
+            raise Fault("Batch.ValidationError",
+                        "monthly_incomes et monthly_expenses doivent être fournis ensemble")
+        columns = [late_payments, has_bankruptcy]
+        with_solvency = monthly_incomes is not None
+        if with_solvency:
+            columns += [monthly_incomes, monthly_expenses]
+        if any(len(column or []) != n for column in columns):
+            raise Fault("Batch.ValidationError", "Les colonnes doivent avoir la même longueur")
+        
+        try:
+            result = compute_credit_scores_batch(
+                debts or [], late_payments or [], has_bankruptcy or [],
+                monthly_incomes if with_solvency else None,
+                monthly_expenses if with_solvency else None
+            )
+            return CreditScoreBatch(
+                scores=result["scores"].tolist(),
+                grades=result["grades"].tolist(),
+                is_solvent=result["is_solvent"].tolist() if with_solvency else None
+            )
+        except Exception as e:
+            logger.error(f"[Business] Erreur scoring lot: {str(e)}")
+            raise Fault("Server.CalculationError", f"Erreur de calcul: {str(e)}")
 
 
 class SolvencyDecisionService(ServiceBase):
     """
     Service de décision de solvabilité
-    Critères: score >= 700 ET revenu > dépenses
+    Critères (règles par défaut): score >= 700 ET revenu > dépenses
     """
     
     @rpc(Decimal, Decimal, Integer, _returns=SolvencyDecision)
@@ -71,7 +142,11 @@ class SolvencyDecisionService(ServiceBase):
             expenses_val = float(monthly_expenses) if monthly_expenses else 0
             score_val = int(score) if score else 0
             
-            is_solvent = (score_val >= 700) and (income_val > expenses_val)
+            rules = _RULES
+            if not 0 <= score_val <= MAX_SCORE:
+                score_val = 0 if score_val < 0 else MAX_SCORE
+            is_solvent = (rules.solvent_table[score_val]
+                          and income_val > expenses_val + rules.min_monthly_savings)
             status = "solvent" if is_solvent else "not_solvent"
             
             logger.info(f"[Business] Solvabilité: {status}")
@@ -81,80 +156,86 @@ class SolvencyDecisionService(ServiceBase):
             raise Fault("Server.DecisionError", f"Erreur de décision: {str(e)}")
 
 
+class RulesAdminService(ServiceBase):
+    """Rechargement à chaud des règles de décision (formule de score, grades, solvabilité)"""
+    
+    @rpc(_returns=RulesStatus)
+    def reload_rules(ctx):
+        logger.info(f"[Business] ReloadRules({RULES_FILE or 'défaut'})")
+        try:
+            rules = reload_rules()
+        except FileNotFoundError as e:
+            raise Fault("Rules.FileNotFound", str(e))
+        except ValueError as e:
+            logger.error(f"[Business] ✗ Règles refusées: {str(e)}")
+            raise Fault("Rules.ValidationError", str(e))
+        return _rules_status(rules)
+    
+    @rpc(_returns=RulesStatus)
+    def get_rules_status(ctx):
+        return _rules_status(_RULES)
+
+
+def _rules_status(rules):
+    return RulesStatus(
+        version=rules.version,
+        source=rules.source,
+        checksum=rules.checksum,
+        loaded_at=rules.loaded_at.isoformat()
+    )
+
+
 class ExplanationService(ServiceBase):
     """
     Service de génération d'explications
     Langage simple et compréhensible, sans jargon technique
+    Textes issus de gabarits précompilés par tranche (voir EXPLANATION_TEMPLATES);
+    fields = sous-ensemble de "credit,income,history" (défaut: tout), les autres restent vides
     """
     
-    @rpc(Integer, Decimal, Decimal, Decimal, Integer, Boolean, 
+    @rpc(Integer, Decimal, Decimal, Decimal, Integer, Boolean, Unicode,
          _returns=ExplanationData)
     def explain(ctx, score, monthly_income, monthly_expenses, debt, 
-                late_payments, has_bankruptcy):
+                late_payments, has_bankruptcy, fields=None):
         logger.info(f"[Business] GenerateExplanations(score={score})")
         
         try:
-            score_val = int(score) if score else 0
-            income_val = float(monthly_income) if monthly_income else 0
-            expenses_val = float(monthly_expenses) if monthly_expenses else 0
-            debt_val = float(debt) if debt else 0
-            late_pay_val = int(late_payments) if late_payments else 0
+            selected = _explanation_fields(fields)
+        except ValueError as e:
+            raise Fault("Explanation.ValidationError", str(e))
+        
+        try:
+            cs_expl = ie_expl = ch_expl = ""
             
-            # Explication Score de Crédit
-            if score_val >= 800:
-                cs_expl = (
-                    f"✓ Excellent ! Votre score de crédit est très bon ({score_val}/1000). "
-                    f"Vous avez un historique financier solide et fiable."
-                )
-            elif score_val >= 700:
-                cs_expl = (
-                    f"✓ Satisfaisant. Votre score de crédit est bon ({score_val}/1000). "
-                    f"Vous êtes dans une position favorable pour obtenir un crédit."
-                )
-            elif score_val >= 600:
-                cs_expl = (
-                    f"⚠ Moyen. Votre score de crédit est acceptable ({score_val}/1000), "
-                    f"mais il y a des domaines à améliorer."
-                )
-            else:
-                cs_expl = (
-                    f"✗ Faible. Votre score de crédit est bas ({score_val}/1000). "
-                    f"Nous vous recommandons d'améliorer votre historique de paiement avant de faire une nouvelle demande."
-                )
+            # Explication Score de Crédit (texte entièrement précalculé par score)
+            if "credit" in selected:
+                score_val = int(score) if score else 0
+                if 0 <= score_val <= MAX_SCORE:
+                    cs_expl = SCORE_EXPLANATIONS[score_val]
+                else:
+                    cs_expl = _render_score_explanation(score_val)
             
             # Explication Revenus vs Dépenses
-            diff = income_val - expenses_val
-            if income_val <= expenses_val:
-                ie_expl = (
-                    f"✗ Attention. Vos dépenses mensuelles (${expenses_val:,.0f}) "
-                    f"égalent ou dépassent vos revenus (${income_val:,.0f}). "
-                    f"C'est un point de préoccupation pour notre évaluation."
-                )
-            else:
-                pct_savings = (diff / income_val * 100) if income_val > 0 else 0
-                ie_expl = (
-                    f"✓ Positif. Vous avez une capacité d'épargne de ${diff:,.0f} par mois "
-                    f"({pct_savings:.1f}% de vos revenus). C'est un facteur favorable."
-                )
+            if "income" in selected:
+                income_val = float(monthly_income) if monthly_income else 0
+                expenses_val = float(monthly_expenses) if monthly_expenses else 0
+                if income_val <= expenses_val:
+                    ie_expl = _INCOME_DEFICIT(expenses=expenses_val, income=income_val)
+                else:
+                    diff = income_val - expenses_val
+                    pct_savings = (diff / income_val * 100) if income_val > 0 else 0
+                    ie_expl = _INCOME_SURPLUS(diff=diff, pct=pct_savings)
             
             # Explication Historique de Crédit
-            if has_bankruptcy:
-                ch_expl = (
-                    f"✗ Vous avez une faillite antérieure dans votre dossier. "
-                    f"C'est un facteur significatif qui affecte notre évaluation. "
-                    f"Votre dossier crédit actuel: ${debt_val:,.0f} de dette."
-                )
-            elif late_pay_val > 0:
-                ch_expl = (
-                    f"⚠ Vous avez {late_pay_val} paiement(s) en retard antérieurement. "
-                    f"Vos dettes actuelles totalisent ${debt_val:,.0f}. "
-                    f"Un paiement à jour depuis est positif."
-                )
-            else:
-                ch_expl = (
-                    f"✓ Parfait ! Vous n'avez aucun paiement en retard. "
-                    f"Votre historique est solide (dettes actuelles: ${debt_val:,.0f})."
-                )
+            if "history" in selected:
+                debt_val = float(debt) if debt else 0
+                late_pay_val = int(late_payments) if late_payments else 0
+                if has_bankruptcy:
+                    ch_expl = _HISTORY_BANKRUPTCY(debt=debt_val)
+                elif late_pay_val > 0:
+                    ch_expl = _HISTORY_LATE(late=late_pay_val, debt=debt_val)
+                else:
+                    ch_expl = _HISTORY_CLEAN(debt=debt_val)
             
             logger.info("[Business] ✓ Explications générées")
             
@@ -168,22 +249,264 @@ class ExplanationService(ServiceBase):
             raise Fault("Server.ExplanationError", f"Erreur de génération: {str(e)}")
 
 
+# ============ GABARITS D'EXPLICATION ============
+
+EXPLANATION_FIELDS = ("credit", "income", "history")
+
+# Tranches de score (seuil minimal, gabarit), de la meilleure à la plus faible
+EXPLANATION_TEMPLATES = {
+    "credit": (
+        (800, "✓ Excellent ! Votre score de crédit est très bon ({score}/1000). "
+              "Vous avez un historique financier solide et fiable."),
+        (700, "✓ Satisfaisant. Votre score de crédit est bon ({score}/1000). "
+              "Vous êtes dans une position favorable pour obtenir un crédit."),
+        (600, "⚠ Moyen. Votre score de crédit est acceptable ({score}/1000), "
+              "mais il y a des domaines à améliorer."),
+        (None, "✗ Faible. Votre score de crédit est bas ({score}/1000). "
+               "Nous vous recommandons d'améliorer votre historique de paiement avant de faire une nouvelle demande.")
+    ),
+    "income_deficit": (
+        "✗ Attention. Vos dépenses mensuelles (${expenses:,.0f}) "
+        "égalent ou dépassent vos revenus (${income:,.0f}). "
+        "C'est un point de préoccupation pour notre évaluation."
+    ),
+    "income_surplus": (
+        "✓ Positif. Vous avez une capacité d'épargne de ${diff:,.0f} par mois "
+        "({pct:.1f}% de vos revenus). C'est un facteur favorable."
+    ),
+    "history_bankruptcy": (
+        "✗ Vous avez une faillite antérieure dans votre dossier. "
+        "C'est un facteur significatif qui affecte notre évaluation. "
+        "Votre dossier crédit actuel: ${debt:,.0f} de dette."
+    ),
+    "history_late": (
+        "⚠ Vous avez {late} paiement(s) en retard antérieurement. "
+        "Vos dettes actuelles totalisent ${debt:,.0f}. "
+        "Un paiement à jour depuis est positif."
+    ),
+    "history_clean": (
+        "✓ Parfait ! Vous n'avez aucun paiement en retard. "
+        "Votre historique est solide (dettes actuelles: ${debt:,.0f})."
+    )
+}
+
+# Méthodes format liées une fois: seule l'interpolation numérique reste par requête
+_INCOME_DEFICIT = EXPLANATION_TEMPLATES["income_deficit"].format
+_INCOME_SURPLUS = EXPLANATION_TEMPLATES["income_surplus"].format
+_HISTORY_BANKRUPTCY = EXPLANATION_TEMPLATES["history_bankruptcy"].format
+_HISTORY_LATE = EXPLANATION_TEMPLATES["history_late"].format
+_HISTORY_CLEAN = EXPLANATION_TEMPLATES["history_clean"].format
+
+
+def _render_score_explanation(score):
+    for threshold, template in EXPLANATION_TEMPLATES["credit"]:
+        if threshold is None or score >= threshold:
+            return template.format(score=score)
+
+
+def _explanation_fields(fields):
+    """"credit,income" -> {"credit", "income"}; None/vide -> tous les champs"""
+    if not fields or not fields.strip():
+        return EXPLANATION_FIELDS
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected.difference(EXPLANATION_FIELDS)
+    if unknown:
+        raise ValueError(f"Champ(s) inconnu(s): {', '.join(sorted(unknown))} "
+                         f"(attendus: {', '.join(EXPLANATION_FIELDS)})")
+    return selected
+
+
+# ============ RÈGLES DE DÉCISION ============
+
+# Fichier partagé avec le service Approval (chaque service ne lit que ses sections);
+# vide = règles par défaut ci-dessous
+RULES_FILE = os.getenv("DECISION_RULES_FILE", "")
+
+DEFAULT_RULES = {
+    "version": "défaut",
+    "scoring": {"base": 1000, "debt_weight": 0.1, "late_payment_penalty": 50,
+                "bankruptcy_penalty": 200},
+    "grades": [
+        {"grade": "A+", "min_score": 850},
+        {"grade": "A", "min_score": 800},
+        {"grade": "B", "min_score": 700},
+        {"grade": "C", "min_score": 600},
+        {"grade": "D", "min_score": 0}
+    ],
+    "solvency": {"min_score": 700, "min_monthly_savings": 0}
+}
+
+MAX_SCORE = 1000
+
+# Le score est entier et borné: les 1001 textes sont rendus une fois pour toutes
+SCORE_EXPLANATIONS = tuple(_render_score_explanation(score) for score in range(MAX_SCORE + 1))
+
+
+def _score_threshold(value, what):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= MAX_SCORE:
+        raise ValueError(f"{what}: score entier entre 0 et {MAX_SCORE} attendu ({value!r})")
+    return value
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what}: nombre attendu ({value!r})")
+    return value
+
+
+def scoring_version(scoring):
+    """Empreinte de la section "scoring": même valeur dans Business et dans l'index CRUD"""
+    canonical = json.dumps(scoring, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class DecisionRules:
+    """
+    Règles compilées (immuables): tables indexées par score, évaluées en O(1).
+    - credit_score(...) / credit_scores(...) -> score (formule de la section "scoring")
+    - scoring_version -> empreinte de la formule (comparée à celle de l'index CRUD)
+    - grade_table[score] -> grade
+    - solvent_table[score] -> critère de score de solvabilité satisfait
+    Une nouvelle instance remplace l'ancienne d'un bloc lors d'un rechargement.
+    """
+    
+    def __init__(self, spec, source="défaut", checksum="-"):
+        self.version = str(spec.get("version", "sans version"))
+        self.source = source
+        self.checksum = checksum
+        self.loaded_at = datetime.utcnow()
+        
+        scoring = spec["scoring"]
+        self.score_base = _number(scoring.get("base"), "scoring.base")
+        self.debt_weight = _number(scoring.get("debt_weight"), "scoring.debt_weight")
+        self.late_payment_penalty = _number(scoring.get("late_payment_penalty"),
+                                            "scoring.late_payment_penalty")
+        self.bankruptcy_penalty = _number(scoring.get("bankruptcy_penalty"),
+                                          "scoring.bankruptcy_penalty")
+        self.scoring_version = scoring_version(scoring)
+        
+        grades = spec["grades"]
+        if not isinstance(grades, list) or not grades:
+            raise ValueError("grades: liste non vide attendue")
+        steps = sorted(
+            ((_score_threshold(g.get("min_score"), f"grades[{i}].min_score"), str(g["grade"]))
+             for i, g in enumerate(grades)),
+            reverse=True
+        )
+        if len({threshold for threshold, _ in steps}) != len(steps):
+            raise ValueError("grades: seuils min_score en double")
+        if steps[-1][0] != 0:
+            raise ValueError("grades: un grade avec min_score 0 est requis")
+        self.grade_table = tuple(
+            next(grade for threshold, grade in steps if score >= threshold)
+            for score in range(MAX_SCORE + 1)
+        )
+        
+        solvency = spec["solvency"]
+        min_score = _score_threshold(solvency.get("min_score"), "solvency.min_score")
+        self.min_monthly_savings = _number(solvency.get("min_monthly_savings", 0),
+                                           "solvency.min_monthly_savings")
+        self.solvent_table = tuple(score >= min_score for score in range(MAX_SCORE + 1))
+        
+        # Versions numpy pour le calcul en lot
+        self.grade_array = np.array(self.grade_table)
+        self.solvent_array = np.array(self.solvent_table)
+    
+    def credit_score(self, debt, late_payments, has_bankruptcy):
+        penalty = self.bankruptcy_penalty if has_bankruptcy else 0
+        score = int(self.score_base - self.debt_weight * debt
+                    - self.late_payment_penalty * late_payments - penalty)
+        return max(0, min(MAX_SCORE, score))
+    
+    def credit_scores(self, debt, late_payments, has_bankruptcy):
+        """Version numpy de credit_score (mêmes opérations float64, résultats identiques)"""
+        raw = (self.score_base - self.debt_weight * debt
+               - self.late_payment_penalty * late_payments
+               - np.where(has_bankruptcy, self.bankruptcy_penalty, 0))
+        return np.clip(np.trunc(raw), 0, MAX_SCORE).astype(np.int64)
+    
+    def grade_of(self, score):
+        if 0 <= score <= MAX_SCORE:
+            return self.grade_table[score]
+        return self.grade_table[0 if score < 0 else MAX_SCORE]
+
+
+def load_rules(path=None):
+    """Compile les règles du fichier (sections absentes -> défaut); lève ValueError si invalide"""
+    path = RULES_FILE if path is None else path
+    if not path:
+        return DecisionRules(DEFAULT_RULES)
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        spec = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"JSON invalide: {str(e)}")
+    if not isinstance(spec, dict):
+        raise ValueError("Objet JSON attendu")
+    merged = dict(DEFAULT_RULES, **{k: v for k, v in spec.items() if k in DEFAULT_RULES})
+    try:
+        return DecisionRules(merged, source=path, checksum=hashlib.sha256(raw).hexdigest()[:12])
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Règle incomplète: {str(e)}")
+
+
+def reload_rules(path=None):
+    """Recompile puis remplace les règles actives (les requêtes en cours gardent l'ancienne version)"""
+    global _RULES
+    rules = load_rules(path)
+    _RULES = rules
+    logger.info(f"[Business] ✓ Règles chargées: {rules.version} ({rules.source})")
+    return rules
+
+
+try:
+    _RULES = load_rules()
+except (OSError, ValueError) as e:
+    logger.warning(f"[Business] ⚠️ Règles {RULES_FILE} illisibles ({str(e)}), règles par défaut")
+    _RULES = DecisionRules(DEFAULT_RULES)
+
+
 def _get_grade(score):
-    """Échelle de notation du crédit"""
-    if score >= 850:
-        return "A+"
-    elif score >= 800:
-        return "A"
-    elif score >= 700:
-        return "B"
-    elif score >= 600:
-        return "C"
-    else:
-        return "D"
+    """Échelle de notation du crédit (table compilée des règles actives)"""
+    return _RULES.grade_of(score)
+
+
+def _column(values, dtype):
+    """Colonne numpy; None (champ SOAP absent) -> 0 comme le calcul unitaire"""
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False)
+    return np.array([0 if v is None else v for v in values], dtype=dtype)
+
+
+def compute_credit_scores_batch(debts, late_payments, has_bankruptcy,
+                                monthly_incomes=None, monthly_expenses=None):
+    """
+    Version vectorisée de compute_credit_score / _get_grade / decide_solvency.
+    Même ordre d'opérations en float64 que le calcul unitaire, donc résultats identiques.
+    Accepte des listes ou des tableaux numpy; retourne des tableaux numpy.
+    """
+    if (monthly_incomes is None) != (monthly_expenses is None):
+        raise ValueError("monthly_incomes et monthly_expenses doivent être fournis ensemble")
+    debt = _column(debts, np.float64)
+    late = _column(late_payments, np.int64)
+    bankrupt = _column(has_bankruptcy, bool)
+    
+    rules = _RULES
+    scores = rules.credit_scores(debt, late, bankrupt)
+    grades = rules.grade_array[scores]
+    
+    result = {"scores": scores, "grades": grades}
+    if monthly_incomes is not None:
+        income = _column(monthly_incomes, np.float64)
+        expenses = _column(monthly_expenses, np.float64)
+        result["is_solvent"] = rules.solvent_array[scores] & (
+            income > expenses + rules.min_monthly_savings)
+    return result
 
 
 application = Application(
-    [CreditScoringService, SolvencyDecisionService, ExplanationService],
+    [CreditScoringService, SolvencyDecisionService, ExplanationService, RulesAdminService],
     tns='urn:solvency.verification.business:v1',
     in_protocol=Soap11(validator='lxml'),
     out_protocol=Soap11()
@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
 from spyne import (Application, rpc, ServiceBase, Unicode, Decimal, Boolean, 
-                   Integer, ComplexModel, DateTime)
+                   Integer, ComplexModel, DateTime, Array)
 from spyne.protocol.soap import Soap11
 from spyne.server.wsgi import WsgiApplication
 from spyne.model.fault import Fault
+import bisect
+import calendar
+import csv
+import hashlib
+import heapq
+import json
 import logging
+import math
+import os
 import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
 from datetime import datetime
-from decimal import Decimal as PyDecimal
+from decimal import Decimal as PyDecimal, InvalidOperation
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -41,9 +55,60 @@ class RequestStatus(ComplexModel):
     message = Unicode(min_occurs=1)
 
 
+class LoanRequestSummary(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    correlation_id = Unicode(min_occurs=1)
+    client_id = Unicode
+    status = Unicode(min_occurs=1)
+    created_at = Unicode(min_occurs=1)
+    updated_at = Unicode
+    request_json = Unicode
+
+
+class LoanRequestPage(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    requests = Array(LoanRequestSummary)
+    next_cursor = Unicode
+
+
+class ClientScore(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    client_id = Unicode(min_occurs=1)
+    score = Integer(min_occurs=1)
+    monthly_income = Decimal(min_occurs=1)
+    monthly_expenses = Decimal(min_occurs=1)
+    debt = Decimal(min_occurs=1)
+    late_payments = Integer(min_occurs=1)
+    has_bankruptcy = Boolean(min_occurs=1)
+    computed_at = Unicode(min_occurs=1)
+    is_fresh = Boolean(min_occurs=1)
+    scoring_version = Unicode(min_occurs=1)
+
+
+class ScoreIndexStatus(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    entries = Integer(min_occurs=1)
+    stale_entries = Integer(min_occurs=1)
+    oldest_stale_seconds = Decimal(min_occurs=1)
+    max_age_seconds = Decimal(min_occurs=1)
+    last_rebuild_seconds = Decimal(min_occurs=1)
+    scoring_version = Unicode(min_occurs=1)
+
+
+class ImportReport(ComplexModel):
+    __namespace__ = "urn:solvency.verification.service:v1"
+    rows_read = Integer(min_occurs=1)
+    imported = Integer(min_occurs=1)
+    rejected = Integer(min_occurs=1)
+    batches = Integer(min_occurs=1)
+    elapsed_seconds = Decimal(min_occurs=1)
+    rows_per_second = Decimal(min_occurs=1)
+    rejects_path = Unicode(min_occurs=1)
+
+
 # ============ BASE DE DONNÉES EN MÉMOIRE ============
 
-CLIENTS_DB = {
+_SEED_CLIENTS = {
     "client-001": {
         "identity": {
             "name": "John Doe",
@@ -83,7 +148,985 @@ CLIENTS_DB = {
 
 }
 
-LOAN_REQUESTS_DB = {}
+
+class ClientSnapshot:
+    """
+    Version publiée (immuable) de la table clients.
+    Les enregistrements ne sont jamais modifiés en place: un lecteur qui garde
+    son snapshot voit un état cohérent (identité, finances, crédit) sans verrou.
+    """
+    
+    __slots__ = ("version", "_shards", "_size", "__weakref__")
+    
+    def __init__(self, version, shards, size):
+        self.version = version
+        self._shards = shards
+        self._size = size
+    
+    def __len__(self):
+        return self._size
+    
+    def __contains__(self, client_id):
+        return client_id in self._shards[hash(client_id) % len(self._shards)]
+    
+    def __getitem__(self, client_id):
+        return self._shards[hash(client_id) % len(self._shards)][client_id]
+    
+    def get(self, client_id, default=None):
+        return self._shards[hash(client_id) % len(self._shards)].get(client_id, default)
+    
+    def items(self):
+        for shard in self._shards:
+            yield from shard.items()
+
+
+class VersionedClientStore:
+    """
+    Table clients multi-versions (copy-on-write):
+    - les lecteurs prennent snapshot() (simple lecture de référence, sans verrou)
+    - un écrivain (sérialisé) copie uniquement les shards touchés, construit une
+      nouvelle version puis la publie par affectation atomique
+    - une ancienne version est libérée dès que plus aucun lecteur ne la référence
+    """
+    
+    SHARDS = 256
+    
+    def __init__(self, clients=None):
+        self._write_lock = threading.Lock()
+        self._versions = weakref.WeakSet()
+        self._listeners = []
+        shards = tuple({} for _ in range(self.SHARDS))
+        for client_id, record in (clients or {}).items():
+            shards[hash(client_id) % self.SHARDS][client_id] = record
+        self._current = self._publish(0, shards, len(clients or {}))
+    
+    def snapshot(self):
+        return self._current
+    
+    def live_versions(self):
+        """Nombre de versions encore référencées (courante + lecteurs en cours)"""
+        return len(self._versions)
+    
+    # Lectures ponctuelles sur la version courante
+    def __len__(self):
+        return len(self._current)
+    
+    def __contains__(self, client_id):
+        return client_id in self._current
+    
+    def __getitem__(self, client_id):
+        return self._current[client_id]
+    
+    def get(self, client_id, default=None):
+        return self._current.get(client_id, default)
+    
+    def subscribe(self, listener):
+        """listener(changes) appelé sous le verrou d'écriture, changes = [(id, ancien, nouveau)]"""
+        self._listeners.append(listener)
+    
+    def write(self, updates=None, deletes=()):
+        """Publie une nouvelle version: {client_id: enregistrement} + suppressions"""
+        with self._write_lock:
+            current = self._current
+            shards = list(current._shards)
+            copied = set()
+            changes = []
+            size = len(current)
+            for client_id, record in (updates or {}).items():
+                i = hash(client_id) % self.SHARDS
+                if i not in copied:
+                    shards[i] = dict(shards[i])
+                    copied.add(i)
+                old = shards[i].get(client_id)
+                if old is None:
+                    size += 1
+                shards[i][client_id] = record
+                changes.append((client_id, old, record))
+            for client_id in deletes:
+                i = hash(client_id) % self.SHARDS
+                if client_id not in shards[i]:
+                    continue
+                if i not in copied:
+                    shards[i] = dict(shards[i])
+                    copied.add(i)
+                changes.append((client_id, shards[i].pop(client_id), None))
+                size -= 1
+            self._current = self._publish(current.version + 1, tuple(shards), size)
+            for listener in self._listeners:
+                listener(changes)
+            return self._current
+    
+    def _publish(self, version, shards, size):
+        snapshot = ClientSnapshot(version, shards, size)
+        self._versions.add(snapshot)
+        return snapshot
+
+
+CLIENTS_DB = VersionedClientStore(_SEED_CLIENTS)
+
+
+# ============ RECHERCHE CLIENTS ============
+
+SEARCH_FIELDS = ("name", "email", "address")
+_EMPTY_POSTINGS = frozenset()
+
+
+def _normalize_tokens(text):
+    """Minuscules, sans accents, découpé en tokens alphanumériques"""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _identity_tokens(identity):
+    """Tokens indexés par champ; l'email complet est aussi indexé tel quel"""
+    tokens = {field: set(_normalize_tokens(identity.get(field))) for field in SEARCH_FIELDS}
+    email = str(identity.get("email") or "").strip().lower()
+    if email:
+        tokens["email"].add(email)
+    return tokens
+
+
+class ClientSearchIndex:
+    """
+    Index inversés (token normalisé -> client_ids) sur nom, email et adresse.
+    - mis à jour incrémentalement à chaque écriture de CLIENTS_DB (subscribe)
+    - tokens triés par champ pour la recherche par préfixe (dernier mot saisi)
+    - requête multi-mots = intersection, en partant de l'ensemble le plus petit
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {field: {} for field in SEARCH_FIELDS}
+        self._sorted_tokens = {field: [] for field in SEARCH_FIELDS}
+    
+    def rebuild(self, snapshot):
+        postings = {field: {} for field in SEARCH_FIELDS}
+        for client_id, record in snapshot.items():
+            for field, tokens in _identity_tokens(record["identity"]).items():
+                index = postings[field]
+                for token in tokens:
+                    ids = index.get(token)
+                    if ids is None:
+                        index[token] = {client_id}
+                    else:
+                        ids.add(client_id)
+        with self._lock:
+            self._postings = postings
+            self._sorted_tokens = {field: sorted(postings[field]) for field in SEARCH_FIELDS}
+    
+    def apply(self, changes):
+        """Mise à jour incrémentale: seuls les tokens ajoutés/retirés sont touchés"""
+        with self._lock:
+            for client_id, old, new in changes:
+                old_tokens = _identity_tokens(old["identity"]) if old else {}
+                new_tokens = _identity_tokens(new["identity"]) if new else {}
+                for field in SEARCH_FIELDS:
+                    before = old_tokens.get(field, set())
+                    after = new_tokens.get(field, set())
+                    for token in before - after:
+                        self._remove(field, token, client_id)
+                    for token in after - before:
+                        self._add(field, token, client_id)
+    
+    def search(self, query, field=None, limit=20):
+        """client_ids (triés) dont le champ contient tous les mots, le dernier en préfixe"""
+        fields = (field,) if field else SEARCH_FIELDS
+        query = str(query or "").strip().lower()
+        with self._lock:
+            if "email" in fields and "@" in query:
+                exact = self._postings["email"].get(query)
+                if exact:
+                    return heapq.nsmallest(limit, exact)
+            tokens = _normalize_tokens(query)
+            if not tokens:
+                return []
+            sets = [self._lookup(fields, token, prefix=False) for token in tokens[:-1]]
+            sets.append(self._lookup(fields, tokens[-1], prefix=True))
+            sets.sort(key=len)
+            result = sets[0]
+            for ids in sets[1:]:
+                if not result:
+                    break
+                result = result & ids
+            return heapq.nsmallest(limit, result)
+    
+    def _lookup(self, fields, token, prefix):
+        """Ensemble de client_ids (à ne pas modifier: peut être la posting list elle-même)"""
+        if not prefix and len(fields) == 1:
+            return self._postings[fields[0]].get(token, _EMPTY_POSTINGS)
+        ids = set()
+        for field in fields:
+            if not prefix:
+                ids |= self._postings[field].get(token, _EMPTY_POSTINGS)
+                continue
+            postings, tokens = self._postings[field], self._sorted_tokens[field]
+            for i in range(bisect.bisect_left(tokens, token), len(tokens)):
+                if not tokens[i].startswith(token):
+                    break
+                ids |= postings[tokens[i]]
+        return ids
+    
+    def _add(self, field, token, client_id):
+        ids = self._postings[field].get(token)
+        if ids is None:
+            self._postings[field][token] = {client_id}
+            bisect.insort(self._sorted_tokens[field], token)
+        else:
+            ids.add(client_id)
+    
+    def _remove(self, field, token, client_id):
+        ids = self._postings[field].get(token)
+        if ids is None:
+            return
+        ids.discard(client_id)
+        if not ids:
+            del self._postings[field][token]
+            tokens = self._sorted_tokens[field]
+            del tokens[bisect.bisect_left(tokens, token)]
+
+
+CLIENTS_INDEX = ClientSearchIndex()
+CLIENTS_INDEX.rebuild(CLIENTS_DB.snapshot())
+CLIENTS_DB.subscribe(CLIENTS_INDEX.apply)
+
+
+# ============ INDEX DES SCORES ============
+
+SCORE_INDEX_MAX_AGE_SECONDS = float(os.getenv("CRUD_SCORE_INDEX_MAX_AGE_SECONDS", "86400"))
+SCORE_INDEX_REFRESH_SECONDS = float(os.getenv("CRUD_SCORE_INDEX_REFRESH_SECONDS", "1"))
+
+
+# Formule du score: section "scoring" du fichier de règles partagé avec Business / Approval
+# (vide = formule par défaut ci-dessous)
+RULES_FILE = os.getenv("DECISION_RULES_FILE", "")
+
+DEFAULT_SCORING = {"base": 1000, "debt_weight": 0.1, "late_payment_penalty": 50,
+                   "bankruptcy_penalty": 200}
+
+MAX_SCORE = 1000
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what}: nombre attendu ({value!r})")
+    return value
+
+
+class ScoringRules:
+    """
+    Formule du score compilée (immuable). version = empreinte de la section "scoring",
+    calculée comme dans le service Business: un score indexé n'y est réutilisé que si
+    les deux versions concordent.
+    """
+    
+    def __init__(self, scoring, source="défaut"):
+        self.source = source
+        self.base = _number(scoring.get("base"), "scoring.base")
+        self.debt_weight = _number(scoring.get("debt_weight"), "scoring.debt_weight")
+        self.late_payment_penalty = _number(scoring.get("late_payment_penalty"),
+                                            "scoring.late_payment_penalty")
+        self.bankruptcy_penalty = _number(scoring.get("bankruptcy_penalty"),
+                                          "scoring.bankruptcy_penalty")
+        canonical = json.dumps(scoring, sort_keys=True, separators=(",", ":"))
+        self.version = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+    
+    def score(self, credit):
+        debt_val = float(credit["debt"]) if credit["debt"] else 0
+        late_pay_val = int(credit["late_payments"]) if credit["late_payments"] else 0
+        penalty = self.bankruptcy_penalty if credit["has_bankruptcy"] else 0
+        score = int(self.base - self.debt_weight * debt_val
+                    - self.late_payment_penalty * late_pay_val - penalty)
+        return max(0, min(MAX_SCORE, score))
+
+
+def load_scoring_rules(path=None):
+    """Compile la section "scoring" du fichier (absente -> défaut); lève ValueError si invalide"""
+    path = RULES_FILE if path is None else path
+    if not path:
+        return ScoringRules(DEFAULT_SCORING)
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        spec = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"JSON invalide: {str(e)}")
+    if not isinstance(spec, dict):
+        raise ValueError("Objet JSON attendu")
+    scoring = spec.get("scoring", DEFAULT_SCORING)
+    if not isinstance(scoring, dict):
+        raise ValueError("scoring: objet attendu")
+    return ScoringRules(scoring, source=path)
+
+
+class ScoreIndex:
+    """
+    Table matérialisée client_id -> score et entrées de solvabilité. Le grade n'y figure
+    pas: il dépend des règles du service Business (rechargeables à chaud). Chaque entrée
+    porte la version de la formule qui l'a calculée (set_scoring la change et reconstruit).
+    - construite en une passe sur la table clients (rebuild)
+    - une écriture sur les finances / le crédit d'un client le marque périmé (O(1),
+      n'alourdit pas les imports en masse); refresh() recalcule les seuls clients périmés
+    - une entrée est "fraîche" si elle n'est pas périmée et a moins de max_age_seconds;
+      au-delà, elle est marquée périmée à son tour (file par date de calcul) et recalculée
+    """
+    
+    def __init__(self, store, scoring=None, max_age_seconds=SCORE_INDEX_MAX_AGE_SECONDS,
+                 clock=time.time):
+        self._store = store
+        self.scoring = scoring or ScoringRules(DEFAULT_SCORING)
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        # client_id -> (périmé depuis, n° de la dernière écriture): une entrée ne redevient
+        # fraîche que si aucune écriture n'a suivi le snapshot ayant servi au recalcul
+        self._stale = {}
+        self._writes = 0
+        # (date de calcul, client_id) dans l'ordre des calculs, purgée par la tête
+        self._ages = []
+        self._ages_head = 0
+        self.last_rebuild_seconds = 0.0
+    
+    def rebuild(self):
+        started = time.perf_counter()
+        with self._lock:
+            stale = dict(self._stale)
+        snapshot = self._store.snapshot()
+        now = self._clock()
+        entries = {client_id: self._compute(record, now) for client_id, record in snapshot.items()}
+        with self._lock:
+            self._entries = entries
+            self._ages = [(now, client_id) for client_id in entries]
+            self._ages_head = 0
+            self._clear_stale(stale)
+        self.last_rebuild_seconds = time.perf_counter() - started
+        logger.info(f"[CRUD] ✓ Index des scores: {len(entries)} clients "
+                    f"({self.last_rebuild_seconds * 1000:.0f}ms)")
+    
+    def set_scoring(self, scoring):
+        """Nouvelle formule: l'index est reconstruit si sa version change"""
+        if scoring.version == self.scoring.version:
+            self.scoring = scoring
+            return False
+        self.scoring = scoring
+        self.rebuild()
+        return True
+    
+    def apply(self, changes):
+        """Abonné aux écritures de la table clients"""
+        now = self._clock()
+        with self._lock:
+            for client_id, old, new in changes:
+                if (old is not None and new is not None and old["credit"] == new["credit"]
+                        and old["financials"] == new["financials"]):
+                    continue
+                self._writes += 1
+                since = self._stale.get(client_id, (now, 0))[0]
+                self._stale[client_id] = (since, self._writes)
+    
+    def refresh(self):
+        """Recalcule les clients périmés ou expirés; retourne le nombre d'entrées recalculées"""
+        with self._lock:
+            self._expire(self._clock())
+            stale = dict(self._stale)
+        if not stale:
+            return 0
+        # Snapshot pris après le relevé des clients périmés: il contient leurs écritures
+        snapshot = self._store.snapshot()
+        now = self._clock()
+        updates = {}
+        for client_id in stale:
+            record = snapshot.get(client_id)
+            updates[client_id] = self._compute(record, now) if record is not None else None
+        with self._lock:
+            for client_id, entry in updates.items():
+                if entry is None:
+                    self._entries.pop(client_id, None)
+                else:
+                    self._entries[client_id] = entry
+                    self._ages.append((now, client_id))
+            self._clear_stale(stale)
+        return len(updates)
+    
+    def _expire(self, now):
+        """Marque périmées les entrées calculées il y a plus de max_age_seconds (sous verrou)"""
+        ages, expire_before = self._ages, now - self.max_age_seconds
+        while self._ages_head < len(ages) and ages[self._ages_head][0] < expire_before:
+            computed_at, client_id = ages[self._ages_head]
+            self._ages_head += 1
+            entry = self._entries.get(client_id)
+            # Entrée recalculée depuis (plus récente dans la file) ou déjà périmée: ignorée
+            if entry is None or entry["computed_at"] != computed_at or client_id in self._stale:
+                continue
+            self._writes += 1
+            self._stale[client_id] = (computed_at + self.max_age_seconds, self._writes)
+        if self._ages_head > 1024 and self._ages_head * 2 > len(ages):
+            del ages[:self._ages_head]
+            self._ages_head = 0
+    
+    def _clear_stale(self, stale):
+        """Retire les clients recalculés, sauf ceux réécrits depuis le relevé (sous verrou)"""
+        for client_id, marker in stale.items():
+            if self._stale.get(client_id) == marker:
+                del self._stale[client_id]
+    
+    def get(self, client_id):
+        """(entrée, fraîche?) ou (None, False)"""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is None:
+                return None, False
+            fresh = (client_id not in self._stale
+                     and self._clock() - entry["computed_at"] <= self.max_age_seconds)
+            return entry, fresh
+    
+    def status(self):
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            oldest = min((since for since, _ in self._stale.values()), default=now)
+            return {
+                "entries": len(self._entries),
+                "stale_entries": len(self._stale),
+                "oldest_stale_seconds": now - oldest,
+                "max_age_seconds": self.max_age_seconds,
+                "last_rebuild_seconds": self.last_rebuild_seconds,
+                "scoring_version": self.scoring.version
+            }
+    
+    def _compute(self, record, now):
+        scoring = self.scoring
+        return {
+            "score": scoring.score(record["credit"]),
+            "scoring_version": scoring.version,
+            "monthly_income": record["financials"]["monthly_income"],
+            "monthly_expenses": record["financials"]["monthly_expenses"],
+            "debt": record["credit"]["debt"],
+            "late_payments": record["credit"]["late_payments"],
+            "has_bankruptcy": record["credit"]["has_bankruptcy"],
+            "computed_at": now
+        }
+
+
+try:
+    _SCORING = load_scoring_rules()
+except (OSError, ValueError) as e:
+    logger.warning(f"[CRUD] ⚠️ Règles {RULES_FILE} illisibles ({str(e)}), formule de score par défaut")
+    _SCORING = ScoringRules(DEFAULT_SCORING)
+
+SCORE_INDEX = ScoreIndex(CLIENTS_DB, _SCORING)
+SCORE_INDEX.rebuild()
+CLIENTS_DB.subscribe(SCORE_INDEX.apply)
+
+
+def _score_index_refresher():
+    """Thread de fond: rafraîchit périodiquement les scores périmés"""
+    while True:
+        time.sleep(SCORE_INDEX_REFRESH_SECONDS)
+        try:
+            SCORE_INDEX.refresh()
+        except Exception as e:
+            logger.error(f"[CRUD] ✗ Rafraîchissement index des scores: {str(e)}")
+
+
+# ============ STOCKAGE DES DEMANDES DE PRÊT ============
+
+# Journal append-only (vide = mémoire uniquement, ex: tests unitaires)
+LOAN_REQUESTS_LOG = os.getenv("CRUD_LOAN_REQUESTS_LOG", "")
+LOAN_REQUESTS_MAX_ENTRIES = int(os.getenv("CRUD_LOAN_REQUESTS_MAX_ENTRIES", "100000"))
+LOAN_REQUESTS_TTL_SECONDS = float(os.getenv("CRUD_LOAN_REQUESTS_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+class LoanRequestStore:
+    """
+    Demandes de prêt: journal append-only sur disque + working set borné en mémoire.
+    - Chaque sauvegarde / mise à jour de statut est ajoutée au journal
+    - Le working set est trié par date de création: éviction des plus anciennes
+      au-delà de max_entries ou du TTL
+    - Une demande évincée est archivée avant de quitter la mémoire, dans une base SQLite
+      (<journal>.archive.db, une ligne par demande, remplacée à chaque nouvelle version):
+      get() / update_status() la relisent depuis le disque, rien n'en reste en mémoire
+    - Le journal est compacté (une ligne par demande du working set, les évincées étant
+      dans l'archive) dès qu'il contient plus de compact_ratio fois le nombre de demandes
+      en mémoire; la réécriture tourne en tâche de fond, hors du verrou des écritures
+    - Au redémarrage, le journal est rejoué ligne par ligne (l'archive est relue telle quelle)
+    - Index secondaires maintenus à l'écriture (statut, client, date de création), en
+      mémoire pour le working set et dans l'archive (index SQLite): query() fusionne les
+      deux sans parcourir la table
+    - Clé d'ordre et de pagination stable: (created_ts, correlation_id), indépendante du
+      rechargement et de l'éviction
+    """
+    
+    COMPACT_MIN_RECORDS = 10000
+    
+    def __init__(self, log_path=None, max_entries=LOAN_REQUESTS_MAX_ENTRIES,
+                 ttl_seconds=LOAN_REQUESTS_TTL_SECONDS, compact_ratio=2.0, clock=time.time):
+        self.log_path = log_path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.compact_ratio = compact_ratio
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._records = OrderedDict()
+        self._log = None
+        self._log_records = 0
+        self.evicted = 0
+        # Archive des demandes évincées (SQLite, sur disque uniquement)
+        self._archive = None
+        # Index: listes triées de clés (created_ts, correlation_id);
+        # _created_keys est purgé par la tête (éviction des plus anciennes)
+        self._status_index = {}
+        self._client_index = {}
+        self._created_keys = []
+        self._created_head = 0
+        
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._open_archive()
+            self._replay()
+            self._log = open(log_path, "a", encoding="utf-8")
+            self._maybe_compact()
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def __contains__(self, correlation_id):
+        return correlation_id in self._records
+    
+    @property
+    def archived(self):
+        with self._lock:
+            if self._archive is None:
+                return 0
+            return self._archive.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+    
+    def get(self, correlation_id):
+        with self._lock:
+            self._evict()
+            record = self._records.get(correlation_id)
+            if record is None:
+                record = self._read_archived(correlation_id)
+            return record
+    
+    def save(self, correlation_id, data):
+        now = self._clock()
+        record = {
+            "correlation_id": correlation_id,
+            "status": "REÇUE",
+            "created_at": datetime.utcfromtimestamp(now).isoformat(),
+            "created_ts": now,
+            "data": data
+        }
+        with self._lock:
+            self._append({"op": "save", "record": record})
+            self._unarchive(correlation_id)
+            self._put(record)
+            self._evict()
+            self._maybe_compact()
+        return record
+    
+    def update_status(self, correlation_id, status, data=None):
+        """
+        Retourne la demande mise à jour, ou None si inconnue.
+        data (dict optionnel): champs fusionnés dans les données de la demande (ex: décision)
+        Une demande évincée est mise à jour dans l'archive (nouvelle version ajoutée).
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict()
+            updated_at = datetime.utcfromtimestamp(now).isoformat()
+            record = self._records.get(correlation_id)
+            if record is None:
+                record = self._read_archived(correlation_id)
+                if record is None:
+                    return None
+                _merge_status(record, status, updated_at, data)
+                self._archive_record(record)
+                self._archive.commit()
+                return record
+            entry = {"op": "status", "correlation_id": correlation_id,
+                     "status": status, "updated_at": updated_at}
+            if data:
+                entry["data"] = data
+            self._append(entry)
+            self._set_status(record, status, updated_at, data)
+            self._maybe_compact()
+        return record
+    
+    def query(self, status=None, client_id=None, created_from=None, created_to=None,
+              cursor=None, limit=50):
+        """
+        Demandes filtrées par statut, client et intervalle de création (epoch), dans l'ordre
+        (created_ts, correlation_id), working set et archive confondus.
+        Retourne (demandes, curseur suivant ou None); ValueError si le curseur est invalide.
+        En mémoire, l'index le plus sélectif pilote le parcours, les autres filtres sont
+        vérifiés au vol; dans l'archive, la requête SQL suit l'index correspondant.
+        """
+        after = _parse_cursor(cursor) if cursor else None
+        if created_from is not None and (after is None or after < (created_from,)):
+            # (t,) précède toute clé (t, id): borne inclusive sur created_ts
+            after = (created_from,)
+        with self._lock:
+            self._evict()
+            hot = self._query_hot(status, client_id, after, created_to, limit + 1)
+            cold = self._query_cold(status, client_id, after, created_to, limit + 1)
+        merged = list(heapq.merge(hot, cold, key=_request_key))[:limit + 1]
+        if len(merged) <= limit:
+            return merged, None
+        results = merged[:limit]
+        return results, _format_cursor(_request_key(results[-1]))
+    
+    def compact(self):
+        """
+        Réécrit le journal avec une ligne par demande du working set (remplacement atomique).
+        Seules la copie du working set et la bascule finale se font sous le verrou.
+        """
+        with self._compact_lock:
+            self._compact()
+    
+    def close(self):
+        with self._compact_lock, self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            if self._archive:
+                self._archive.commit()
+                self._archive.close()
+                self._archive = None
+    
+    # --- interne (appelé sous verrou) ---
+    
+    def _query_hot(self, status, client_id, after, created_to, limit):
+        created_keys, head = self._created_keys, self._created_head
+        candidates = [created_keys]
+        if status is not None:
+            candidates.append(self._status_index.get(status, []))
+        if client_id is not None:
+            candidates.append(self._client_index.get(client_id, []))
+        driver = min(candidates, key=len)
+        lo = head if driver is created_keys else 0
+        start = bisect.bisect_right(driver, after, lo) if after is not None else lo
+        
+        results = []
+        for i in range(start, len(driver)):
+            created_ts, correlation_id = driver[i]
+            if created_to is not None and created_ts > created_to:
+                break
+            record = self._records[correlation_id]
+            if status is not None and record["status"] != status:
+                continue
+            if client_id is not None and self._client_of(record) != client_id:
+                continue
+            results.append(record)
+            if len(results) == limit:
+                break
+        return results
+    
+    def _query_cold(self, status, client_id, after, created_to, limit):
+        if self._archive is None:
+            return []
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if client_id is not None:
+            clauses.append("client_id = ?")
+            params.append(client_id)
+        if after is not None:
+            if len(after) == 1:
+                clauses.append("created_ts >= ?")
+            else:
+                clauses.append("(created_ts, correlation_id) > (?, ?)")
+            params.extend(after)
+        if created_to is not None:
+            clauses.append("created_ts <= ?")
+            params.append(created_to)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = self._archive.execute(
+            f"SELECT record FROM requests {where}ORDER BY created_ts, correlation_id LIMIT ?",
+            (*params, limit)
+        )
+        return [json.loads(row[0]) for row in rows]
+    
+    def _put(self, record):
+        self._drop(record["correlation_id"])
+        key = _request_key(record)
+        self._records[record["correlation_id"]] = record
+        _insort(self._created_keys, key)
+        _index_add(self._status_index, record["status"], key)
+        client_id = self._client_of(record)
+        if client_id is not None:
+            _index_add(self._client_index, client_id, key)
+    
+    def _set_status(self, record, status, updated_at, data=None):
+        key = _request_key(record)
+        _index_remove(self._status_index, record["status"], key)
+        _merge_status(record, status, updated_at, data)
+        _index_add(self._status_index, status, key)
+    
+    def _drop(self, correlation_id):
+        record = self._records.pop(correlation_id, None)
+        if record is None:
+            return
+        key = _request_key(record)
+        _index_remove(self._status_index, record["status"], key)
+        client_id = self._client_of(record)
+        if client_id is not None:
+            _index_remove(self._client_index, client_id, key)
+        # Éviction = clé la plus ancienne: la tête avance, la liste est purgée par moitié
+        created_keys = self._created_keys
+        i = bisect.bisect_left(created_keys, key, self._created_head)
+        if i == self._created_head:
+            self._created_head += 1
+        else:
+            del created_keys[i]
+        if self._created_head > 1024 and self._created_head * 2 > len(created_keys):
+            del created_keys[:self._created_head]
+            self._created_head = 0
+    
+    @staticmethod
+    def _client_of(record):
+        data = record.get("data")
+        return data.get("client_id") if isinstance(data, dict) else None
+    
+    def _evict(self):
+        expire_before = self._clock() - self.ttl_seconds
+        records = self._records
+        evicted = self.evicted
+        while records:
+            oldest = records[next(iter(records))]
+            if len(records) <= self.max_entries and oldest["created_ts"] >= expire_before:
+                break
+            self._archive_record(oldest)
+            self._drop(oldest["correlation_id"])
+            self.evicted += 1
+        if self.evicted != evicted and self._archive is not None:
+            self._archive.commit()
+    
+    def _append(self, entry):
+        if self._log is None:
+            return
+        self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log.flush()
+        self._log_records += 1
+    
+    @property
+    def archive_path(self):
+        return f"{self.log_path}.archive.db"
+    
+    def _open_archive(self):
+        # WAL + synchronous=NORMAL: pas de fsync par commit; la compaction force un
+        # checkpoint avant de retirer quoi que ce soit du journal
+        self._archive = sqlite3.connect(self.archive_path, check_same_thread=False)
+        self._archive.execute("PRAGMA journal_mode=WAL")
+        self._archive.execute("PRAGMA synchronous=NORMAL")
+        self._archive.execute(
+            "CREATE TABLE IF NOT EXISTS requests (correlation_id TEXT PRIMARY KEY, "
+            "created_ts REAL NOT NULL, status TEXT, client_id TEXT, record TEXT NOT NULL)"
+        )
+        # Index de query(), même ordre que le working set
+        self._archive.execute("CREATE INDEX IF NOT EXISTS requests_by_created "
+                              "ON requests (created_ts, correlation_id)")
+        self._archive.execute("CREATE INDEX IF NOT EXISTS requests_by_status "
+                              "ON requests (status, created_ts, correlation_id)")
+        self._archive.execute("CREATE INDEX IF NOT EXISTS requests_by_client "
+                              "ON requests (client_id, created_ts, correlation_id)")
+        self._archive.commit()
+    
+    def _archive_record(self, record):
+        """Ajoute ou remplace la demande dans l'archive (commit à la charge de l'appelant)"""
+        if self._archive is None:
+            return
+        self._archive.execute(
+            "INSERT OR REPLACE INTO requests (correlation_id, created_ts, status, client_id, record) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (record["correlation_id"], record["created_ts"], record["status"],
+             self._client_of(record), json.dumps(record, ensure_ascii=False))
+        )
+    
+    def _read_archived(self, correlation_id):
+        if self._archive is None:
+            return None
+        row = self._archive.execute(
+            "SELECT record FROM requests WHERE correlation_id = ?", (correlation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _archived_created_ts(self, correlation_id):
+        if self._archive is None:
+            return None
+        row = self._archive.execute(
+            "SELECT created_ts FROM requests WHERE correlation_id = ?", (correlation_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _unarchive(self, correlation_id):
+        """Demande ré-enregistrée: l'ancienne version archivée ne doit plus être listée"""
+        if self._archived_created_ts(correlation_id) is not None:
+            self._archive.execute("DELETE FROM requests WHERE correlation_id = ?", (correlation_id,))
+            self._archive.commit()
+    
+    def _maybe_compact(self):
+        if (self._log is not None and not self._compacting
+                and self._log_records > self.COMPACT_MIN_RECORDS
+                and self._log_records > self.compact_ratio * len(self._records)):
+            self._compacting = True
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+    
+    # --- compaction (hors verrou, sérialisée par _compact_lock) ---
+    
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"[CRUD] ✗ Compaction du journal: {str(e)}")
+        finally:
+            with self._lock:
+                self._compacting = False
+    
+    def _compact(self):
+        if not self.log_path:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            if self._log is None:
+                return
+            # Copie du working set + position du journal: la suite sera recopiée telle quelle
+            mark = os.path.getsize(self.log_path)
+            snapshot = [dict(record) for record in self._records.values()]
+            before = self._log_records
+        # Les demandes absentes de la copie (évincées et commitées avant elle) ne subsisteront
+        # que dans l'archive: checkpoint complet (WAL + base synchronisés) sur une connexion dédiée
+        checkpoint = sqlite3.connect(self.archive_path)
+        try:
+            busy = checkpoint.execute("PRAGMA wal_checkpoint(FULL)").fetchone()[0]
+        finally:
+            checkpoint.close()
+        if busy:
+            raise RuntimeError("checkpoint de l'archive incomplet, compaction reportée")
+        tmp_path = f"{self.log_path}.compact"
+        with open(tmp_path, "wb") as f:
+            for record in snapshot:
+                f.write((json.dumps({"op": "save", "record": record}, ensure_ascii=False) + "\n")
+                        .encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            with self._lock:
+                if self._log is None:
+                    f.close()
+                    os.remove(tmp_path)
+                    return
+                with open(self.log_path, "rb") as log:
+                    log.seek(mark)
+                    tail = log.read()
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+                self._log.close()
+                os.replace(tmp_path, self.log_path)
+                self._log = open(self.log_path, "a", encoding="utf-8")
+                self._log_records = len(snapshot) + tail.count(b"\n")
+                after = self._log_records
+        logger.info(f"[CRUD] ✓ Journal compacté: {before} -> {after} lignes "
+                    f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+    
+    def _replay(self):
+        if not os.path.exists(self.log_path):
+            return
+        started = time.perf_counter()
+        records = self._records
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée après un arrêt brutal
+                    logger.warning("[CRUD] ⚠️ Ligne de journal illisible ignorée")
+                    continue
+                self._log_records += 1
+                if entry.get("op") == "save":
+                    record = entry["record"]
+                    archived_ts = self._archived_created_ts(record["correlation_id"])
+                    # Demande évincée depuis (ou ré-enregistrée puis évincée): l'archive
+                    # en porte l'état le plus récent
+                    if archived_ts is None or archived_ts < record["created_ts"]:
+                        self._unarchive(record["correlation_id"])
+                        self._put(record)
+                elif entry.get("op") == "status":
+                    record = records.get(entry["correlation_id"])
+                    if record is not None:
+                        self._set_status(record, entry["status"], entry["updated_at"], entry.get("data"))
+                if len(records) > self.max_entries:
+                    self._evict()
+        self._evict()
+        logger.info(f"[CRUD] ✓ Journal rejoué: {len(records)} demandes actives "
+                    f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+
+def _merge_status(record, status, updated_at, data=None):
+    record["status"] = status
+    record["updated_at"] = updated_at
+    if data:
+        # client_id (index client) n'est pas modifiable par une mise à jour
+        record["data"] = dict(record["data"], **{k: v for k, v in data.items() if k != "client_id"})
+
+
+def _request_key(record):
+    return record["created_ts"], record["correlation_id"]
+
+
+def _format_cursor(key):
+    """(created_ts, correlation_id) -> "created_ts:correlation_id" (repr: float exact)"""
+    return f"{key[0]!r}:{key[1]}"
+
+
+def _parse_cursor(cursor):
+    created_ts, sep, correlation_id = cursor.partition(":")
+    try:
+        created_ts = float(created_ts)
+    except ValueError:
+        created_ts = None
+    if not sep or not correlation_id or created_ts is None or not math.isfinite(created_ts):
+        raise ValueError(f"Curseur invalide: '{cursor}'")
+    return created_ts, correlation_id
+
+
+def _insort(keys, key):
+    if not keys or keys[-1] < key:
+        keys.append(key)
+    else:
+        bisect.insort(keys, key)
+
+
+def _index_add(index, value, key):
+    keys = index.get(value)
+    if keys is None:
+        index[value] = [key]
+    else:
+        _insort(keys, key)
+
+
+def _index_remove(index, value, key):
+    keys = index.get(value)
+    if not keys:
+        return
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+        if not keys:
+            del index[value]
+
+
+LOAN_REQUESTS_DB = LoanRequestStore(LOAN_REQUESTS_LOG or None)
+
+LIST_REQUESTS_MAX_LIMIT = 500
+
+IMPORT_BATCH_SIZE = int(os.getenv("CRUD_IMPORT_BATCH_SIZE", "5000"))
+# Seuls les fichiers de ce répertoire sont importables via SOAP (rejets écrits à côté)
+IMPORT_DIR = os.getenv("CRUD_IMPORT_DIR", "/app/data")
 
 
 # ============ SERVICES CRUD ============
@@ -97,11 +1140,12 @@ class ClientDirectoryService(ServiceBase):
             raise Fault("Client.ValidationError", 
                        f"Format clientId invalide. Attendu: client-XXX")
         
-        if client_id not in CLIENTS_DB:
+        snapshot = CLIENTS_DB.snapshot()
+        if client_id not in snapshot:
             raise Fault("Client.NotFound", 
                        f"Client '{client_id}' non trouvé dans le système.")
         
-        data = CLIENTS_DB[client_id]["identity"]
+        data = snapshot[client_id]["identity"]
         logger.info(f"[CRUD] ✓ Client trouvé: {data['name']}")
         
         return ClientIdentity(
@@ -112,6 +1156,40 @@ class ClientDirectoryService(ServiceBase):
         )
 
 
+class ClientSearchService(ServiceBase):
+    @rpc(Unicode, Unicode, Integer, _returns=Array(ClientIdentity))
+    def search_clients(ctx, query, field, limit):
+        """
+        Recherche par email (exact ou mots), nom ou adresse (mots, dernier en préfixe).
+        field: name | email | address (vide = tous les champs)
+        """
+        logger.info(f"[CRUD] SearchClients({field or 'tous'}: {query})")
+        
+        if not query or not query.strip():
+            raise Fault("Client.ValidationError", "Requête de recherche vide")
+        if field and field not in SEARCH_FIELDS:
+            raise Fault("Client.ValidationError", 
+                       f"Champ invalide. Attendu: {', '.join(SEARCH_FIELDS)}")
+        
+        limit = min(max(int(limit or 20), 1), 100)
+        snapshot = CLIENTS_DB.snapshot()
+        results = []
+        for client_id in CLIENTS_INDEX.search(query, field or None, limit):
+            record = snapshot.get(client_id)
+            if record is None:
+                continue
+            data = record["identity"]
+            results.append(ClientIdentity(
+                client_id=client_id,
+                name=data["name"],
+                address=data["address"],
+                email=data["email"]
+            ))
+        
+        logger.info(f"[CRUD] ✓ {len(results)} client(s) trouvé(s)")
+        return results
+
+
 class FinancialDataService(ServiceBase):
     @rpc(Unicode, _returns=Financials)
     def get_client_financials(ctx, client_id):
@@ -120,10 +1198,11 @@ class FinancialDataService(ServiceBase):
         if not _validate_client_id(client_id):
             raise Fault("Client.ValidationError", f"Format clientId invalide")
         
-        if client_id not in CLIENTS_DB:
+        snapshot = CLIENTS_DB.snapshot()
+        if client_id not in snapshot:
             raise Fault("Client.NotFound", f"Client '{client_id}' non trouvé.")
         
-        data = CLIENTS_DB[client_id]["financials"]
+        data = snapshot[client_id]["financials"]
         logger.info(f"[CRUD] ✓ Revenus: ${data['monthly_income']}, "
                    f"Dépenses: ${data['monthly_expenses']}")
         
@@ -141,10 +1220,11 @@ class CreditBureauService(ServiceBase):
         if not _validate_client_id(client_id):
             raise Fault("Client.ValidationError", f"Format clientId invalide")
         
-        if client_id not in CLIENTS_DB:
+        snapshot = CLIENTS_DB.snapshot()
+        if client_id not in snapshot:
             raise Fault("Client.NotFound", f"Client '{client_id}' non trouvé.")
         
-        data = CLIENTS_DB[client_id]["credit"]
+        data = snapshot[client_id]["credit"]
         logger.info(f"[CRUD] ✓ Dettes: ${data['debt']}, "
                    f"Retards: {data['late_payments']}")
         
@@ -155,6 +1235,67 @@ class CreditBureauService(ServiceBase):
         )
 
 
+class ScoreIndexService(ServiceBase):
+    """Scores précalculés (index matérialisé, rafraîchi après chaque écriture client)"""
+    
+    @rpc(Unicode, _returns=ClientScore)
+    def get_client_score(ctx, client_id):
+        logger.info(f"[CRUD] GetClientScore({client_id})")
+        
+        if not _validate_client_id(client_id):
+            raise Fault("Client.ValidationError", f"Format clientId invalide")
+        
+        entry, fresh = SCORE_INDEX.get(client_id)
+        if entry is None:
+            raise Fault("Client.NotFound", f"Client '{client_id}' non trouvé.")
+        
+        logger.info(f"[CRUD] ✓ Score indexé: {entry['score']} ({'à jour' if fresh else 'périmé'})")
+        
+        return ClientScore(
+            client_id=client_id,
+            score=entry["score"],
+            monthly_income=entry["monthly_income"],
+            monthly_expenses=entry["monthly_expenses"],
+            debt=entry["debt"],
+            late_payments=entry["late_payments"],
+            has_bankruptcy=entry["has_bankruptcy"],
+            computed_at=datetime.utcfromtimestamp(entry["computed_at"]).isoformat(),
+            is_fresh=fresh,
+            scoring_version=entry["scoring_version"]
+        )
+    
+    @rpc(_returns=ScoreIndexStatus)
+    def get_score_index_status(ctx):
+        return _score_index_status()
+    
+    @rpc(_returns=ScoreIndexStatus)
+    def reload_scoring_rules(ctx):
+        """Relit la section "scoring" des règles; l'index est reconstruit si la formule change"""
+        logger.info(f"[CRUD] ReloadScoringRules({RULES_FILE or 'défaut'})")
+        try:
+            scoring = load_scoring_rules()
+        except FileNotFoundError as e:
+            raise Fault("Rules.FileNotFound", str(e))
+        except ValueError as e:
+            logger.error(f"[CRUD] ✗ Formule de score refusée: {str(e)}")
+            raise Fault("Rules.ValidationError", str(e))
+        if SCORE_INDEX.set_scoring(scoring):
+            logger.info(f"[CRUD] ✓ Formule de score {scoring.version}: index reconstruit")
+        return _score_index_status()
+
+
+def _score_index_status():
+    status = SCORE_INDEX.status()
+    return ScoreIndexStatus(
+        entries=status["entries"],
+        stale_entries=status["stale_entries"],
+        oldest_stale_seconds=PyDecimal(str(round(status["oldest_stale_seconds"], 3))),
+        max_age_seconds=PyDecimal(str(status["max_age_seconds"])),
+        last_rebuild_seconds=PyDecimal(str(round(status["last_rebuild_seconds"], 3))),
+        scoring_version=status["scoring_version"]
+    )
+
+
 class DataAccessService(ServiceBase):
     """Service d'accès aux données (lecture seule)"""
     
@@ -163,15 +1304,9 @@ class DataAccessService(ServiceBase):
         """Sauvegarde une demande de prêt"""
         logger.info(f"[CRUD] SaveLoanRequest({correlation_id})")
         
-        import json
         try:
             request_data = json.loads(request_json) if isinstance(request_json, str) else request_json
-            LOAN_REQUESTS_DB[correlation_id] = {
-                "correlation_id": correlation_id,
-                "status": "REÇUE",
-                "created_at": datetime.utcnow().isoformat(),
-                "data": request_data
-            }
+            LOAN_REQUESTS_DB.save(correlation_id, request_data)
             logger.info(f"[CRUD] ✓ Demande sauvegardée")
             
             return RequestStatus(
@@ -183,17 +1318,25 @@ class DataAccessService(ServiceBase):
             logger.error(f"[CRUD] ✗ Erreur: {str(e)}")
             raise Fault("Server.StorageError", str(e))
     
-    @rpc(Unicode, Unicode, _returns=RequestStatus)
-    def update_request_status(ctx, correlation_id, status):
-        """Mise à jour du statut de demande"""
+    @rpc(Unicode, Unicode, Unicode, _returns=RequestStatus)
+    def update_request_status(ctx, correlation_id, status, decision_json=None):
+        """
+        Mise à jour du statut de demande
+        decision_json (optionnel): objet JSON fusionné dans les données (montant, valeur, taux...)
+        """
         logger.info(f"[CRUD] UpdateStatus({correlation_id}) -> {status}")
         
-        if correlation_id not in LOAN_REQUESTS_DB:
+        data = None
+        if decision_json:
+            try:
+                data = json.loads(decision_json)
+            except ValueError as e:
+                raise Fault("Request.ValidationError", f"decision_json invalide: {str(e)}")
+            if not isinstance(data, dict):
+                raise Fault("Request.ValidationError", "decision_json: objet JSON attendu")
+        if LOAN_REQUESTS_DB.update_status(correlation_id, status, data) is None:
             raise Fault("Request.NotFound", f"Demande {correlation_id} non trouvée.")
         
-        LOAN_REQUESTS_DB[correlation_id]["status"] = status
-        LOAN_REQUESTS_DB[correlation_id]["updated_at"] = datetime.utcnow().isoformat()
-        
         logger.info(f"[CRUD] ✓ Statut mis à jour: {status}")
         
         return RequestStatus(
@@ -201,6 +1344,82 @@ class DataAccessService(ServiceBase):
             status=status,
             message=f"Statut mis à jour: {status}"
         )
+    
+    @rpc(Unicode, _returns=LoanRequestSummary)
+    def get_loan_request(ctx, correlation_id):
+        """Demande de prêt par correlation_id (working set ou archive des demandes évincées)"""
+        logger.info(f"[CRUD] GetLoanRequest({correlation_id})")
+        
+        record = LOAN_REQUESTS_DB.get(correlation_id)
+        if record is None:
+            raise Fault("Request.NotFound", f"Demande {correlation_id} non trouvée.")
+        return _loan_request_summary(record)
+    
+    @rpc(Unicode, Unicode, DateTime, DateTime, Unicode, Integer, _returns=LoanRequestPage)
+    def list_loan_requests(ctx, status, client_id, created_from, created_to, cursor, limit):
+        """
+        Liste paginée des demandes (ordre de création, demandes archivées comprises), filtres
+        optionnels: statut, client, intervalle created_at (UTC). Passer next_cursor (opaque,
+        stable après redémarrage) pour la page suivante.
+        """
+        logger.info(f"[CRUD] ListLoanRequests(status={status}, client={client_id})")
+        
+        limit = min(max(int(limit or 50), 1), LIST_REQUESTS_MAX_LIMIT)
+        
+        try:
+            records, next_cursor = LOAN_REQUESTS_DB.query(
+                status=status or None,
+                client_id=client_id or None,
+                created_from=_to_epoch(created_from),
+                created_to=_to_epoch(created_to),
+                cursor=cursor or None,
+                limit=limit
+            )
+        except ValueError as e:
+            raise Fault("Request.ValidationError", str(e))
+        logger.info(f"[CRUD] ✓ {len(records)} demande(s)")
+        
+        return LoanRequestPage(
+            requests=[_loan_request_summary(record) for record in records],
+            next_cursor=next_cursor
+        )
+
+
+class ClientImportService(ServiceBase):
+    """Administration: import en masse de clients depuis un fichier CSV/JSONL"""
+    
+    @rpc(Unicode, Integer, _returns=ImportReport)
+    def bulk_import_clients(ctx, file_path, batch_size):
+        """
+        Importe un fichier du répertoire d'import du serveur (CRUD_IMPORT_DIR, ex: clients.csv
+        ou /app/data/clients.csv). Les lignes rejetées sont écrites dans <fichier>.rejects.jsonl
+        """
+        logger.info(f"[CRUD] BulkImportClients({file_path})")
+        
+        import_dir = os.path.realpath(IMPORT_DIR)
+        resolved = os.path.realpath(os.path.join(import_dir, file_path or ""))
+        if os.path.commonpath([import_dir, resolved]) != import_dir:
+            raise Fault("Import.ValidationError", f"Fichier '{file_path}' hors du répertoire d'import.")
+        if not os.path.isfile(resolved):
+            raise Fault("Import.FileNotFound", f"Fichier '{file_path}' introuvable.")
+        
+        try:
+            report = import_clients_file(resolved, batch_size=batch_size or IMPORT_BATCH_SIZE)
+        except ValueError as e:
+            raise Fault("Import.ValidationError", str(e))
+        except Exception as e:
+            logger.error(f"[CRUD] ✗ Import échoué: {str(e)}")
+            raise Fault("Server.ImportError", str(e))
+        
+        return ImportReport(
+            rows_read=report["rows_read"],
+            imported=report["imported"],
+            rejected=report["rejected"],
+            batches=report["batches"],
+            elapsed_seconds=PyDecimal(str(round(report["elapsed_seconds"], 3))),
+            rows_per_second=PyDecimal(str(round(report["rows_per_second"], 1))),
+            rejects_path=report["rejects_path"]
+        )
 
 
 def _validate_client_id(client_id):
@@ -208,8 +1427,184 @@ def _validate_client_id(client_id):
     return bool(re.match(r"^client-\d{3}$", client_id))
 
 
+def _loan_request_summary(record):
+    return LoanRequestSummary(
+        correlation_id=record["correlation_id"],
+        client_id=LoanRequestStore._client_of(record),
+        status=record["status"],
+        created_at=record["created_at"],
+        updated_at=record.get("updated_at"),
+        request_json=json.dumps(record["data"], ensure_ascii=False)
+    )
+
+
+def _to_epoch(value):
+    """DateTime SOAP (naïf = UTC) -> epoch, None si absent"""
+    if value is None:
+        return None
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+# ============ IMPORT EN MASSE ============
+
+def _import_format(file_path):
+    """Format déduit de l'extension: .csv ou .jsonl/.ndjson"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Format non supporté: '{ext}' (attendu .csv ou .jsonl)")
+
+
+def _iter_import_rows(file_path):
+    """
+    Lit le fichier en flux, ligne par ligne: (numéro de ligne, dict ou None, brut).
+    Octets non UTF-8 remplacés par U+FFFD (ligne rejetée, la suite de l'import continue).
+    """
+    if _import_format(file_path) == "csv":
+        with open(file_path, newline="", encoding="utf-8", errors="replace") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, row
+    else:
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            for line_num, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_num, None, line
+                    continue
+                yield line_num, row if isinstance(row, dict) else None, line
+
+
+def _has_decode_error(raw):
+    values = raw.values() if isinstance(raw, dict) else (raw,)
+    return any("\ufffd" in str(value) for value in values)
+
+
+def _parse_amount(row, field):
+    """Montant -> Decimal positif (représentation de CLIENTS_DB)"""
+    raw = row.get(field)
+    try:
+        value = PyDecimal(str(raw).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Montant invalide pour {field}: {raw!r}")
+    if not value.is_finite() or value < 0:
+        raise ValueError(f"Montant invalide pour {field}: {raw!r}")
+    return value
+
+
+def _parse_bool(raw):
+    if isinstance(raw, bool):
+        return raw
+    value = str(raw).strip().lower()
+    if value in ("true", "1", "yes", "oui"):
+        return True
+    if value in ("false", "0", "no", "non"):
+        return False
+    raise ValueError(f"Booléen invalide pour has_bankruptcy: {raw!r}")
+
+
+def _parse_client_row(row):
+    """Valide une ligne d'import et la convertit au format de CLIENTS_DB"""
+    client_id = str(row.get("client_id") or "").strip()
+    if not _validate_client_id(client_id):
+        raise ValueError(f"Format clientId invalide: {client_id!r}")
+    
+    identity = {}
+    for field in ("name", "address", "email"):
+        value = str(row.get(field) or "").strip()
+        if not value:
+            raise ValueError(f"Champ obligatoire manquant: {field}")
+        identity[field] = value
+    
+    try:
+        late_payments = int(str(row.get("late_payments")).strip())
+    except ValueError:
+        raise ValueError(f"Nombre de retards invalide: {row.get('late_payments')!r}")
+    if late_payments < 0:
+        raise ValueError(f"Nombre de retards invalide: {late_payments}")
+    
+    return client_id, {
+        "identity": identity,
+        "financials": {
+            "monthly_income": _parse_amount(row, "monthly_income"),
+            "monthly_expenses": _parse_amount(row, "monthly_expenses")
+        },
+        "credit": {
+            "debt": _parse_amount(row, "debt"),
+            "late_payments": late_payments,
+            "has_bankruptcy": _parse_bool(row.get("has_bankruptcy"))
+        }
+    }
+
+
+def _write_client_batch(batch):
+    """Écrit un lot de clients en une seule transaction"""
+    CLIENTS_DB.write(batch)
+
+
+def import_clients_file(file_path, rejects_path=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import en flux: mémoire bornée par batch_size, quelle que soit la taille du fichier.
+    Retourne un rapport (lignes lues, importées, rejetées, débit en lignes/s).
+    """
+    _import_format(file_path)
+    batch_size = max(1, int(batch_size))
+    rejects_path = rejects_path or f"{file_path}.rejects.jsonl"
+    rows_read = imported = rejected = batches = 0
+    batch = {}
+    started = time.perf_counter()
+    
+    with open(rejects_path, "w", encoding="utf-8") as rejects:
+        for line_num, row, raw in _iter_import_rows(file_path):
+            rows_read += 1
+            try:
+                if row is None:
+                    raise ValueError("Ligne illisible")
+                if _has_decode_error(raw):
+                    raise ValueError("Encodage invalide (UTF-8 attendu)")
+                client_id, record = _parse_client_row(row)
+            except ValueError as e:
+                rejected += 1
+                rejects.write(json.dumps({"line": line_num, "reason": str(e), "row": raw},
+                                         ensure_ascii=False) + "\n")
+                continue
+            
+            batch[client_id] = record
+            imported += 1
+            if len(batch) >= batch_size:
+                _write_client_batch(batch)
+                batches += 1
+                batch = {}
+        
+        if batch:
+            _write_client_batch(batch)
+            batches += 1
+    
+    elapsed = time.perf_counter() - started
+    rate = rows_read / elapsed if elapsed > 0 else 0.0
+    logger.info(f"[CRUD] ✓ Import: {imported} importés, {rejected} rejetés "
+                f"({rate:,.0f} lignes/s)")
+    
+    return {
+        "rows_read": rows_read,
+        "imported": imported,
+        "rejected": rejected,
+        "batches": batches,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": rate,
+        "rejects_path": rejects_path
+    }
+
+
 application = Application(
-    [ClientDirectoryService, FinancialDataService, CreditBureauService, DataAccessService],
+    [ClientDirectoryService, ClientSearchService, FinancialDataService, CreditBureauService,
+     ScoreIndexService, DataAccessService, ClientImportService],
     tns='urn:solvency.verification.crud:v1',
     in_protocol=Soap11(validator='lxml'),
     out_protocol=Soap11()
@@ -217,8 +1612,44 @@ application = Application(
 
 wsgi_application = WsgiApplication(application)
 
+
+def _run_import_cli(args):
+    """
+    Import en ligne de commande via le service en cours d'exécution (seul détenteur de la
+    table clients). args.file est transmis tel quel: nom relatif au répertoire d'import
+    du service (CRUD_IMPORT_DIR), pas un chemin de la machine qui lance la commande.
+    """
+    from spyne.client.http import HttpClient
+    client = HttpClient(args.url, application)
+    result = client.service.bulk_import_clients(args.file, args.batch_size)
+    report = {field: getattr(result, field) for field in ImportReport._type_info}
+    
+    print(f"Lignes lues : {report['rows_read']}")
+    print(f"Importées   : {report['imported']} ({report['batches']} lots)")
+    print(f"Rejetées    : {report['rejected']} -> {report['rejects_path']}")
+    print(f"Débit       : {float(report['rows_per_second']):,.0f} lignes/s "
+          f"({float(report['elapsed_seconds']):.2f}s)")
+
+
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Service CRUD (SOAP) et outils d'administration")
+    subparsers = parser.add_subparsers(dest="command")
+    import_parser = subparsers.add_parser("import", help="Import en masse de clients (CSV/JSONL)")
+    import_parser.add_argument("file", help="Fichier relatif au répertoire d'import du service "
+                                            "(CRUD_IMPORT_DIR), ex: clients.csv")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    import_parser.add_argument("--url", default="http://localhost:5002/",
+                               help="Service CRUD cible (opération bulk_import_clients)")
+    args = parser.parse_args()
+    
+    if args.command == "import":
+        _run_import_cli(args)
+        raise SystemExit(0)
+    
     from wsgiref.simple_server import make_server
+    threading.Thread(target=_score_index_refresher, daemon=True).start()
     logger.info("[CRUD] 🚀 Démarrage sur :5002")
     server = make_server('0.0.0.0', 5002, wsgi_application)
     try:
@@ -53,16 +53,17 @@ class InformationExtractionService(ServiceBase):
                 raise Fault("Property.ValidationError", 
                            "Texte de demande trop court (minimum 20 caractères)")
             
-            if not re.match(r"^client-\d{3}$", client_id):
+            if not CLIENT_ID_PATTERN.match(client_id):
                 raise Fault("Client.ValidationError", 
                            "Format clientId invalide: attendu 'client-XXX'")
             
             text_normalized = request_text.strip()
+            fields = _parse_request(text_normalized)
             extracted = {}
             missing = []
             
             # Extraction Full Name (OPTIONNEL)
-            full_name = _extract_value(text_normalized, r"FULL_NAME\s*:\s*(.+?)(?:\n|$)")
+            full_name = fields.get("full_name")
             if full_name:
                 extracted["full_name"] = full_name
                 logger.info(f"[IE] ✓ Nom: {full_name}")
@@ -71,7 +72,7 @@ class InformationExtractionService(ServiceBase):
                 logger.info(f"[IE] ⚠ Nom non fourni (optionnel)")
             
             # Extraction Loan Amount
-            loan_amount = _extract_number(text_normalized, r"LOAN_AMOUNT\s*:\s*(\d+)")
+            loan_amount = fields.get("loan_amount", 0)
             if loan_amount > 0:
                 extracted["loan_amount"] = PyDecimal(str(loan_amount))
                 logger.info(f"[IE] ✓ Montant prêt: ${loan_amount:,}")
@@ -79,7 +80,7 @@ class InformationExtractionService(ServiceBase):
                 missing.append("montant prêt")
             
             # Extraction Loan Duration
-            loan_duration = _extract_number(text_normalized, r"LOAN_DURATION\s*:\s*(\d+)")
+            loan_duration = fields.get("loan_duration", 0)
             if loan_duration > 0:
                 extracted["loan_duration"] = min(loan_duration, 40)
                 logger.info(f"[IE] ✓ Durée: {loan_duration} ans")
@@ -87,7 +88,7 @@ class InformationExtractionService(ServiceBase):
                 missing.append("durée prêt")
             
             # Extraction Property Address
-            property_address = _extract_value(text_normalized, r"PROPERTY_ADDRESS\s*:\s*(.+?)(?:\n|$)")
+            property_address = fields.get("property_address")
             if property_address:
                 extracted["property_address"] = property_address
                 logger.info(f"[IE] ✓ Adresse: {property_address}")
@@ -95,7 +96,7 @@ class InformationExtractionService(ServiceBase):
                 missing.append("adresse propriété")
             
             # Extraction Property Description
-            property_description = _extract_value(text_normalized, r"PROPERTY_DESCRIPTION\s*:\s*(.+?)(?:\n|$)")
+            property_description = fields.get("property_description")
             if property_description:
                 extracted["property_description"] = property_description
                 logger.info(f"[IE] ✓ Description: {property_description}")
@@ -103,7 +104,7 @@ class InformationExtractionService(ServiceBase):
                 missing.append("description propriété")
             
             # Extraction Property Surface
-            property_surface = _extract_number(text_normalized, r"PROPERTY_SURFACE\s*:\s*(\d+)")
+            property_surface = fields.get("property_surface", 0)
             if property_surface > 0:
                 extracted["property_surface"] = property_surface
                 logger.info(f"[IE] ✓ Surface: {property_surface} m²")
@@ -111,7 +112,7 @@ class InformationExtractionService(ServiceBase):
                 missing.append("surface propriété")
             
             # Extraction Construction Year
-            construction_year = _extract_number(text_normalized, r"CONSTRUCTION_YEAR\s*:\s*(\d{4})")
+            construction_year = fields.get("construction_year", 0)
             if construction_year > 0:
                 extracted["construction_year"] = construction_year
                 logger.info(f"[IE] ✓ Année: {construction_year}")
@@ -146,29 +147,58 @@ class InformationExtractionService(ServiceBase):
             raise Fault("Server.ExtractionError", f"Extraction échouée: {str(e)}")
 
 
-def _extract_value(text, pattern):
-    """Extrait une valeur string du texte selon le pattern"""
-    match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-    if match:
-        try:
-            value = match.group(1).strip()
-            if value:
-                return value
-        except (IndexError, AttributeError):
-            pass
-    return None
+CLIENT_ID_PATTERN = re.compile(r"^client-\d{3}$")
 
+_TEXT_VALUE = re.compile(r"\s*(.+?)(?:\n|$)", re.MULTILINE)
+_NUMBER_VALUE = re.compile(r"\s*(\d+)")
+_YEAR_VALUE = re.compile(r"\s*(\d{4})")
 
-def _extract_number(text, pattern):
-    """Extrait une valeur numérique du texte selon le pattern"""
-    match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-    if match:
-        try:
-            value_str = match.group(1).strip()
-            return int(value_str)
-        except (ValueError, IndexError, AttributeError):
-            pass
-    return 0
+# Clé -> (champ, motif de la valeur lu juste après "KEY:", conversion)
+REQUEST_FIELDS = {
+    "FULL_NAME": ("full_name", _TEXT_VALUE, str.strip),
+    "LOAN_AMOUNT": ("loan_amount", _NUMBER_VALUE, int),
+    "LOAN_DURATION": ("loan_duration", _NUMBER_VALUE, int),
+    "PROPERTY_ADDRESS": ("property_address", _TEXT_VALUE, str.strip),
+    "PROPERTY_DESCRIPTION": ("property_description", _TEXT_VALUE, str.strip),
+    "PROPERTY_SURFACE": ("property_surface", _NUMBER_VALUE, int),
+    "CONSTRUCTION_YEAR": ("construction_year", _YEAR_VALUE, int),
+}
+# Toutes les clés en un seul motif (groupe nommé = clé), sans casse. Chaque clé contient un seul
+# "_", à KEY_PREFIXES caractères de son début: le motif n'est essayé qu'aux occurrences de
+# "_SUFFIXE:" (recherche rapide, préfixe littéral), jamais à chaque position du texte
+_KEY_PATTERN = re.compile("(?:" + "|".join(f"(?P<{key}>{key})" for key in REQUEST_FIELDS) + r")\s*:",
+                          re.IGNORECASE)
+_KEY_SUFFIX = re.compile("_(?:" + "|".join(key.partition("_")[2] for key in REQUEST_FIELDS) + r")\s*:",
+                         re.IGNORECASE)
+KEY_PREFIXES = sorted({key.index("_") for key in REQUEST_FIELDS})
+
+
+def _parse_request(text):
+    """
+    Une seule passe sur le texte: chaque "KEY:" trouvé est aiguillé par dictionnaire vers le
+    motif de sa valeur, lue et convertie sur place; arrêt dès que tous les champs sont lus.
+    Pour chaque champ, la première occurrence dont la valeur a le bon type l'emporte (0 et
+    texte vide compris: champ manquant), comme une recherche re.search par champ.
+    """
+    values = {}
+    for candidate in _KEY_SUFFIX.finditer(text):
+        underscore = candidate.start()
+        for prefix in KEY_PREFIXES:
+            match = _KEY_PATTERN.match(text, underscore - prefix) if underscore >= prefix else None
+            if match is not None:
+                break
+        if match is None:
+            continue
+        name, value_pattern, convert = REQUEST_FIELDS[match.lastgroup]
+        if name in values:
+            continue
+        value = value_pattern.match(text, match.end())
+        if value is None:
+            continue
+        values[name] = convert(value.group(1))
+        if len(values) == len(REQUEST_FIELDS):
+            break
+    return values
 
 
 application = Application(
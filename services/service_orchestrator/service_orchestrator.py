@@ -69,6 +69,9 @@ def _init_clients():
         notification_client = _create_soap_client("http://notification_service:5008/?wsdl", "Notification")
 
 
+VERBOSITY_LEVELS = ("full", "summary")
+
+
 class LoanApplicationResponse(ComplexModel):
     __namespace__ = "urn:solvency.verification.service:v1"
     correlation_id = Unicode(min_occurs=1)
@@ -88,11 +91,20 @@ class SolvencyVerificationService(ServiceBase):
     Séquence: IE → CRUD → Business → Appraisal → Approval → Notification
     """
     
-    @rpc(Unicode, Unicode, _returns=LoanApplicationResponse)
-    def process_loan_request(self, client_id, request_text):
+    @rpc(Unicode, Unicode, Unicode, _returns=LoanApplicationResponse)
+    def process_loan_request(self, client_id, request_text, verbosity=None):
+        """
+        verbosity: "full" (défaut) ou "summary" (sans explications crédit détaillées,
+        l'appel Business.explain est évité; l'explication simple reste envoyée par email)
+        """
         correlation_id = str(uuid.uuid4())[:8].upper()
         logger.info(f"[Orchestrator] 🔄 ProcessLoanRequest({client_id}) - {correlation_id}")
         
+        verbosity = (verbosity or "full").strip().lower()
+        if verbosity not in VERBOSITY_LEVELS:
+            raise Fault("Request.ValidationError",
+                        f"verbosity invalide: {verbosity} (attendu: {', '.join(VERBOSITY_LEVELS)})")
+        
         try:
             _init_clients()
             
@@ -111,6 +123,14 @@ class SolvencyVerificationService(ServiceBase):
                 logger.error(f"[Orchestrator] ✗ Erreur client: {error_msg}")
                 raise Fault("Client.NotFound", error_msg)
             
+            # Suivi de la demande (liste des demandes côté CRUD), non bloquant
+            try:
+                crud_client.service.save_loan_request(
+                    correlation_id, json.dumps({"client_id": client_id})
+                )
+            except ZeepFault as f:
+                logger.warning(f"[Orchestrator] ⚠️ Enregistrement demande échoué: {str(f)}")
+            
             # ===== 2. EXTRACTION PROPRIÉTÉ =====
             try:
                 extracted = ie_client.service.extract_property_info(client_id, request_text)
@@ -131,28 +151,60 @@ class SolvencyVerificationService(ServiceBase):
                 logger.error(f"[Orchestrator] ✗ Extraction échouée: {error_msg}")
                 raise Fault("Property.IncompleteData", error_msg)
             
-            # ===== 3. RÉCUPÉRATION DONNÉES CLIENT =====
+            # ===== 3. DONNÉES PRÉCALCULÉES (index CRUD, si à jour) =====
+            indexed_score = None
             try:
-                financials = crud_client.service.get_client_financials(client_id)
-                credit_history = crud_client.service.get_client_credit_history(client_id)
-                
-                monthly_income = float(safe_attr(financials, "monthly_income", 0))
-                monthly_expenses = float(safe_attr(financials, "monthly_expenses", 0))
-                debt = float(safe_attr(credit_history, "debt", 0))
-                late_payments = int(safe_attr(credit_history, "late_payments", 0))
-                has_bankruptcy = bool(safe_attr(credit_history, "has_bankruptcy", False))
-                
-                logger.info(f"[Orchestrator] ✓ Données client chargées")
+                indexed_score = crud_client.service.get_client_score(client_id)
+                if not safe_attr(indexed_score, "is_fresh", False):
+                    logger.info(f"[Orchestrator] Score indexé périmé, recalcul")
+                    indexed_score = None
             except ZeepFault as f:
-                error_msg = f.message if hasattr(f, 'message') else str(f)
-                logger.error(f"[Orchestrator] ✗ Erreur données: {error_msg}")
-                raise Fault("Client.DataError", error_msg)
+                logger.warning(f"[Orchestrator] ⚠️ Index des scores indisponible: {str(f)}")
+            
+            if indexed_score is not None:
+                monthly_income = float(safe_attr(indexed_score, "monthly_income", 0))
+                monthly_expenses = float(safe_attr(indexed_score, "monthly_expenses", 0))
+                debt = float(safe_attr(indexed_score, "debt", 0))
+                late_payments = int(safe_attr(indexed_score, "late_payments", 0))
+                has_bankruptcy = bool(safe_attr(indexed_score, "has_bankruptcy", False))
+                
+                logger.info(f"[Orchestrator] ✓ Données client (index): score {safe_attr(indexed_score, 'score', 0)}")
+            else:
+                # ===== 3b. RÉCUPÉRATION DONNÉES CLIENT =====
+                try:
+                    financials = crud_client.service.get_client_financials(client_id)
+                    credit_history = crud_client.service.get_client_credit_history(client_id)
+                    
+                    monthly_income = float(safe_attr(financials, "monthly_income", 0))
+                    monthly_expenses = float(safe_attr(financials, "monthly_expenses", 0))
+                    debt = float(safe_attr(credit_history, "debt", 0))
+                    late_payments = int(safe_attr(credit_history, "late_payments", 0))
+                    has_bankruptcy = bool(safe_attr(credit_history, "has_bankruptcy", False))
+                    
+                    logger.info(f"[Orchestrator] ✓ Données client chargées")
+                except ZeepFault as f:
+                    error_msg = f.message if hasattr(f, 'message') else str(f)
+                    logger.error(f"[Orchestrator] ✗ Erreur données: {error_msg}")
+                    raise Fault("Client.DataError", error_msg)
             
             # ===== 4. SCORING CRÉDIT =====
+            # Score indexé si calculé avec la formule des règles actives (scoring_version):
+            # seul le grade est alors demandé au service Business; sinon calcul complet
             try:
-                credit_score_result = business_client.service.compute_credit_score(
-                    client_id, debt, late_payments, has_bankruptcy
-                )
+                credit_score_result = None
+                if indexed_score is not None:
+                    graded = business_client.service.grade_credit_score(
+                        int(safe_attr(indexed_score, "score", 0))
+                    )
+                    if (safe_attr(graded, "scoring_version", None)
+                            == safe_attr(indexed_score, "scoring_version", None)):
+                        credit_score_result = graded
+                    else:
+                        logger.info(f"[Orchestrator] Formule de score modifiée, recalcul")
+                if credit_score_result is None:
+                    credit_score_result = business_client.service.compute_credit_score(
+                        client_id, debt, late_payments, has_bankruptcy
+                    )
                 credit_score = int(safe_attr(credit_score_result, "score", 0))
                 grade = safe_attr(credit_score_result, "grade", "D")
                 
@@ -174,20 +226,22 @@ class SolvencyVerificationService(ServiceBase):
                 raise Fault("Business.DecisionError", str(f))
             
             # ===== 6. EXPLICATIONS CRÉDIT =====
-            try:
-                explanations_result = business_client.service.explain(
-                    credit_score, monthly_income, monthly_expenses, debt, 
-                    late_payments, has_bankruptcy
-                )
-                
-                credit_expl = safe_attr(explanations_result, "credit_score_explanation", "")
-                income_expl = safe_attr(explanations_result, "income_vs_expenses_explanation", "")
-                history_expl = safe_attr(explanations_result, "credit_history_explanation", "")
-                
-                logger.info(f"[Orchestrator] ✓ Explications générées")
-            except ZeepFault as f:
-                logger.error(f"[Orchestrator] ✗ Erreur explications: {str(f)}")
-                raise Fault("Business.ExplanationError", str(f))
+            credit_expl = income_expl = history_expl = ""
+            if verbosity == "full":
+                try:
+                    explanations_result = business_client.service.explain(
+                        credit_score, monthly_income, monthly_expenses, debt, 
+                        late_payments, has_bankruptcy
+                    )
+                    
+                    credit_expl = safe_attr(explanations_result, "credit_score_explanation", "")
+                    income_expl = safe_attr(explanations_result, "income_vs_expenses_explanation", "")
+                    history_expl = safe_attr(explanations_result, "credit_history_explanation", "")
+                    
+                    logger.info(f"[Orchestrator] ✓ Explications générées")
+                except ZeepFault as f:
+                    logger.error(f"[Orchestrator] ✗ Erreur explications: {str(f)}")
+                    raise Fault("Business.ExplanationError", str(f))
             
             # ===== 7. ÉVALUATION PROPRIÉTÉ =====
             property_evaluation_dict = None
@@ -208,15 +262,27 @@ class SolvencyVerificationService(ServiceBase):
                 is_compliant = bool(safe_attr(appraisal_result, "is_compliant", False))
                 valuation_reason = safe_attr(appraisal_result, "valuation_reason", "")
                 appraisal_explanation = valuation_reason
+                # Valeur de repli (état, national) peu fiable: expertise, avec la valeur provisoire
+                evaluation_status = safe_attr(appraisal_result, "evaluation_status", None) or "COMPLETED"
+                expert_review_needed = evaluation_status == "EXPERT_REVIEW"
                 
                 property_evaluation_dict = {
                     "estimated_value": property_value,
                     "is_compliant": is_compliant,
                     "reason": valuation_reason,
-                    "status": "COMPLETED"
+                    "status": evaluation_status,
+                    "confidence": float(safe_attr(appraisal_result, "confidence", None) or 0.0),
+                    "level": safe_attr(appraisal_result, "valuation_level", None) or "city",
+                    "value_low": float(safe_attr(appraisal_result, "value_low", None) or property_value),
+                    "value_high": float(safe_attr(appraisal_result, "value_high", None) or property_value),
+                    "region": safe_attr(appraisal_result, "region", None)
                 }
                 
-                logger.info(f"[Orchestrator] ✓ Appraisal: {property_value}€")
+                if expert_review_needed:
+                    logger.warning(f"[Orchestrator] ⚠️ Expert Review requis (confiance "
+                                   f"{property_evaluation_dict['confidence']:.2f})")
+                else:
+                    logger.info(f"[Orchestrator] ✓ Appraisal: {property_value}€")
                 
             except ZeepFault as f:
                 if "RegionNotFound" in str(f):
@@ -240,12 +306,18 @@ class SolvencyVerificationService(ServiceBase):
             is_compliant = property_evaluation_dict["is_compliant"]
             
             # ===== 8. DÉCISION D'APPROBATION =====
+            monthly_payment = total_interest = post_loan_dti = None
             try:
                 if not expert_review_needed:
+                    # LTV sur la borne basse de l'intervalle d'évaluation
                     approval_result = approval_client.service.approve_loan(
                         credit_score, solvency_status, property_value,
                         property_info_dict["loan_amount"], is_compliant, 
-                        monthly_income, monthly_expenses
+                        monthly_income, monthly_expenses,
+                        property_value_low=property_evaluation_dict.get("value_low"),
+                        loan_duration=property_info_dict["loan_duration"] or None,
+                        region=property_evaluation_dict.get("region"),
+                        correlation_id=correlation_id
                     )
                     
                     approved = bool(safe_attr(approval_result, "approved", False))
@@ -254,6 +326,9 @@ class SolvencyVerificationService(ServiceBase):
                     justification = safe_attr(approval_result, "justification", "")
                     risk_level = safe_attr(approval_result, "risk_level", "HIGH")
                     simple_explanation = safe_attr(approval_result, "simple_explanation", "")
+                    monthly_payment = safe_attr(approval_result, "monthly_payment", None)
+                    total_interest = safe_attr(approval_result, "total_interest", None)
+                    post_loan_dti = safe_attr(approval_result, "post_loan_dti", None)
                     
                     logger.info(f"[Orchestrator] ✓ Décision: {'APPROUVÉE' if approved else 'REJETÉE'}")
                 else:
@@ -273,10 +348,28 @@ class SolvencyVerificationService(ServiceBase):
                 logger.error(f"[Orchestrator] ✗ Erreur approval: {error_msg}")
                 raise Fault("Approval.DecisionError", error_msg)
             
+            status_for_notif = "EXPERT_REVIEW" if expert_review_needed else ("APPROVED" if approved else "REJECTED")
+            
+            # Éléments de la décision conservés avec la demande (stress test du portefeuille)
+            decision_record = {
+                "loan_amount": property_info_dict["loan_amount"],
+                "loan_duration": property_info_dict["loan_duration"],
+                "property_value": property_value,
+                "region": property_evaluation_dict.get("region"),
+                "property_compliant": is_compliant,
+                "credit_score": credit_score,
+                "monthly_income": float(monthly_income),
+                "monthly_expenses": float(monthly_expenses),
+                "interest_rate": interest_rate
+            }
+            try:
+                crud_client.service.update_request_status(correlation_id, status_for_notif,
+                                                          decision_json=json.dumps(decision_record))
+            except ZeepFault as f:
+                logger.warning(f"[Orchestrator] ⚠️ Mise à jour statut échouée: {str(f)}")
+            
             # ===== 9. NOTIFICATION =====
             try:
-                status_for_notif = "EXPERT_REVIEW" if expert_review_needed else ("APPROVED" if approved else "REJECTED")
-                
                 notification_client.service.send_notification(
                     correlation_id, client_id, "", client_email,
                     status_for_notif, simple_explanation
@@ -292,7 +385,10 @@ class SolvencyVerificationService(ServiceBase):
                 "decision": decision,
                 "interest_rate": interest_rate,
                 "justification": justification,
-                "risk_level": risk_level
+                "risk_level": risk_level,
+                "monthly_payment": float(monthly_payment) if monthly_payment is not None else None,
+                "total_interest": float(total_interest) if total_interest is not None else None,
+                "post_loan_dti": float(post_loan_dti) if post_loan_dti is not None else None
             }
             
             credit_assessment_dict = {
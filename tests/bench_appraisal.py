@@ -0,0 +1,446 @@
+# bench_appraisal.py
+"""
+Benchmarks du service Appraisal (hors Docker, en processus).
+
+Exécution:
+  python tests/bench_appraisal.py
+"""
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
+
+from service_appraisal import service_appraisal
+
+
+def _random_sales(count, rnd):
+    return [{"address": "Bench", "price": rnd.randint(150_000, 900_000),
+             "surface": rnd.randint(500, 3000), "year": rnd.randint(1950, 2023)}
+            for _ in range(count)]
+
+
+def bench_market_index(regions=1000, sales_per_region=1000, region_sizes=(3, 10_000, 1_000_000)):
+    """Index de marché: chargement, coût par évaluation et par vente ajoutée selon la taille de la région"""
+    print("Index de marché:")
+    rnd = random.Random(5)
+    data = {f"region{i:04d}": {"comparables": _random_sales(sales_per_region, rnd)}
+            for i in range(regions)}
+    started = time.perf_counter()
+    service_appraisal.MarketIndex.from_regions(data)
+    print(f"- Chargement {regions:,} régions × {sales_per_region:,} ventes: "
+          f"{time.perf_counter() - started:.1f}s")
+    del data
+    
+    service = service_appraisal.AppraisalService()
+    saved_index = service_appraisal.MARKET_INDEX
+    try:
+        for size in region_sizes:
+            sales = _random_sales(size, rnd)
+            service_appraisal.MARKET_INDEX = service_appraisal.MarketIndex.from_regions(
+                {"boston": {"comparables": sales}})
+            repeat = 2000
+            started = time.perf_counter()
+            for _ in range(repeat):
+                service.evaluate_property(None, "123 Main St, Boston MA", "House", "client-001",
+                                          300000, 2000, 2005)
+            indexed_us = (time.perf_counter() - started) / repeat * 1e6
+            # Référence: moyennes recalculées à chaque requête (avant l'index)
+            started = time.perf_counter()
+            sum(c["price"] for c in sales) / len(sales)
+            sum(c["surface"] for c in sales) / len(sales)
+            scan_us = (time.perf_counter() - started) * 1e6
+            
+            batch = _random_sales(1000, rnd)
+            started = time.perf_counter()
+            for i in range(0, len(batch), 100):
+                service_appraisal.MARKET_INDEX.add_sales("boston", batch[i:i + 100])
+            add_us = (time.perf_counter() - started) / len(batch) * 1e6
+            print(f"- Région de {size:>9,} ventes: evaluate_property {indexed_us:6.1f}µs | "
+                  f"recalcul des moyennes seul {scan_us:9.1f}µs | ajout {add_us:6.1f}µs / vente")
+    finally:
+        service_appraisal.MARKET_INDEX = saved_index
+
+
+def bench_comparables(sizes=(1_000, 10_000, 100_000, 1_000_000), queries=2000, k=8):
+    """Latence des k plus proches comparables: KD-tree vs parcours complet vectorisé"""
+    print(f"Comparables (k={k}, {queries:,} requêtes):")
+    rnd = np.random.default_rng(6)
+    for size in sizes:
+        sales = [{"price": p, "surface": s, "year": y} for p, s, y in zip(
+            rnd.integers(150_000, 900_000, size).tolist(), rnd.integers(500, 3000, size).tolist(),
+            rnd.integers(1950, 2024, size).tolist())]
+        started = time.perf_counter()
+        market = service_appraisal.MarketIndex.from_regions({"boston": {"comparables": sales}}).get("boston")
+        build_s = time.perf_counter() - started
+        
+        targets = list(zip(rnd.integers(500, 3000, queries).tolist(), rnd.integers(1950, 2024, queries).tolist()))
+        started = time.perf_counter()
+        for surface, year in targets:
+            market.nearest(surface, year, k)
+        tree_us = (time.perf_counter() - started) / queries * 1e6
+        
+        # Référence: distances à toutes les ventes puis sélection partielle
+        points = np.array([[s["surface"] / 100, s["year"] / 5] for s in sales])
+        started = time.perf_counter()
+        for surface, year in targets[:200]:
+            distances = ((points - (surface / 100, year / 5)) ** 2).sum(axis=1)
+            np.argpartition(distances, k)[:k]
+        scan_us = (time.perf_counter() - started) / 200 * 1e6
+        print(f"- {size:>9,} ventes: KD-tree {tree_us:7.1f}µs | parcours complet {scan_us:9.1f}µs "
+              f"| chargement {build_s:5.1f}s")
+
+
+def _reference_city(address):
+    # Référence: premier mot du dernier segment (avant le normaliseur)
+    last_part = address.lower().split(',')[-1].strip().split()
+    return last_part[0] if last_part else "default"
+
+
+def _address_corpus(count, rnd):
+    """Adresses de formats variés: (adresse, région attendue ou None si hors base)"""
+    spellings = {
+        "boston": ["Boston", "Boston MA", "BOSTON", "Back Bay, Boston"],
+        "nyc": ["NYC", "New York", "New York, NY", "New York City", "Manhattan, NY", "Brooklyn NY"],
+        "la": ["LA", "Los Angeles", "Los Angeles, CA", "Los Ángeles CA", "Hollywood, CA"],
+        None: ["Paris", "Chicago IL", "Lyon", "Austin, TX", "12 rue de la Paix, Paris"],
+    }
+    zips = {"boston": "02116", "nyc": "10001", "la": "90012", None: "60601"}
+    streets = ["Main St", "Elm St", "Oak Ave", "Broadway", "Rue Victor Hugo"]
+    corpus = []
+    for _ in range(count):
+        region = rnd.choice(list(spellings))
+        city = rnd.choice(spellings[region])
+        street = f"{rnd.randint(1, 999)} {rnd.choice(streets)}"
+        template = rnd.randrange(4)
+        if template == 0:
+            address = f"{street}, {city}"
+        elif template == 1:
+            address = f"{street}, {city} {zips[region]}"
+        elif template == 2:
+            address = city
+        else:
+            address = f"{street} {city}"
+        corpus.append((address, region))
+    return corpus
+
+
+def bench_address_normalizer(aliases=100_000, lookups=50_000, corpus_size=5000):
+    """Normaliseur d'adresse: coût par adresse avec 100k alias, taux d'expertises évitables"""
+    print(f"Normaliseur d'adresse ({aliases:,} alias):")
+    rnd = random.Random(8)
+    syllables = ["ber", "lin", "ville", "mont", "port", "san", "ta", "ro", "sa", "field", "ham", "ton"]
+    table = dict(service_appraisal.load_region_aliases())
+    for i in range(aliases):
+        name = " ".join("".join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4)))
+                        for _ in range(rnd.randint(1, 3)))
+        table.setdefault(f"region{i % 5000:04d}", []).append(name)
+    started = time.perf_counter()
+    normalizer = service_appraisal.AddressNormalizer(table)
+    print(f"- Compilation: {(time.perf_counter() - started) * 1000:.0f}ms ({normalizer.size:,} entrées)")
+    
+    corpus = _address_corpus(corpus_size, rnd)
+    addresses = [address for address, _ in corpus] * (lookups // corpus_size)
+    started = time.perf_counter()
+    for address in addresses:
+        normalizer.match(address)
+    trie_us = (time.perf_counter() - started) / len(addresses) * 1e6
+    started = time.perf_counter()
+    for address in addresses:
+        _reference_city(address)
+    reference_us = (time.perf_counter() - started) / len(addresses) * 1e6
+    print(f"- Recherche: trie {trie_us:5.2f}µs | premier mot du dernier segment {reference_us:5.2f}µs / adresse")
+    
+    known = [(address, region) for address, region in corpus if region is not None]
+    unknown = [address for address, region in corpus if region is None]
+    for label, extract in (("avant", _reference_city), ("après", service_appraisal._extract_city_from_address)):
+        reviews = sum(extract(address) not in service_appraisal.MARKET_INDEX for address, _ in known)
+        wrong = sum(extract(address) != region for address, region in known
+                    if extract(address) in service_appraisal.MARKET_INDEX)
+        misrouted = sum(extract(address) in service_appraisal.MARKET_INDEX for address in unknown)
+        print(f"- {label}: expertises inutiles {reviews / len(known):6.1%} | mauvaise région {wrong / len(known):5.1%}"
+              f" | hors base évalués {misrouted / len(unknown):5.1%} ({len(known):,} adresses couvertes)")
+
+
+def _reference_compliance(lexicon, address, description):
+    # Référence: une recherche de sous-chaîne par mot-clé (avant l'automate)
+    text = (address + " " + description).lower()
+    return [keyword for keyword in lexicon if keyword in text]
+
+
+def bench_risk_scanner(lexicon_sizes=(100, 1_000, 5_000, 20_000), properties=2000):
+    """Conformité: automate d'Aho-Corasick vs boucle de recherches, selon la taille du lexique"""
+    print(f"Scanner de conformité ({properties:,} propriétés, adresse + description):")
+    rnd = random.Random(9)
+    words = ["maison", "appartement", "vue", "jardin", "garage", "renovated", "modern", "house",
+             "balcon", "cave", "parking", "sunny", "quiet", "street", "flood", "damage", "plomberie"]
+    texts = [(f"{rnd.randint(1, 999)} Main St, Boston MA",
+              " ".join(rnd.choice(words) for _ in range(rnd.randint(10, 40)))) for _ in range(properties)]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for size in lexicon_sizes:
+        lexicon = list(service_appraisal.RISK_LEXICON)
+        lexicon += ["".join(rnd.choice(letters) for _ in range(rnd.randint(5, 12)))
+                    for _ in range(size - len(lexicon))]
+        started = time.perf_counter()
+        scanner = service_appraisal.RiskScanner(lexicon)
+        build_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        for address, description in texts:
+            scanner.scan(address, description)
+        scan_us = (time.perf_counter() - started) / properties * 1e6
+        started = time.perf_counter()
+        for address, description in texts:
+            _reference_compliance(lexicon, address, description)
+        loop_us = (time.perf_counter() - started) / properties * 1e6
+        print(f"- {size:>6,} termes: automate {scan_us:6.1f}µs | boucle {loop_us:8.1f}µs / propriété "
+              f"| compilation {build_ms:6.0f}ms")
+
+
+def bench_valuation_cache(requests=20_000, properties=2000, repeat_share=0.4):
+    """Cache des évaluations: latence miss vs hit, taux de hit avec resoumissions et ajouts de ventes"""
+    print(f"Cache des évaluations ({requests:,} requêtes, {repeat_share:.0%} de biens déjà évalués):")
+    rnd = random.Random(10)
+    service = service_appraisal.AppraisalService()
+    saved = service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE
+    try:
+        index = service_appraisal.MarketIndex.from_regions(
+            {"boston": {"comparables": _random_sales(100_000, rnd)}})
+        cache = service_appraisal.ValuationCache()
+        index.subscribe(cache.invalidate_region)
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = index, cache
+        
+        listings = [(f"{rnd.randint(1, 9999)} Main St, Boston MA", rnd.randint(500, 3000),
+                     rnd.randint(1970, 2023)) for _ in range(properties)]
+        seen = []
+        timings = {True: [], False: []}
+        for i in range(requests):
+            if i and i % 5000 == 0:
+                index.add_sales("boston", _random_sales(100, rnd))
+            if seen and rnd.random() < repeat_share:
+                listing = rnd.choice(seen)
+            else:
+                listing = rnd.choice(listings)
+                seen.append(listing)
+            hits = cache.hits
+            started = time.perf_counter()
+            service.evaluate_property(None, listing[0], "Maison avec jardin", "client-001",
+                                      300000, listing[1], listing[2])
+            timings[cache.hits > hits].append(time.perf_counter() - started)
+        stats = cache.stats()
+        print(f"- miss {sum(timings[False]) / len(timings[False]) * 1e6:7.1f}µs | "
+              f"hit {sum(timings[True]) / max(1, len(timings[True])) * 1e6:6.1f}µs / évaluation")
+        print(f"- taux de hit {stats['hit_rate']:.1%} | invalidées {stats['invalidated']:,} "
+              f"(ajouts de ventes) | expirées {stats['expired']:,}")
+    finally:
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = saved
+
+
+def bench_valuation_fallback(states=("ma", "ny", "ca", "tx", "il", "wa"), cities_per_state=10,
+                             sales_per_city=200, requests=3000):
+    """Repli hiérarchique: part des dossiers en expertise et erreur de valeur pour des villes hors base"""
+    print(f"Repli hiérarchique ({len(states)} états × {cities_per_state} villes, moitié indexée):")
+    rnd = random.Random(9)
+    truth = {}
+    regions = {}
+    saved_states = dict(service_appraisal.REGION_STATES)
+    for state in states:
+        state_price = rnd.uniform(150, 600)
+        for i in range(cities_per_state):
+            city = f"{state}city{i}"
+            truth[city] = (state, state_price * rnd.uniform(0.85, 1.15))
+            if i % 2 == 0:
+                service_appraisal.REGION_STATES[city] = state
+                regions[city] = {"comparables": [
+                    {"price": truth[city][1] * surface * rnd.uniform(0.9, 1.1), "surface": surface,
+                     "year": rnd.randint(1970, 2023)}
+                    for surface in (rnd.randint(500, 3000) for _ in range(sales_per_city))]}
+    saved_index = service_appraisal.MARKET_INDEX
+    service_appraisal.MARKET_INDEX = service_appraisal.MarketIndex.from_regions(regions)
+    try:
+        service = service_appraisal.AppraisalService()
+        unindexed = [city for city in truth if city not in regions]
+        reviews, errors = 0, []
+        started = time.perf_counter()
+        for _ in range(requests):
+            city = rnd.choice(unindexed)
+            state, price_per_m2 = truth[city]
+            surface = rnd.randint(500, 3000)
+            result = service.evaluate_property(None, f"{rnd.randint(1, 999)} Main St, {city}, {state.upper()}",
+                                               "House", "client-001", 300000, surface, 2015)
+            if result.evaluation_status == "EXPERT_REVIEW":
+                reviews += 1
+            else:
+                errors.append(abs(result.estimated_value / (price_per_m2 * surface) - 1))
+        elapsed_us = (time.perf_counter() - started) / requests * 1e6
+        print(f"- Avant: 100.0% en expertise (RegionNotFound) | après: {reviews / requests:5.1%} en expertise, "
+              f"erreur médiane {np.median(errors) if errors else 0:5.1%} sur les autres | {elapsed_us:6.1f}µs / évaluation")
+    finally:
+        service_appraisal.MARKET_INDEX = saved_index
+        service_appraisal.REGION_STATES.clear()
+        service_appraisal.REGION_STATES.update(saved_states)
+
+
+def _reference_band(surface, age_factor, distances, prices_per_m2, draws, rnd):
+    # Référence: tirages en boucle Python (un comparable repondéré à la fois)
+    weights = [1.0 / (1.0 + d) for d in distances]
+    values = []
+    for _ in range(draws):
+        sampled = [w * rnd.expovariate(1.0) for w in weights]
+        price_per_m2 = sum(w * p for w, p in zip(sampled, prices_per_m2)) / sum(sampled)
+        values.append(price_per_m2 * surface * age_factor * rnd.lognormvariate(0, 0.036))
+    values.sort()
+    return values[int(draws * 0.05)], values[int(draws * 0.95)]
+
+
+def bench_valuation_bands(draws=(1_000, 10_000, 100_000), k=8, repeat=50):
+    """Intervalle d'évaluation Monte-Carlo: coût par évaluation selon le nombre de tirages"""
+    print(f"Intervalles Monte-Carlo ({k} comparables):")
+    rnd = random.Random(10)
+    distances = np.array([rnd.random() for _ in range(k)])
+    prices = np.array([rnd.uniform(300, 500) for _ in range(k)])
+    for count in draws:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            low, high = service_appraisal._valuation_band(1400, 1.0, distances=distances,
+                                                          prices_per_m2=prices, draws=count)
+        vectorized_ms = (time.perf_counter() - started) / repeat * 1000
+        started = time.perf_counter()
+        _reference_band(1400, 1.0, distances.tolist(), prices.tolist(), count, rnd)
+        loop_ms = (time.perf_counter() - started) * 1000
+        print(f"- {count:>7,} tirages: numpy {vectorized_ms:7.2f}ms | boucle {loop_ms:8.1f}ms "
+              f"| intervalle 90% ${low:,} - ${high:,}")
+
+
+def _reference_recent_stats(prices_per_m2, timestamps, now, half_life_seconds):
+    # Référence: décroissance et quantiles recalculés sur toutes les ventes à chaque lot
+    weights = np.exp2(-(now - timestamps) / half_life_seconds)
+    order = np.argsort(prices_per_m2)
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, np.array([0.1, 0.5, 0.9]) * cumulative[-1])
+    return (weights * prices_per_m2).sum() / weights.sum(), prices_per_m2[order][positions]
+
+
+def bench_ingestion(region_sizes=(10_000, 1_000_000), batch_sizes=(1, 100, 10_000), total=20_000):
+    """Ingestion de ventes: débit selon la taille des lots, statistiques glissantes vs recalcul complet"""
+    print("Ingestion de ventes:")
+    rnd = random.Random(8)
+    half_life = service_appraisal.MARKET_HALF_LIFE_DAYS * 86400
+    for size in region_sizes:
+        initial = _random_sales(size, rnd)
+        incoming = _random_sales(total, rnd)
+        for batch_size in batch_sizes:
+            index = service_appraisal.MarketIndex.from_regions({"boston": {"comparables": initial}})
+            batches = max(1, min(total // batch_size, 2000))
+            started = time.perf_counter()
+            for i in range(batches):
+                index.add_sales("boston", incoming[i * batch_size:(i + 1) * batch_size])
+            elapsed = time.perf_counter() - started
+            print(f"- Région de {size:>9,} ventes, lots de {batch_size:>6,}: "
+                  f"{batches * batch_size / elapsed:10,.0f} ventes/s")
+        
+        market = index.get("boston")
+        rolling = service_appraisal.RollingMarketStats(half_life, 0.0)
+        prices = np.array(market._prices_per_m2, dtype=float)
+        timestamps = np.zeros(len(prices))
+        repeat = 200
+        started = time.perf_counter()
+        for i in range(repeat):
+            rolling.add(prices[i * 100:(i + 1) * 100], [2010] * 100, i * 3600.0)
+            rolling.summary()
+        rolling_us = (time.perf_counter() - started) / repeat * 1e6
+        started = time.perf_counter()
+        for i in range(20):
+            _reference_recent_stats(prices, timestamps, i * 3600.0, half_life)
+        full_us = (time.perf_counter() - started) / 20 * 1e6
+        print(f"  statistiques récentes par lot de 100 ({len(prices):,} ventes): "
+              f"glissantes {rolling_us:8.1f}µs | recalcul complet {full_us:10.1f}µs")
+
+
+_WORKER = """
+import json, logging, sys, time
+logging.disable(logging.INFO)
+sys.path.insert(0, {services!r})
+from service_appraisal import service_appraisal
+
+def memory_kib():
+    fields = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Rss"], fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+baseline = memory_kib()
+started = time.perf_counter()
+if {mode!r} == "mmap":
+    index = service_appraisal.MarketIndex.from_file({path!r})
+else:
+    with open({path!r}) as f:
+        index = service_appraisal.MarketIndex.from_regions(json.load(f))
+startup = time.perf_counter() - started
+for i in range(2000):
+    market = index.get("region%04d" % (i % len(index)))
+    market.nearest(500 + i % 2500, 1950 + i % 70)
+    market.stats
+print("ready", flush=True)
+sys.stdin.readline()
+rss, pss, private = (now - before for now, before in zip(memory_kib(), baseline))
+print(json.dumps([startup, rss, pss, private]), flush=True)
+sys.stdin.readline()
+"""
+
+
+def bench_market_data_file(regions=200, sales_per_region=5000, workers=4):
+    """Démarrage et mémoire par worker: JSON parsé à chaque démarrage vs fichier mappé partagé"""
+    print(f"Fichier de marché ({regions:,} régions × {sales_per_region:,} ventes, {workers} workers):")
+    rnd = random.Random(7)
+    data = {f"region{i:04d}": {"comparables": _random_sales(sales_per_region, rnd)} for i in range(regions)}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, mmap_path = f"{tmp}/market.json", f"{tmp}/market.bin"
+        with open(json_path, "w") as f:
+            json.dump(data, f)
+        del data
+        started = time.perf_counter()
+        service_appraisal.convert_market_data(json_path, mmap_path)
+        print(f"- Conversion: {time.perf_counter() - started:.1f}s "
+              f"({Path(json_path).stat().st_size / 2**20:.0f} Mio JSON -> "
+              f"{Path(mmap_path).stat().st_size / 2**20:.0f} Mio)")
+        
+        services = str(Path(__file__).parent.parent / 'services')
+        for mode, path in (("json", json_path), ("mmap", mmap_path)):
+            script = _WORKER.format(services=services, mode=mode, path=path)
+            procs = [subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+            for proc in procs:
+                proc.stdout.readline()
+            results = []
+            for proc in procs:
+                proc.stdin.write("\n")
+                proc.stdin.flush()
+                results.append(json.loads(proc.stdout.readline()))
+            for proc in procs:
+                proc.communicate("\n")
+            startup, rss, pss, private = (sum(values) / workers for values in zip(*results))
+            print(f"- {mode:<4}: démarrage {startup * 1000:8.1f}ms | par worker: RSS {rss / 1024:6.1f} Mio, "
+                  f"PSS {pss / 1024:6.1f} Mio, privé {private / 1024:6.1f} Mio")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    bench_market_index()
+    bench_comparables()
+    bench_address_normalizer()
+    bench_risk_scanner()
+    bench_valuation_cache()
+    bench_ingestion()
+    bench_valuation_fallback()
+    bench_valuation_bands()
+    bench_market_data_file()
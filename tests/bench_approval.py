@@ -0,0 +1,306 @@
+# bench_approval.py
+"""
+Benchmarks du service Approval (hors Docker, en processus).
+
+Exécution:
+  python tests/bench_approval.py
+"""
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
+
+from service_approval import service_approval
+
+
+# Référence: chaînes if/elif écrites à la main (avant le moteur de règles)
+def _reference_decision(credit_score, solvency_status, ltv, dti, property_compliant):
+    if not property_compliant:
+        return False, "TRÈS_ÉLEVÉ", "La propriété ne respecte pas les normes de conformité"
+    if credit_score < 600:
+        return False, "TRÈS_ÉLEVÉ", "Score de crédit insuffisant"
+    if solvency_status != "solvent":
+        return False, "ÉLEVÉ", "Profil de solvabilité insuffisant"
+    if ltv > 95:
+        return False, "ÉLEVÉ", "Ratio LTV trop élevé (> 95%)"
+    if dti > 50:
+        return False, "MOYEN", "Ratio DTI trop élevé (> 50%)"
+    if credit_score >= 800 and ltv <= 80 and dti <= 35:
+        return True, "FAIBLE", "Profil excellent"
+    elif credit_score >= 700 and ltv <= 85 and dti <= 40:
+        return True, "MOYEN", "Profil satisfaisant"
+    elif credit_score >= 650 and ltv <= 90 and dti <= 45:
+        return True, "MOYEN_ÉLEVÉ", "Profil acceptable"
+    else:
+        return True, "ÉLEVÉ", "Profil limité - approbation conditionnelle"
+
+
+def _reference_rate(credit_score, risk_level, ltv, dti):
+    risk_premiums = {"FAIBLE": 0.0, "MOYEN": 0.75, "MOYEN_ÉLEVÉ": 1.5, "ÉLEVÉ": 2.5, "TRÈS_ÉLEVÉ": 4.0}
+    score_adj = (800 - credit_score) / 100 * 0.3
+    ltv_adj = max(0, (ltv - 80) / 100 * 0.2)
+    dti_adj = max(0, (dti - 40) / 100 * 0.15)
+    final_rate = 3.0 + risk_premiums.get(risk_level, 0.0) + score_adj + ltv_adj + dti_adj
+    return max(2.5, min(8.0, final_rate))
+
+
+def _random_applications(count, seed=0):
+    rnd = random.Random(seed)
+    # Valeurs entières fréquentes pour couvrir les bornes exactes des paliers
+    return [(rnd.randint(450, 1000), "solvent" if rnd.random() < 0.85 else "not_solvent",
+             float(rnd.randint(60, 100)) if rnd.random() < 0.3 else rnd.uniform(60, 100),
+             float(rnd.randint(20, 55)) if rnd.random() < 0.3 else rnd.uniform(20, 55),
+             rnd.random() < 0.97)
+            for _ in range(count)]
+
+
+def bench_decision_rules(count=200_000):
+    """Règles compilées vs branches écrites à la main: coût par demande et parité"""
+    print(f"Moteur de règles ({count:,} demandes):")
+    applications = _random_applications(count)
+    
+    def run(decide, rate, *rules):
+        started = time.perf_counter()
+        results = []
+        for score, solvency, ltv, dti, compliant in applications:
+            approved, risk, justification = decide(score, solvency, ltv, dti, compliant, *rules)
+            results.append((approved, risk, justification, rate(score, risk, ltv, dti, *rules)))
+        return (time.perf_counter() - started) / count * 1e9, results
+    
+    reference_ns, expected = run(_reference_decision, _reference_rate)
+    compiled_ns, actual = run(service_approval._make_decision, service_approval._calculate_interest_rate,
+                              service_approval.load_rules())
+    mismatches = sum(a != e for a, e in zip(actual, expected))
+    print(f"- Branches if/elif : {reference_ns:7.0f}ns / demande")
+    print(f"- Règles compilées : {compiled_ns:7.0f}ns / demande | {mismatches} écart(s) de décision/taux")
+    
+    started = time.perf_counter()
+    for _ in range(100):
+        service_approval.load_rules()
+    print(f"- Compilation des règles: {(time.perf_counter() - started) * 10:.2f}ms")
+
+
+def bench_pricing_grid(count=500_000):
+    """Taux: formule recalculée à chaque appel vs grille précalculée; grille publiée"""
+    print(f"Tarification ({count:,} taux):")
+    rnd = random.Random(6)
+    levels = ["FAIBLE", "MOYEN", "MOYEN_ÉLEVÉ", "ÉLEVÉ"]
+    rows = [(rnd.randint(600, 1000), rnd.choice(levels), rnd.uniform(20, 95), rnd.uniform(10, 50))
+            for _ in range(count)]
+    rules = service_approval.load_rules()
+    
+    def timed(rate, *args):
+        started = time.perf_counter()
+        result = [rate(score, risk, ltv, dti, *args) for score, risk, ltv, dti in rows]
+        return (time.perf_counter() - started) / count * 1e9, result
+    
+    reference_ns, expected = timed(_reference_rate)
+    grid_ns, actual = timed(service_approval._calculate_interest_rate, rules)
+    print(f"- Formule : {reference_ns:6.0f}ns / taux")
+    print(f"- Grille  : {grid_ns:6.0f}ns / taux | {sum(a != e for a, e in zip(actual, expected))} écart(s)")
+    
+    started = time.perf_counter()
+    sheet = service_approval.PricingService().get_rate_sheet(None)
+    print(f"- get_rate_sheet: {len(sheet.cells)} cellules en {(time.perf_counter() - started) * 1000:.2f}ms")
+
+
+def bench_what_if_grid(sizes=(10, 100, 300)):
+    """what_if_grid: grille N×N (dette × montant du prêt), calcul seul et opération complète"""
+    print("Grille what-if (dette × montant du prêt):")
+    profile = service_approval.WhatIfProfile(
+        debt=2000, late_payments=1, has_bankruptcy=False, monthly_income=5500,
+        monthly_expenses=2500, loan_amount=300000, property_value=420000, property_compliant=True)
+    base = {"debt": 2000.0, "late_payments": 1, "monthly_income": 5500.0, "monthly_expenses": 2500.0,
+            "loan_amount": 300000.0, "property_value": 420000.0}
+    service = service_approval.ApprovalService()
+    for n in sizes:
+        axes = [service_approval.WhatIfAxis(name="debt", start=0, stop=8000, steps=n),
+                service_approval.WhatIfAxis(name="loan_amount", start=100000, stop=450000, steps=n)]
+        grid_axes = service_approval._grid_axes(axes)
+        repeat = max(1, 20_000 // (n * n))
+        started = time.perf_counter()
+        for _ in range(repeat):
+            service_approval.what_if_grid(base, grid_axes, False, True)
+        compute_ms = (time.perf_counter() - started) / repeat * 1000
+        started = time.perf_counter()
+        service.what_if_grid(None, profile, axes)
+        rpc_ms = (time.perf_counter() - started) * 1000
+        print(f"- {n:>3}×{n:<3} ({n * n:>6,} points): calcul {compute_ms:7.2f}ms | "
+              f"opération (hors SOAP) {rpc_ms:7.2f}ms")
+    
+    # Référence: un appel unitaire par point (sans aller-retour réseau)
+    rules = service_approval.load_rules()
+    started = time.perf_counter()
+    for _ in range(10_000):
+        score = int(1000 - 0.1 * 2000.0 - 50 * 1 - 0)
+        solvency = "solvent" if score >= 700 and 5500.0 > 2500.0 else "not_solvent"
+        approved, risk, _ = service_approval._make_decision(score, solvency, 71.4, 45.4, True, rules)
+        service_approval._calculate_interest_rate(score, risk, 71.4, 45.4, rules)
+    print(f"- Référence boucle unitaire: {(time.perf_counter() - started) * 1000:.1f}ms / 10 000 points "
+          f"(hors 3 allers-retours SOAP par point)")
+
+
+def bench_explanations(requests=50_000):
+    """CPU par requête (hors SOAP) de approve_loan avec et sans explication"""
+    print(f"approve_loan ({requests:,} requêtes):")
+    applications = _random_applications(requests, seed=3)
+    service = service_approval.ApprovalService()
+    for label, include in [("avec explication", True), ("sans explication", False)]:
+        started = time.process_time()
+        for score, solvency, ltv, _, compliant in applications:
+            service.approve_loan(None, score, solvency, 400000, 4000 * ltv, compliant, 5000, 2000,
+                                 include_explanation=include)
+        print(f"- {label:<17}: {(time.process_time() - started) / requests * 1e6:6.2f}µs CPU / requête")
+
+
+def bench_batch_approval(rows=1_000_000, scalar_rows=100_000):
+    """approve_loans_batch (colonnes, 10^6 lignes) vs boucle sur approve_loan, sans SOAP"""
+    print(f"Décisions par lot ({rows:,} demandes):")
+    rnd = np.random.default_rng(7)
+    columns = (rnd.integers(450, 1001, rows), np.where(rnd.random(rows) < 0.85, "solvent", "not_solvent"),
+               rnd.uniform(150_000, 900_000, rows), rnd.uniform(50_000, 600_000, rows), rnd.random(rows) < 0.97,
+               rnd.uniform(2000, 9000, rows), rnd.uniform(500, 4000, rows))
+    durations = rnd.choice([10, 15, 20, 25], rows)
+    
+    started = time.perf_counter()
+    result = service_approval.approve_loans_batch(*columns, loan_durations=durations)
+    batch_s = time.perf_counter() - started
+    print(f"- Vectorisé : {batch_s * 1000:8.1f}ms total | {batch_s / rows * 1e9:6.0f}ns / demande")
+    
+    started = time.perf_counter()
+    service_approval._batch_explanations(
+        {key: value[:scalar_rows] if isinstance(value, np.ndarray) else value for key, value in result.items()})
+    print(f"- Explications (sur demande): {(time.perf_counter() - started) / scalar_rows * 1e9:6.0f}ns / demande")
+    
+    service = service_approval.ApprovalService()
+    rows_list = list(zip(*(c[:scalar_rows].tolist() for c in (*columns, durations))))
+    started = time.perf_counter()
+    mismatches = 0
+    for i, (*row, duration) in enumerate(rows_list):
+        decision = service.approve_loan(None, *row, False, None, duration)
+        mismatches += (decision.approved != result["approved"][i]
+                       or decision.interest_rate != result["interest_rates"][i])
+    scalar_s = time.perf_counter() - started
+    print(f"- Unitaire  : {scalar_s / scalar_rows * 1e9:6.0f}ns / demande (mesuré sur {scalar_rows:,}) | "
+          f"gain x{scalar_s / scalar_rows / (batch_s / rows):.0f} | {mismatches} écart(s)")
+
+
+def bench_exposure(approvals=400_000, regions=100, threads=8):
+    """Agrégats de concentration: coût d'une mise à jour (1 et N threads) et lecture sans parcours"""
+    import threading
+    print(f"Concentration ({approvals:,} approbations, {regions} régions):")
+    rows = [(f"REQ-{i:07d}", f"région-{i % regions}", ("FAIBLE", "MOYEN", "MOYEN_ÉLEVÉ", "ÉLEVÉ")[i % 4],
+             150_000.0 + i, 70.0) for i in range(approvals)]
+    
+    for count in (1, threads):
+        book = service_approval.ExposureBook()
+        share = approvals // count
+        
+        def worker(start):
+            for correlation_id, region, risk, amount, ltv in rows[start:start + share]:
+                book.book(correlation_id, region, risk, amount, ltv, 1e12, 1e12)
+        
+        workers = [threading.Thread(target=worker, args=(i * share,)) for i in range(count)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+        print(f"- Mise à jour ({count} thread(s)): {elapsed / approvals * 1e9:6.0f}ns / approbation")
+    
+    service_approval.EXPOSURE_BOOK = book
+    service = service_approval.ExposureService()
+    started = time.perf_counter()
+    for _ in range(100):
+        service.get_portfolio_exposure(None)
+    print(f"- get_portfolio_exposure: {(time.perf_counter() - started) * 10:.2f}ms (indépendant du nombre de prêts)")
+
+
+def _reference_schedule(principal, annual_rate, years):
+    # Référence: tableau complet matérialisé ligne à ligne
+    rate, months = annual_rate / 1200, years * 12
+    payment = principal * rate / (1 - (1 + rate) ** -months)
+    rows, balance = [], principal
+    for month in range(1, months + 1):
+        interest = balance * rate
+        balance -= payment - interest
+        rows.append({"month": month, "payment": payment, "interest": interest,
+                     "principal": payment - interest, "balance": balance})
+    return rows
+
+
+def bench_amortization(loans=1_000_000, scalar_loans=100_000, schedules=2000):
+    """Mensualités par lot (vectorisé vs boucle) et tableau 40 ans par tranches vs matérialisé"""
+    print(f"Amortissement ({loans:,} prêts):")
+    rnd = np.random.default_rng(4)
+    principals = rnd.uniform(50_000, 900_000, loans)
+    rates = rnd.uniform(2.5, 8.0, loans)
+    years = rnd.integers(5, 41, loans)
+    started = time.perf_counter()
+    service_approval.amortization_terms(principals, rates, years)
+    batch_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for p, r, y in zip(principals[:scalar_loans].tolist(), rates[:scalar_loans].tolist(),
+                       years[:scalar_loans].tolist()):
+        service_approval.amortization_terms(p, r, y)
+    scalar_s = time.perf_counter() - started
+    print(f"- Mensualités: lot {batch_s / loans * 1e9:6.1f}ns / prêt | unitaire "
+          f"{scalar_s / scalar_loans * 1e9:7.1f}ns / prêt")
+    
+    started = time.perf_counter()
+    for _ in range(schedules):
+        _reference_schedule(300_000, 4.0, 40)
+    reference_us = (time.perf_counter() - started) / schedules * 1e6
+    started = time.perf_counter()
+    for _ in range(schedules):
+        next(service_approval.amortization_schedule(300_000, 4.0, 40, first_month=361, chunk_months=12))
+    page_us = (time.perf_counter() - started) / schedules * 1e6
+    started = time.perf_counter()
+    for _ in range(schedules):
+        for _ in service_approval.amortization_schedule(300_000, 4.0, 40):
+            pass
+    chunked_us = (time.perf_counter() - started) / schedules * 1e6
+    print(f"- Tableau 40 ans: matérialisé (480 dicts) {reference_us:7.1f}µs | par tranches de 120 "
+          f"{chunked_us:6.1f}µs | 12 mois à partir du mois 361 {page_us:6.1f}µs")
+
+
+def bench_stress_test(loans=1_000_000, scenarios=50, regions=40):
+    """Stress test: 1M prêts × 50 scénarios, en ligne puis sur le pool de processus"""
+    print(f"Stress test ({loans:,} prêts × {scenarios} scénarios, {regions} régions):")
+    rnd = np.random.default_rng(5)
+    columns = [rnd.uniform(50_000, 400_000, loans), rnd.choice([10.0, 15.0, 20.0, 25.0], loans),
+               rnd.uniform(300_000, 900_000, loans), rnd.integers(650, 1001, loans),
+               rnd.uniform(4000, 9000, loans), rnd.uniform(1000, 3000, loans), rnd.uniform(2.5, 6.0, loans)]
+    portfolio = service_approval.Portfolio(columns, rnd.integers(0, regions, loans).astype(np.int32),
+                                           tuple(f"région-{i}" for i in range(regions)), np.ones(loans, dtype=bool))
+    specs = [{"name": f"s{i}", "rate_bp": 25 * (i % 10), "income_drop_pct": i % 5 * 2,
+              "value_drop_pct": {"*": i % 7 * 3, "région-0": 30}} for i in range(scenarios)]
+    
+    for workers in (1, None):
+        started = time.perf_counter()
+        report = service_approval.stress_test(portfolio, specs, workers=workers)
+        elapsed = time.perf_counter() - started
+        label = "en ligne" if workers == 1 else f"pool ({os.cpu_count()} cœurs)"
+        print(f"- {label:<16}: {elapsed:6.1f}s | {elapsed / loans / scenarios * 1e9:5.1f}ns / prêt×scénario")
+    worst = max(report, key=lambda r: r["rejected"])
+    print(f"- Pire scénario {worst['name']}: {worst['rejected']:,} refus | "
+          f"{worst['negative_equity']:,} en fonds propres négatifs")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    bench_decision_rules()
+    bench_pricing_grid()
+    bench_what_if_grid()
+    bench_explanations()
+    bench_amortization()
+    bench_batch_approval()
+    bench_exposure()
+    bench_stress_test()
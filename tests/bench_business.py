@@ -0,0 +1,132 @@
+# bench_business.py
+"""
+Benchmarks du service Business (hors Docker, en processus).
+
+Exécution:
+  python tests/bench_business.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
+
+from service_business import service_business
+
+
+def _random_profiles(rows, seed=0):
+    rnd = np.random.default_rng(seed)
+    return {
+        "debts": rnd.uniform(0, 20000, rows).round(2),
+        "late_payments": rnd.integers(0, 8, rows),
+        "has_bankruptcy": rnd.random(rows) < 0.05,
+        "monthly_incomes": rnd.uniform(1500, 9000, rows).round(2),
+        "monthly_expenses": rnd.uniform(800, 6000, rows).round(2),
+    }
+
+
+def bench_batch_scoring(rows=1_000_000, scalar_rows=100_000):
+    """Coût par client: compute_credit_scores_batch vs boucle sur le calcul unitaire"""
+    print(f"Scoring crédit ({rows:,} clients):")
+    data = _random_profiles(rows)
+
+    started = time.perf_counter()
+    service_business.compute_credit_scores_batch(**data)
+    batch_s = time.perf_counter() - started
+    print(f"- Vectorisé : {batch_s * 1000:8.1f}ms total | {batch_s / rows * 1e9:8.1f}ns / client")
+
+    service = service_business.CreditScoringService()
+    solvency = service_business.SolvencyDecisionService()
+    started = time.perf_counter()
+    for i in range(scalar_rows):
+        score = service.compute_credit_score(
+            None, "bench", float(data["debts"][i]), int(data["late_payments"][i]),
+            bool(data["has_bankruptcy"][i])
+        )
+        solvency.decide_solvency(None, float(data["monthly_incomes"][i]),
+                                 float(data["monthly_expenses"][i]), score.score)
+    scalar_s = time.perf_counter() - started
+    print(f"- Unitaire  : {scalar_s / scalar_rows * 1e9:8.1f}ns / client "
+          f"(mesuré sur {scalar_rows:,}, sans SOAP) | gain x{scalar_s / scalar_rows / (batch_s / rows):.0f}")
+
+
+def _reference_grade(score):
+    # Référence: chaîne if/elif écrite à la main (avant le moteur de règles)
+    if score >= 850:
+        return "A+"
+    elif score >= 800:
+        return "A"
+    elif score >= 700:
+        return "B"
+    elif score >= 600:
+        return "C"
+    else:
+        return "D"
+
+
+def bench_decision_rules(count=500_000):
+    """Grade + solvabilité: tables compilées vs branches écrites à la main (mêmes sites d'appel)"""
+    print(f"Moteur de règles ({count:,} profils):")
+    data = _random_profiles(count, seed=1)
+    scores = service_business.compute_credit_scores_batch(
+        data["debts"], data["late_payments"], data["has_bankruptcy"])["scores"]
+    rows = list(zip(scores.tolist(), data["monthly_incomes"].tolist(), data["monthly_expenses"].tolist()))
+    rules = service_business.load_rules()
+    
+    def timed(fn):
+        started = time.perf_counter()
+        result = fn()
+        return (time.perf_counter() - started) / count * 1e9, result
+    
+    # compute_credit_score: score déjà borné à [0, 1000]
+    reference_ns, expected = timed(lambda: [_reference_grade(s) for s, _, _ in rows])
+    compiled_ns, actual = timed(lambda: [rules.grade_table[s] for s, _, _ in rows])
+    print(f"- Grade       : if/elif {reference_ns:6.0f}ns | table {compiled_ns:6.0f}ns | "
+          f"{sum(a != e for a, e in zip(actual, expected))} écart(s)")
+    
+    # decide_solvency
+    reference_ns, expected = timed(lambda: [s >= 700 and i > e for s, i, e in rows])
+    compiled_ns, actual = timed(lambda: [rules.solvent_table[s] and i > e + rules.min_monthly_savings
+                                         for s, i, e in rows])
+    print(f"- Solvabilité : en ligne {reference_ns:5.0f}ns | règle {compiled_ns:6.0f}ns | "
+          f"{sum(a != e for a, e in zip(actual, expected))} écart(s)")
+    
+    # Lot vectorisé: seuils par searchsorted (avant) vs indexation des tables compilées
+    thresholds, labels = np.array([600, 700, 800, 850]), np.array(["D", "C", "B", "A", "A+"])
+    reference_ns, expected = timed(lambda: labels[np.searchsorted(thresholds, scores, side="right")])
+    compiled_ns, actual = timed(lambda: rules.grade_array[scores])
+    print(f"- Grade (lot) : searchsorted {reference_ns:4.1f}ns | table {compiled_ns:6.1f}ns | "
+          f"{int((actual != expected).sum())} écart(s)")
+
+
+def bench_explanations(requests=50_000):
+    """CPU par requête (hors SOAP) de explain: tous les champs, sous-ensemble, aucun"""
+    print(f"Explications ({requests:,} requêtes):")
+    rnd = np.random.default_rng(2)
+    rows = list(zip(rnd.integers(300, 1000, requests).tolist(),
+                    rnd.uniform(1500, 9000, requests).round(2).tolist(),
+                    rnd.uniform(800, 6000, requests).round(2).tolist(),
+                    rnd.uniform(0, 20000, requests).round(2).tolist(),
+                    rnd.integers(0, 4, requests).tolist(),
+                    (rnd.random(requests) < 0.05).tolist()))
+    service = service_business.ExplanationService()
+    
+    def cpu_us(**kwargs):
+        started = time.process_time()
+        for row in rows:
+            service.explain(None, *row, **kwargs)
+        return (time.process_time() - started) / requests * 1e6
+    
+    for label, kwargs in [("tous les champs", {}), ("credit seul", {"fields": "credit"})]:
+        print(f"- {label:<16}: {cpu_us(**kwargs):6.2f}µs CPU / requête")
+    print("- aucun (orchestrateur verbosity=summary): appel explain évité")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    bench_batch_scoring()
+    bench_decision_rules()
+    bench_explanations()
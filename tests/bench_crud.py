@@ -0,0 +1,289 @@
+# bench_crud.py
+"""
+Benchmarks du service CRUD (hors Docker, en processus).
+
+Exécution:
+  python tests/bench_crud.py
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
+
+from service_crud import service_crud
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return _max_rss_mb()
+
+
+def _write_clients_csv(path, rows, reject_ratio=0.01):
+    rnd = random.Random(42)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("client_id,name,address,email,monthly_income,monthly_expenses,"
+                "debt,late_payments,has_bankruptcy\n")
+        for i in range(rows):
+            client_id = f"client-{i % 1000:03d}" if rnd.random() > reject_ratio else f"bad-{i}"
+            f.write(f"{client_id},Client {i},{i} Main St,c{i}@example.com,"
+                    f"{rnd.randint(2000, 9000)}.{rnd.randint(0, 99):02d},{rnd.randint(1000, 5000)},"
+                    f"{rnd.randint(0, 30000)},{rnd.randint(0, 6)},{rnd.random() < 0.05}\n")
+
+
+def bench_bulk_import(sizes=(100_000, 1_000_000)):
+    """Débit (lignes/s) et RSS max: la mémoire doit rester plate quand le fichier grossit"""
+    print("Import en masse (CSV):")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"clients_{rows}.csv")
+            _write_clients_csv(path, rows)
+            report = service_crud.import_clients_file(path)
+            print(f"- {rows:>9,} lignes: {report['rows_per_second']:>10,.0f} lignes/s | "
+                  f"{report['rejected']:,} rejets | RSS max {_max_rss_mb():.0f} Mo")
+            os.remove(path)
+
+
+def bench_loan_request_soak(operations=1_000_000, max_entries=10_000, checkpoints=5,
+                            max_growth_mb=1.0):
+    """
+    Soak: save + update en continu. La mémoire Python tracée (tracemalloc) et la taille du
+    journal restent plates (seule l'archive SQLite croît); échoue si la mémoire tracée
+    augmente de plus de max_growth_mb entre le premier et le dernier point de mesure.
+    """
+    print(f"Soak LoanRequestStore ({operations:,} demandes, working set {max_entries:,}):")
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "loan_requests.log")
+        store = service_crud.LoanRequestStore(log_path, max_entries=max_entries)
+        step = operations // checkpoints
+        traced = []
+        tracemalloc.start()
+        started = time.perf_counter()
+        for i in range(operations):
+            correlation_id = f"REQ-{i:08d}"
+            store.save(correlation_id, {"client_id": f"client-{i % 1000:03d}", "loan_amount": 300000})
+            store.update_status(correlation_id, "APPROVED" if i % 3 else "REJECTED")
+            if (i + 1) % step == 0:
+                traced.append(tracemalloc.get_traced_memory()[0] / 1e6)
+                print(f"- {i + 1:>9,} demandes: {len(store):,} en mémoire | "
+                      f"tracé {traced[-1]:.1f} Mo | RSS {_current_rss_mb():.0f} Mo | "
+                      f"journal {os.path.getsize(log_path) / 1e6:.1f} Mo | "
+                      f"archive {os.path.getsize(store.archive_path) / 1e6:.1f} Mo")
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        print(f"- Débit: {2 * operations / elapsed:,.0f} écritures/s (sous tracemalloc)")
+        store.close()
+        growth = traced[-1] - traced[0]
+        assert growth <= max_growth_mb, (
+            f"mémoire tracée en hausse de {growth:.1f} Mo ({traced[0]:.1f} -> {traced[-1]:.1f} Mo)")
+        
+        started = time.perf_counter()
+        replayed = service_crud.LoanRequestStore(log_path, max_entries=max_entries)
+        print(f"- Redémarrage: {len(replayed):,} demandes rejouées, {replayed.archived:,} archivées, en "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms")
+        replayed.close()
+
+
+def _timed(fn, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def bench_loan_request_queries(stored=1_000_000, page=50):
+    """list_loan_requests sur 1M demandes: index secondaires vs parcours complet"""
+    print(f"Requêtes indexées ({stored:,} demandes en mémoire, pages de {page}):")
+    clock_now = [1_700_000_000.0]
+    store = service_crud.LoanRequestStore(max_entries=stored, ttl_seconds=float("inf"),
+                                          clock=lambda: clock_now[0])
+    statuses = ["APPROVED", "REJECTED", "APPROVED", "REJECTED", "EXPERT_REVIEW"]
+    started = time.perf_counter()
+    for i in range(stored):
+        clock_now[0] += 0.5
+        correlation_id = f"REQ-{i:08d}"
+        store.save(correlation_id, {"client_id": f"client-{i % 1000:03d}"})
+        store.update_status(correlation_id, statuses[i % 7 % 5])
+    print(f"- Chargement: {stored / (time.perf_counter() - started):,.0f} demandes/s "
+          f"(save + update, index inclus)")
+    
+    week_start = clock_now[0] - 7 * 24 * 3600
+    scenarios = [
+        ("statut EXPERT_REVIEW", dict(status="EXPERT_REVIEW")),
+        ("client-042", dict(client_id="client-042")),
+        ("client-042 + 7 derniers jours", dict(client_id="client-042", created_from=week_start)),
+        ("EXPERT_REVIEW + 7 derniers jours", dict(status="EXPERT_REVIEW", created_from=week_start)),
+    ]
+    for label, filters in scenarios:
+        ms, (records, cursor) = _timed(lambda: store.query(limit=page, **filters))
+        deep_ms, _ = _timed(lambda: store.query(limit=page, cursor=cursor, **filters))
+        print(f"- {label:<34} {ms:7.3f}ms (page 1) | {deep_ms:7.3f}ms (page 2)")
+    
+    scan_ms, _ = _timed(lambda: [r for r in store._records.values()
+                                 if r["status"] == "EXPERT_REVIEW"][:page], repeat=3)
+    print(f"- Référence: parcours complet EXPERT_REVIEW {scan_ms:.1f}ms")
+
+
+def _consistent_record(i, version):
+    # Invariant vérifié par les lecteurs: dette = 10 × revenu (même version des deux sections)
+    income = service_crud.PyDecimal(1000 + version)
+    return {
+        "identity": {"name": f"Client {i}", "address": f"{i} Main St", "email": f"c{i}@example.com"},
+        "financials": {"monthly_income": income, "monthly_expenses": service_crud.PyDecimal(500)},
+        "credit": {"debt": income * 10, "late_payments": 0, "has_bankruptcy": False}
+    }
+
+
+def bench_snapshot_reads(clients=100_000, readers=4, seconds=3.0, batch_size=5000):
+    """Débit de lecture (snapshot sans verrou) pendant un chargement en masse concurrent"""
+    print(f"Lectures snapshot ({clients:,} clients, {readers} lecteurs):")
+    client_ids = [f"client-{i:06d}" for i in range(clients)]
+    store = service_crud.VersionedClientStore(
+        {cid: _consistent_record(i, 0) for i, cid in enumerate(client_ids)}
+    )
+    
+    def run(with_writer):
+        stop = threading.Event()
+        counts = [0] * readers
+        violations = [0]
+        writes = [0]
+        
+        def reader(slot):
+            rnd = random.Random(slot)
+            n = 0
+            while not stop.is_set():
+                snapshot = store.snapshot()
+                record = snapshot[client_ids[rnd.randrange(clients)]]
+                if record["credit"]["debt"] != record["financials"]["monthly_income"] * 10:
+                    violations[0] += 1
+                n += 1
+            counts[slot] = n
+        
+        def writer():
+            version = 0
+            while not stop.is_set():
+                version += 1
+                start = (version * batch_size) % clients
+                store.write({cid: _consistent_record(start + j, version)
+                             for j, cid in enumerate(client_ids[start:start + batch_size])})
+                writes[0] += batch_size
+        
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        if with_writer:
+            threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        return sum(counts) / seconds, writes[0] / seconds, violations[0]
+    
+    reads, _, _ = run(False)
+    print(f"- Sans écriture : {reads:>12,.0f} lectures/s")
+    reads, writes, violations = run(True)
+    print(f"- Import concurrent: {reads:>9,.0f} lectures/s | {writes:,.0f} clients écrits/s | "
+          f"{violations} lecture(s) incohérente(s) | {store.live_versions()} version(s) vivante(s)")
+
+
+def bench_score_index(clients=1_000_000, updates=10_000):
+    """Index des scores: reconstruction complète vs maintenance incrémentale"""
+    print(f"Index des scores ({clients:,} clients):")
+    rnd = random.Random(3)
+    client_ids = [f"client-{i:07d}" for i in range(clients)]
+    store = service_crud.VersionedClientStore(
+        {cid: _consistent_record(i, rnd.randint(0, 5000)) for i, cid in enumerate(client_ids)}
+    )
+    index = service_crud.ScoreIndex(store)
+    index.rebuild()
+    store.subscribe(index.apply)
+    print(f"- Reconstruction complète: {index.last_rebuild_seconds:.2f}s "
+          f"({index.last_rebuild_seconds / clients * 1e6:.2f}µs / client)")
+    
+    ms, _ = _timed(lambda: index.get(client_ids[rnd.randrange(clients)]), repeat=100_000)
+    print(f"- Lecture d'un score: {ms * 1000:.2f}µs")
+    
+    started = time.perf_counter()
+    for i in range(updates):
+        client_id = client_ids[rnd.randrange(clients)]
+        store.write({client_id: _consistent_record(i, rnd.randint(0, 5000))})
+    write_s = time.perf_counter() - started
+    started = time.perf_counter()
+    refreshed = index.refresh()
+    refresh_s = time.perf_counter() - started
+    print(f"- Incrémental: écriture + marquage {write_s / updates * 1e6:.1f}µs / client | "
+          f"refresh {refresh_s / refreshed * 1e6:.2f}µs / client ({refreshed:,} recalculés)")
+
+
+FIRST_NAMES = ["Alice", "Bob", "Chloé", "David", "Élodie", "Farid", "Gaëlle", "Hugo", "Inès", "Jules"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+              "Leroy", "Moreau", "Simon", "Laurent", "Lefèbvre", "Michel", "Garcia", "Johnson"]
+STREETS = ["Main St", "Elm St", "Oak Ave", "Rue de la Paix", "Boulevard Haussmann", "Pine Rd"]
+CITIES = ["Boston MA", "NYC", "LA", "Paris", "Lyon", "Chicago IL"]
+
+
+def bench_client_search(clients=1_000_000, queries=2000):
+    """search_clients sur 1M clients: latence par type de requête, coût d'une mise à jour"""
+    print(f"Recherche clients ({clients:,} clients):")
+    rnd = random.Random(7)
+    identities = {}
+    for i in range(clients):
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        identities[f"client-{i:07d}"] = {"identity": {
+            "name": f"{first} {last} {i}",
+            "address": f"{rnd.randint(1, 999)} {rnd.choice(STREETS)}, {rnd.choice(CITIES)}",
+            "email": f"{first.lower()}.{last.lower()}{i}@example.com"
+        }}
+    store = service_crud.VersionedClientStore(identities)
+    index = service_crud.ClientSearchIndex()
+    started = time.perf_counter()
+    index.rebuild(store.snapshot())
+    store.subscribe(index.apply)
+    print(f"- Construction de l'index: {time.perf_counter() - started:.1f}s | "
+          f"RSS {_current_rss_mb():.0f} Mo")
+    
+    ids = list(identities)
+    scenarios = [
+        ("email exact", lambda: (identities[rnd.choice(ids)]["identity"]["email"], "email")),
+        ("nom partiel (2 mots, préfixe)", lambda: (f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)[:3]}", "name")),
+        ("nom + numéro", lambda: (identities[rnd.choice(ids)]["identity"]["name"], "name")),
+        ("adresse (tous champs)", lambda: (f"{rnd.randint(1, 999)} oak paris", None)),
+    ]
+    for label, make_query in scenarios:
+        samples = [make_query() for _ in range(queries)]
+        started = time.perf_counter()
+        for query, field in samples:
+            index.search(query, field, 20)
+        print(f"- {label:<30} {(time.perf_counter() - started) / queries * 1000:8.3f}ms / requête")
+    
+    started = time.perf_counter()
+    for i in range(1000):
+        client_id = rnd.choice(ids)
+        identity = dict(identities[client_id]["identity"], name=f"Renamed Client {i}")
+        store.write({client_id: {"identity": identity}})
+    print(f"- Mise à jour incrémentale (écriture + index): "
+          f"{(time.perf_counter() - started):.3f}ms / client")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    bench_bulk_import()
+    bench_loan_request_soak()
+    bench_loan_request_queries()
+    bench_snapshot_reads()
+    bench_client_search()
+    bench_score_index()
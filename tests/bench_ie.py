@@ -0,0 +1,89 @@
+# bench_ie.py
+"""
+Benchmarks du service IE (hors Docker, en processus).
+
+Exécution:
+  python tests/bench_ie.py
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
+
+from service_ie import service_ie
+
+
+REQUEST = """CLIENT_ID: client-002
+FULL_NAME: Jean Dupont
+LOAN_AMOUNT: 350000
+LOAN_DURATION: 20
+PROPERTY_ADDRESS: 456 Elm St, New York, NY 10001
+PROPERTY_DESCRIPTION: Appartement moderne, 3 chambres, balcon, proche des transports
+PROPERTY_SURFACE: 120
+CONSTRUCTION_YEAR: 2015"""
+
+# Référence: un re.search par champ sur tout le texte (avant l'analyseur une passe)
+REFERENCE_PATTERNS = [
+    ("full_name", r"FULL_NAME\s*:\s*(.+?)(?:\n|$)", str.strip),
+    ("loan_amount", r"LOAN_AMOUNT\s*:\s*(\d+)", int),
+    ("loan_duration", r"LOAN_DURATION\s*:\s*(\d+)", int),
+    ("property_address", r"PROPERTY_ADDRESS\s*:\s*(.+?)(?:\n|$)", str.strip),
+    ("property_description", r"PROPERTY_DESCRIPTION\s*:\s*(.+?)(?:\n|$)", str.strip),
+    ("property_surface", r"PROPERTY_SURFACE\s*:\s*(\d+)", int),
+    ("construction_year", r"CONSTRUCTION_YEAR\s*:\s*(\d{4})", int),
+]
+
+
+def _reference_parse(text):
+    values = {}
+    for name, pattern, convert in REFERENCE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            values[name] = convert(match.group(1))
+    return values
+
+
+def _timed_us(parse, text, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = parse(text)
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+
+def bench_parser():
+    """Analyse de la demande: 7 re.search vs une passe compilée, texte réaliste et très long"""
+    print("Analyse des demandes (KEY: VALUE):")
+    filler = "".join(f"Remarque {i}: pièce justificative fournie par le client\n" for i in range(20000))
+    cases = [
+        ("réaliste", REQUEST, 50_000),
+        ("long, champs en tête", REQUEST + "\n" + filler, 50),
+        ("long, champs en fin", filler + REQUEST, 50),
+        ("long, champ manquant", filler + REQUEST.replace("PROPERTY_SURFACE", "SURFACE"), 50),
+        # Pire cas de la passe: un "_" par mot, chacun candidat au début d'une clé
+        ("long, riche en _", filler.replace(" ", "_") + REQUEST, 5),
+    ]
+    for label, text, repeat in cases:
+        text = text.strip()
+        reference_us, expected = _timed_us(_reference_parse, text, repeat)
+        single_us, actual = _timed_us(service_ie._parse_request, text, repeat)
+        parity = "identique" if {k: v for k, v in actual.items() if v} == expected else "ÉCART"
+        print(f"- {label:<22} ({len(text) / 1024:7.1f} Ko): re.search x7 {reference_us:9.1f}µs | "
+              f"une passe {single_us:9.1f}µs | x{reference_us / single_us:5.1f} | {parity}")
+
+
+def bench_extraction(requests=20_000):
+    """CPU par requête (hors SOAP) de extract_property_info"""
+    service = service_ie.InformationExtractionService()
+    started = time.process_time()
+    for _ in range(requests):
+        service.extract_property_info(None, "client-002", REQUEST)
+    print(f"extract_property_info: {(time.process_time() - started) / requests * 1e6:6.1f}µs CPU / requête")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    bench_parser()
+    bench_extraction()
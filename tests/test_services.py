@@ -9,9 +9,16 @@ Exécution:
   python -m pytest tests/test_services.py -v
 """
 
+import argparse
+import gc
+import json
+import math
+import numpy as np
 import pytest
 import sys
+import random
 import re
+from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
 
@@ -19,14 +26,24 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'services'))
 
 from service_crud.service_crud import (
-    ClientDirectoryService, FinancialDataService, CreditBureauService
+    ClientDirectoryService, FinancialDataService, CreditBureauService,
+    ClientSearchService, ClientImportService, DataAccessService, LoanRequestStore,
+    VersionedClientStore, ClientSearchIndex, ScoreIndex, ScoreIndexService, CLIENTS_DB
 )
 from service_business.service_business import (
-    CreditScoringService, SolvencyDecisionService, ExplanationService
+    CreditScoringService, SolvencyDecisionService, ExplanationService,
+    compute_credit_scores_batch
 )
+from service_crud import service_crud
+from service_business import service_business
+from service_approval import service_approval
+from service_appraisal import service_appraisal
+from service_ie import service_ie
 from service_ie.service_ie import InformationExtractionService
-from service_appraisal.service_appraisal import AppraisalService
-from service_approval.service_approval import ApprovalService
+from service_appraisal.service_appraisal import (
+    AppraisalService, MarketDataService, MarketIndex, MarketAggregate
+)
+from service_approval.service_approval import ApprovalService, WhatIfProfile, WhatIfAxis
 
 from spyne.model.fault import Fault
 
@@ -72,6 +89,51 @@ class TestClientDirectoryService:
         assert "Client.ValidationError" in fault.faultcode
 
 
+class TestClientSearchService:
+    """Tests de la recherche client (index inversés)"""
+    
+    def setup_method(self):
+        self.service = ClientSearchService()
+    
+    def test_search_by_exact_email(self):
+        """Email complet → client exact"""
+        results = self.service.search_clients(None, "Alice.Smith@example.com", "email", None)
+        assert [r.client_id for r in results] == ["client-002"]
+    
+    def test_search_by_partial_name(self):
+        """Dernier mot en préfixe: 'jo' → John Doe, Bob Johnson"""
+        results = self.service.search_clients(None, "jo", "name", None)
+        assert [r.client_id for r in results] == ["client-001", "client-003"]
+        
+        results = self.service.search_clients(None, "bob jo", None, None)
+        assert [r.name for r in results] == ["Bob Johnson"]
+    
+    def test_search_invalid_field(self):
+        """Champ inconnu → ValidationError"""
+        with pytest.raises(Fault) as exc_info:
+            self.service.search_clients(None, "doe", "phone", None)
+        
+        assert "Client.ValidationError" in exc_info.value.faultcode
+    
+    def test_index_incremental_update(self):
+        """L'index suit les écritures (ajout, renommage, accents)"""
+        identity = {"name": "Éloïse Dupré", "address": "1 Rue de la Paix", "email": "e@example.com"}
+        store = VersionedClientStore()
+        index = ClientSearchIndex()
+        index.rebuild(store.snapshot())
+        store.subscribe(index.apply)
+        
+        store.write({"client-500": {"identity": identity}})
+        assert index.search("eloise dupre") == ["client-500"]
+        
+        store.write({"client-500": {"identity": dict(identity, name="Eloise Martin")}})
+        assert index.search("dupre", "name") == []
+        assert index.search("mart", "name") == ["client-500"]
+        
+        store.write(deletes=("client-500",))
+        assert index.search("paix") == []
+
+
 class TestFinancialDataService:
     """Tests du service de données financières"""
     
@@ -131,6 +193,489 @@ class TestCreditBureauService:
         assert result.has_bankruptcy == False
 
 
+class TestClientImportService:
+    """Tests de l'import en masse de clients"""
+    
+    CSV_HEADER = ("client_id,name,address,email,monthly_income,monthly_expenses,"
+                  "debt,late_payments,has_bankruptcy\n")
+    
+    @pytest.fixture(autouse=True)
+    def _import_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(service_crud, "IMPORT_DIR", str(tmp_path))
+    
+    def setup_method(self):
+        self.service = ClientImportService()
+    
+    def teardown_method(self):
+        CLIENTS_DB.write(deletes=("client-901", "client-902", "client-903"))
+    
+    def test_bulk_import_csv(self, tmp_path):
+        """Import CSV → clients lisibles, montants en Decimal"""
+        path = tmp_path / "clients.csv"
+        path.write_text(
+            self.CSV_HEADER
+            + "client-901,Eve Martin,1 Rue A,eve@example.com,4200.50,1800,0,0,false\n"
+            + "client-902,Paul Durand,2 Rue B,paul@example.com,3000,2900,12000,3,true\n",
+            encoding="utf-8"
+        )
+        
+        report = self.service.bulk_import_clients(None, str(path), 1)
+        
+        assert report.imported == 2
+        assert report.rejected == 0
+        assert report.batches == 2
+        assert CLIENTS_DB["client-901"]["financials"]["monthly_income"] == Decimal("4200.50")
+        assert CLIENTS_DB["client-902"]["credit"]["has_bankruptcy"] == True
+        
+        identity = ClientDirectoryService().get_client_identity(None, "client-902")
+        assert identity.name == "Paul Durand"
+    
+    def test_bulk_import_jsonl_rejects(self, tmp_path):
+        """Lignes invalides → fichier de rejets, les autres sont importées"""
+        path = tmp_path / "clients.jsonl"
+        path.write_bytes(
+            b'{"client_id": "client-902", "name": "Bad \xe9ncoding", "address": "2 Rue B", '
+            b'"email": "bad@example.com", "monthly_income": 5000, "monthly_expenses": 2000, '
+            b'"debt": 0, "late_payments": 0, "has_bankruptcy": false}\n'
+            b'{"client_id": "client-903", "name": "Ana", "address": "3 Rue C", '
+            b'"email": "ana@example.com", "monthly_income": 5000, "monthly_expenses": 2000, '
+            b'"debt": 0, "late_payments": 0, "has_bankruptcy": false}\n'
+            b'{"client_id": "client-1", "name": "Bad"}\n'
+            b'not json\n'
+        )
+        
+        report = self.service.bulk_import_clients(None, "clients.jsonl", None)
+        
+        assert report.rows_read == 4
+        assert report.imported == 1
+        assert report.rejected == 3
+        assert "client-903" in CLIENTS_DB and "client-902" not in CLIENTS_DB
+        assert report.rejects_path == str(tmp_path / "clients.jsonl.rejects.jsonl")
+        lines = Path(report.rejects_path).read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 3
+        assert "Encodage invalide" in lines[0]
+        assert "clientId" in lines[1]
+    
+    def test_bulk_import_file_not_found(self):
+        """Fichier absent → Fault"""
+        with pytest.raises(Fault) as exc_info:
+            self.service.bulk_import_clients(None, "missing.csv", None)
+        
+        assert "Import.FileNotFound" in exc_info.value.faultcode
+    
+    def test_bulk_import_outside_import_dir(self, tmp_path):
+        """Chemin hors du répertoire d'import → Import.ValidationError"""
+        for file_path in ("/etc/passwd", "../clients.csv", str(tmp_path / ".." / "clients.csv")):
+            with pytest.raises(Fault) as exc_info:
+                self.service.bulk_import_clients(None, file_path, None)
+            assert exc_info.value.faultcode == "Import.ValidationError"
+    
+    def test_import_cli_sends_name_relative_to_import_dir(self, tmp_path, monkeypatch, capsys):
+        """La commande import transmet le nom tel quel au service (pas de chemin local)"""
+        (tmp_path / "clients.csv").write_text(
+            self.CSV_HEADER + "client-901,Eve Martin,1 Rue A,eve@example.com,4200,1800,0,0,false\n",
+            encoding="utf-8"
+        )
+        
+        class LoopbackClient:
+            def __init__(self, url, application):
+                self.service = self
+            
+            def bulk_import_clients(self, file_path, batch_size):
+                assert file_path == "clients.csv"
+                return ClientImportService().bulk_import_clients(None, file_path, batch_size)
+        
+        import spyne.client.http
+        monkeypatch.setattr(spyne.client.http, "HttpClient", LoopbackClient)
+        args = argparse.Namespace(file="clients.csv", batch_size=10, url="http://crud:5002/")
+        service_crud._run_import_cli(args)
+        
+        assert "Importées   : 1" in capsys.readouterr().out
+        assert "client-901" in CLIENTS_DB
+
+
+class TestVersionedClientStore:
+    """Tests des snapshots copy-on-write de la table clients"""
+    
+    def _record(self, income, debt):
+        return {
+            "identity": {"name": "X", "address": "Y", "email": "x@example.com"},
+            "financials": {"monthly_income": Decimal(income), "monthly_expenses": Decimal("0")},
+            "credit": {"debt": Decimal(debt), "late_payments": 0, "has_bankruptcy": False}
+        }
+    
+    def test_snapshot_isolation(self):
+        """Un lecteur garde une vue cohérente pendant une écriture"""
+        store = VersionedClientStore({"client-001": self._record("1000", "10")})
+        reader_view = store.snapshot()
+        
+        store.write({"client-001": self._record("2000", "20"), "client-002": self._record("1", "1")})
+        
+        assert reader_view["client-001"]["financials"]["monthly_income"] == Decimal("1000")
+        assert reader_view["client-001"]["credit"]["debt"] == Decimal("10")
+        assert "client-002" not in reader_view
+        assert store["client-001"]["credit"]["debt"] == Decimal("20")
+        assert len(store) == 2 and store.snapshot().version == reader_view.version + 1
+    
+    def test_copy_on_write_only_touched_shards(self):
+        """Seuls les shards modifiés sont copiés"""
+        store = VersionedClientStore({f"client-{i:03d}": self._record("1", "1") for i in range(50)})
+        before = store.snapshot()
+        after = store.write({"client-007": self._record("2", "2")})
+        
+        shared = sum(a is b for a, b in zip(before._shards, after._shards))
+        assert shared == VersionedClientStore.SHARDS - 1
+    
+    def test_old_versions_reclaimed(self):
+        """Les versions sans lecteur sont libérées"""
+        store = VersionedClientStore()
+        reader_view = store.snapshot()
+        for i in range(5):
+            store.write({f"client-{i:03d}": self._record("1", "1")})
+        gc.collect()
+        assert store.live_versions() == 2
+        
+        del reader_view
+        gc.collect()
+        assert store.live_versions() == 1
+
+
+class TestScoreIndex:
+    """Tests de l'index matérialisé des scores crédit"""
+    
+    _record = TestVersionedClientStore._record
+    
+    def setup_method(self):
+        self.now = 1_700_000_000.0
+        self.store = VersionedClientStore({
+            "client-001": self._record("5000", "5000"),
+            "client-002": self._record("6000", "0")
+        })
+        self.index = ScoreIndex(self.store, max_age_seconds=3600, clock=lambda: self.now)
+        self.index.rebuild()
+        self.store.subscribe(self.index.apply)
+    
+    def test_get_client_score_matches_business(self):
+        """Le score indexé est celui du service Business, avec la même version de formule"""
+        service = ScoreIndexService()
+        scoring = CreditScoringService()
+        for client_id in ("client-001", "client-002", "client-003"):
+            indexed = service.get_client_score(None, client_id)
+            history = CreditBureauService().get_client_credit_history(None, client_id)
+            expected = scoring.compute_credit_score(
+                None, client_id, float(history.debt), history.late_payments, history.has_bankruptcy
+            )
+            assert indexed.score == expected.score
+            assert indexed.is_fresh is True
+            assert indexed.scoring_version == expected.scoring_version
+            
+            graded = scoring.grade_credit_score(None, indexed.score)
+            assert (graded.grade, graded.scoring_version) == (expected.grade, expected.scoring_version)
+    
+    def test_shared_rules_file_same_scoring_version(self):
+        """Le fichier de règles livré donne la même version de formule à CRUD et Business"""
+        path = str(Path(__file__).resolve().parents[1] / "rules" / "decision_rules.json")
+        assert (service_crud.load_scoring_rules(path).version
+                == service_business.load_rules(path).scoring_version)
+    
+    def test_new_scoring_rebuilds_index(self):
+        """Une formule modifiée reconstruit l'index avec sa nouvelle version"""
+        old_version = self.index.get("client-001")[0]["scoring_version"]
+        assert self.index.set_scoring(service_crud.ScoringRules(service_crud.DEFAULT_SCORING)) is False
+        
+        scoring = service_crud.ScoringRules(dict(service_crud.DEFAULT_SCORING, debt_weight=0.05))
+        assert self.index.set_scoring(scoring) is True
+        entry, fresh = self.index.get("client-002")
+        assert entry["score"] == 1000 and fresh
+        entry, fresh = self.index.get("client-001")
+        assert entry["scoring_version"] == scoring.version != old_version
+        assert entry["score"] == 750
+    
+    def test_grade_credit_score_requires_score(self):
+        """grade_credit_score sans score -> Score.ValidationError"""
+        with pytest.raises(Fault) as exc_info:
+            CreditScoringService().grade_credit_score(None, None)
+        assert exc_info.value.faultcode == "Score.ValidationError"
+    
+    def test_write_marks_stale_until_refresh(self):
+        """Une écriture sur le crédit rend l'entrée périmée jusqu'au rafraîchissement"""
+        entry, fresh = self.index.get("client-002")
+        assert entry["score"] == 1000 and fresh
+        
+        self.store.write({"client-002": self._record("6000", "3000")})
+        assert self.index.get("client-002") == (entry, False)
+        assert self.index.status()["stale_entries"] == 1
+        
+        assert self.index.refresh() == 1
+        entry, fresh = self.index.get("client-002")
+        assert entry["score"] == 700 and fresh
+        assert self.index.status()["stale_entries"] == 0
+    
+    def test_write_during_refresh_stays_stale(self, monkeypatch):
+        """Une écriture survenue après le snapshot du recalcul laisse l'entrée périmée"""
+        self.store.write({"client-002": self._record("6000", "3000")})
+        take_snapshot = self.store.snapshot
+        
+        def snapshot_then_write():
+            snapshot = take_snapshot()
+            self.store.write({"client-002": self._record("6000", "1000")})
+            return snapshot
+        
+        monkeypatch.setattr(self.store, "snapshot", snapshot_then_write)
+        assert self.index.refresh() == 1
+        entry, fresh = self.index.get("client-002")
+        assert entry["score"] == 700 and not fresh
+        
+        monkeypatch.setattr(self.store, "snapshot", take_snapshot)
+        assert self.index.refresh() == 1
+        entry, fresh = self.index.get("client-002")
+        assert entry["score"] == 900 and fresh
+    
+    def test_expired_entries_recomputed(self):
+        """Au-delà de max_age_seconds: entrée comptée périmée, recalculée par refresh()"""
+        self.now += 3601
+        assert self.index.get("client-001")[1] is False
+        assert self.index.status()["stale_entries"] == 2
+        
+        assert self.index.refresh() == 2
+        entry, fresh = self.index.get("client-001")
+        assert fresh and entry["computed_at"] == self.now
+        assert self.index.status()["stale_entries"] == 0
+        
+        # Une entrée recalculée entre-temps n'expire qu'à sa propre échéance
+        self.store.write({"client-002": self._record("6000", "3000")})
+        self.index.refresh()
+        self.now += 1800
+        assert self.index.refresh() == 0
+        self.now += 1802
+        assert self.index.refresh() == 2
+    
+    def test_identity_change_keeps_entry_fresh(self):
+        """Modifier l'identité seule ne périme pas le score"""
+        record = self._record("5000", "5000")
+        record["identity"] = {"name": "Renamed", "address": "Y", "email": "x@example.com"}
+        self.store.write({"client-001": record})
+        assert self.index.get("client-001")[1] is True
+    
+    def test_entry_expires_after_max_age(self):
+        """Au-delà de max_age_seconds, l'entrée n'est plus fraîche"""
+        self.now += 3601
+        assert self.index.get("client-001")[1] is False
+    
+    def test_deleted_client_removed_on_refresh(self):
+        """Un client supprimé disparaît de l'index"""
+        self.store.write(deletes=("client-001",))
+        self.index.refresh()
+        assert self.index.get("client-001") == (None, False)
+        assert self.index.status()["entries"] == 1
+    
+    def test_get_client_score_not_found(self):
+        """Client inexistant -> Client.NotFound"""
+        with pytest.raises(Fault) as exc_info:
+            ScoreIndexService().get_client_score(None, "client-999")
+        assert exc_info.value.faultcode == "Client.NotFound"
+
+
+class TestLoanRequestStore:
+    """Tests du stockage des demandes de prêt (journal + working set borné)"""
+    
+    def setup_method(self):
+        self.now = 1_700_000_000.0
+        self.clock = lambda: self.now
+    
+    def test_save_and_update_status(self):
+        """save_loan_request puis update_request_status"""
+        service = DataAccessService()
+        saved = service.save_loan_request(None, "REQ-0001", '{"client_id": "client-002"}')
+        updated = service.update_request_status(None, "REQ-0001", "APPROVED")
+        
+        assert saved.status == "REÇUE"
+        assert updated.status == "APPROVED"
+    
+    def test_update_status_unknown_request(self):
+        """Demande inconnue → Request.NotFound"""
+        with pytest.raises(Fault) as exc_info:
+            DataAccessService().update_request_status(None, "REQ-UNKNOWN", "APPROVED")
+        
+        assert "Request.NotFound" in exc_info.value.faultcode
+    
+    def test_working_set_bounded_and_ttl(self):
+        """Éviction au-delà de max_entries et après expiration du TTL"""
+        store = LoanRequestStore(max_entries=3, ttl_seconds=60, clock=self.clock)
+        for i in range(5):
+            store.save(f"REQ-{i}", {})
+        
+        assert len(store) == 3
+        assert "REQ-0" not in store and "REQ-4" in store
+        
+        self.now += 61
+        assert store.get("REQ-4") is None
+        assert len(store) == 0
+    
+    def test_replay_and_compaction(self, tmp_path):
+        """Le journal est rejoué au redémarrage, la compaction le réduit"""
+        log_path = tmp_path / "loan_requests.log"
+        store = LoanRequestStore(str(log_path), clock=self.clock)
+        store.save("REQ-1", {"client_id": "client-001"})
+        store.save("REQ-2", {"client_id": "client-002"})
+        for status in ("EN_COURS", "APPROVED"):
+            store.update_status("REQ-2", status)
+        store.close()
+        
+        restarted = LoanRequestStore(str(log_path), clock=self.clock)
+        assert restarted.get("REQ-2")["status"] == "APPROVED"
+        assert restarted.get("REQ-1")["data"] == {"client_id": "client-001"}
+        
+        restarted.compact()
+        restarted.close()
+        assert len(log_path.read_text(encoding="utf-8").splitlines()) == 2
+    
+    def test_evicted_requests_kept_on_disk(self, tmp_path):
+        """Demandes évincées archivées: lisibles, modifiables, conservées par la compaction"""
+        log_path = tmp_path / "loan_requests.log"
+        store = LoanRequestStore(str(log_path), max_entries=2, clock=self.clock)
+        for i in range(4):
+            store.save(f"REQ-{i}", {"client_id": "client-001"})
+        store.update_status("REQ-3", "APPROVED")
+        
+        assert len(store) == 2 and store.archived == 2
+        assert store.update_status("REQ-0", "REVIEW")["status"] == "REVIEW"
+        assert store.update_status("REQ-0", "REJECTED", {"loan_amount": 1000})["status"] == "REJECTED"
+        # Une ligne par demande archivée, remplacée à chaque version
+        assert store.archived == 2
+        store.compact()
+        assert len(log_path.read_text(encoding="utf-8").splitlines()) == 2
+        store.close()
+        
+        restarted = LoanRequestStore(str(log_path), max_entries=2, clock=self.clock)
+        assert len(restarted) == 2
+        assert restarted.get("REQ-0")["status"] == "REJECTED"
+        assert restarted.get("REQ-0")["data"] == {"client_id": "client-001", "loan_amount": 1000}
+        assert restarted.get("REQ-1")["status"] == "REÇUE"
+        assert restarted.get("REQ-3")["status"] == "APPROVED"
+        assert restarted.get("REQ-9") is None
+        restarted.close()
+    
+    def test_background_compaction(self, tmp_path):
+        """Compaction déclenchée par les écritures, exécutée hors du chemin de save()"""
+        log_path = tmp_path / "loan_requests.log"
+        store = LoanRequestStore(str(log_path), max_entries=10, clock=self.clock)
+        store.COMPACT_MIN_RECORDS = 20
+        for i in range(40):
+            store.save(f"REQ-{i}", {})
+        store.compact()
+        
+        assert len(log_path.read_text(encoding="utf-8").splitlines()) <= 20
+        store.close()
+        restarted = LoanRequestStore(str(log_path), max_entries=10, clock=self.clock)
+        assert len(restarted) == 10 and restarted.archived == 30
+        assert all(restarted.get(f"REQ-{i}") is not None for i in range(40))
+        restarted.close()
+    
+    def test_status_with_decision_data(self, tmp_path):
+        """Données de décision fusionnées dans la demande et rejouées (client_id inchangé)"""
+        log_path = tmp_path / "loan_requests.log"
+        service = DataAccessService()
+        service.save_loan_request(None, "REQ-D1", '{"client_id": "client-001"}')
+        service.update_request_status(None, "REQ-D1", "APPROVED", '{"loan_amount": 200000}')
+        with pytest.raises(Fault) as exc_info:
+            service.update_request_status(None, "REQ-D1", "APPROVED", "[1, 2]")
+        assert exc_info.value.faultcode == "Request.ValidationError"
+        
+        store = LoanRequestStore(str(log_path), clock=self.clock)
+        store.save("REQ-1", {"client_id": "client-001"})
+        store.update_status("REQ-1", "APPROVED", {"loan_amount": 200000, "client_id": "client-009"})
+        store.close()
+        
+        restarted = LoanRequestStore(str(log_path), clock=self.clock)
+        assert restarted.get("REQ-1")["data"] == {"client_id": "client-001", "loan_amount": 200000}
+        assert [r["correlation_id"] for r in restarted.query(client_id="client-001")[0]] == ["REQ-1"]
+        restarted.close()
+    
+    def test_query_by_status_client_and_time(self):
+        """Index secondaires: statut, client, intervalle de création"""
+        store = LoanRequestStore(clock=self.clock)
+        for i in range(10):
+            self.now += 60
+            store.save(f"REQ-{i}", {"client_id": f"client-00{i % 2}"})
+            if i % 3 == 0:
+                store.update_status(f"REQ-{i}", "EXPERT_REVIEW")
+        
+        review, _ = store.query(status="EXPERT_REVIEW")
+        assert [r["correlation_id"] for r in review] == ["REQ-0", "REQ-3", "REQ-6", "REQ-9"]
+        
+        mine, _ = store.query(client_id="client-001", status="EXPERT_REVIEW")
+        assert [r["correlation_id"] for r in mine] == ["REQ-3", "REQ-9"]
+        
+        window, _ = store.query(created_from=self.now - 150, created_to=self.now - 60)
+        assert [r["correlation_id"] for r in window] == ["REQ-7", "REQ-8"]
+    
+    def test_query_cursor_pagination(self, tmp_path):
+        """Pagination sur working set + archive; curseur (created_ts, id) stable au redémarrage"""
+        log_path = tmp_path / "loan_requests.log"
+        store = LoanRequestStore(str(log_path), max_entries=4, clock=self.clock)
+        for i in range(10):
+            # Deux demandes par instant: départage par correlation_id
+            self.now += 60 * (i % 2)
+            store.save(f"REQ-{i}", {"client_id": "client-001"})
+        store.update_status("REQ-0", "APPROVED")
+        assert len(store) == 4 and store.archived == 6
+        
+        seen, cursor = [], None
+        page, cursor = store.query(client_id="client-001", limit=3)
+        seen += [r["correlation_id"] for r in page]
+        store.close()
+        store = LoanRequestStore(str(log_path), max_entries=4, clock=self.clock)
+        while cursor is not None:
+            page, cursor = store.query(client_id="client-001", cursor=cursor, limit=3)
+            seen += [r["correlation_id"] for r in page]
+        
+        assert seen == [f"REQ-{i}" for i in range(10)]
+        assert [r["correlation_id"] for r in store.query(status="APPROVED")[0]] == ["REQ-0"]
+        window, _ = store.query(created_from=self.now - 60, created_to=self.now - 60)
+        assert [r["correlation_id"] for r in window] == ["REQ-7", "REQ-8"]
+        
+        # Demande archivée ré-enregistrée: listée une seule fois, à sa nouvelle date
+        self.now += 60
+        store.save("REQ-1", {"client_id": "client-001"})
+        listed = [r["correlation_id"] for r in store.query(client_id="client-001", limit=20)[0]]
+        assert listed == ["REQ-0", *(f"REQ-{i}" for i in range(2, 10)), "REQ-1"]
+        store.close()
+    
+    def test_list_loan_requests_operation(self):
+        """Opération SOAP list_loan_requests"""
+        service = DataAccessService()
+        service.save_loan_request(None, "REQ-LIST-1", '{"client_id": "client-004"}')
+        service.update_request_status(None, "REQ-LIST-1", "EXPERT_REVIEW")
+        
+        page = service.list_loan_requests(
+            None, "EXPERT_REVIEW", "client-004", datetime(2000, 1, 1), None, None, 10
+        )
+        
+        assert [r.correlation_id for r in page.requests] == ["REQ-LIST-1"]
+        assert page.requests[0].client_id == "client-004"
+        assert page.next_cursor is None
+    
+    def test_get_loan_request_operation(self):
+        """Opération SOAP get_loan_request, Request.NotFound si inconnue"""
+        service = DataAccessService()
+        service.save_loan_request(None, "REQ-GET-1", '{"client_id": "client-004"}')
+        
+        assert service.get_loan_request(None, "REQ-GET-1").client_id == "client-004"
+        with pytest.raises(Fault) as exc_info:
+            service.get_loan_request(None, "REQ-GET-UNKNOWN")
+        assert exc_info.value.faultcode == "Request.NotFound"
+    
+    def test_list_loan_requests_invalid_cursor(self):
+        """Curseur invalide → Request.ValidationError"""
+        with pytest.raises(Fault) as exc_info:
+            DataAccessService().list_loan_requests(None, None, None, None, None, "abc", 10)
+        
+        assert "Request.ValidationError" in exc_info.value.faultcode
+        with pytest.raises(Fault):
+            DataAccessService().list_loan_requests(None, None, None, None, None, "nan:REQ-1", 10)
+
+
 # ============================================================
 # BUSINESS SERVICES TESTS
 # ============================================================
@@ -217,6 +762,65 @@ class TestCreditScoringService:
         assert result.grade == "B"
 
 
+class TestCreditScoringBatch:
+    """Tests du scoring vectorisé (parité avec le calcul unitaire)"""
+    
+    # (dette, retards, faillite) : cas limites des tests unitaires + cas aléatoires
+    CASES = [
+        (5000, 2, False), (2000, 0, False), (15000, 5, True), (0, 0, False),
+        (3000, 0, False), (500, 0, False), (700, 0, False), (800, 0, False),
+        (850, 0, False), (1000, 0, False), (1501, 0, False), (3001, 0, False),
+        (1999.9, 0, False), (2000.1, 0, False), (0, 20, False), (0, 0, True),
+        (None, None, False), (Decimal("1234.5"), 1, True),
+    ]
+    
+    def test_batch_matches_scalar(self):
+        """Scores, grades et solvabilité identiques au chemin unitaire"""
+        scalar = CreditScoringService()
+        solvency = SolvencyDecisionService()
+        debts, lates, bankrupt = zip(*self.CASES)
+        incomes = [5000] * len(self.CASES)
+        expenses = [4000, 6000] * (len(self.CASES) // 2)
+        
+        result = compute_credit_scores_batch(debts, lates, bankrupt, incomes, expenses)
+        
+        for i, (debt, late, has_bankruptcy) in enumerate(self.CASES):
+            expected = scalar.compute_credit_score(None, "test", debt, late, has_bankruptcy)
+            decision = solvency.decide_solvency(None, incomes[i], expenses[i], expected.score)
+            assert result["scores"][i] == expected.score
+            assert result["grades"][i] == expected.grade
+            assert result["is_solvent"][i] == decision.is_solvent
+    
+    def test_batch_operation(self):
+        """Opération SOAP: colonnes en entrée, colonnes en sortie"""
+        result = CreditScoringService().compute_credit_scores_batch(
+            None, [5000, 2000], [2, 0], [False, False], None, None
+        )
+        
+        assert result.scores == [400, 800]
+        assert result.grades == ["D", "A"]
+        assert result.is_solvent is None
+    
+    def test_batch_operation_length_mismatch(self):
+        """Colonnes de longueurs différentes → Fault"""
+        with pytest.raises(Fault) as exc_info:
+            CreditScoringService().compute_credit_scores_batch(
+                None, [5000, 2000], [2], [False, False], None, None
+            )
+        
+        assert "Batch.ValidationError" in exc_info.value.faultcode
+    
+    def test_batch_operation_one_sided_solvency_columns(self):
+        """Revenus sans dépenses (ou l'inverse), même vides → Batch.ValidationError"""
+        for incomes, expenses in (([5000, 4000], None), (None, [1000, 1000]), ([], None)):
+            with pytest.raises(Fault) as exc_info:
+                CreditScoringService().compute_credit_scores_batch(
+                    None, [5000, 2000], [2, 0], [False, False], incomes, expenses
+                )
+            assert exc_info.value.faultcode == "Batch.ValidationError"
+            assert "ensemble" in exc_info.value.faultstring
+
+
 class TestSolvencyDecisionService:
     """Tests de décision de solvabilité"""
     
@@ -340,6 +944,20 @@ class TestExplanationService:
         assert len(result.credit_score_explanation) > 5
         assert len(result.income_vs_expenses_explanation) > 5
         assert len(result.credit_history_explanation) > 5
+    
+    def test_explain_selected_fields_only(self):
+        """fields: seules les explications demandées sont générées"""
+        result = self.service.explain(None, 650, 2500, 3000, 8000, 2, False, fields="credit, income")
+        
+        assert "acceptable (650/1000)" in result.credit_score_explanation
+        assert "$3,000" in result.income_vs_expenses_explanation
+        assert result.credit_history_explanation == ""
+    
+    def test_explain_invalid_field(self):
+        """Champ inconnu -> Explanation.ValidationError"""
+        with pytest.raises(Fault) as exc_info:
+            self.service.explain(None, 650, 2500, 3000, 8000, 2, False, fields="credit,score")
+        assert exc_info.value.faultcode == "Explanation.ValidationError"
 
 
 # ============================================================
@@ -437,6 +1055,82 @@ LOAN_AMOUNT: 300000"""
 # APPRAISAL SERVICE TESTS
 # ============================================================
 
+class TestRequestParser:
+    """Tests de l'analyseur une passe (parité avec la recherche par motifs)"""
+    
+    PATTERNS = {
+        "full_name": r"FULL_NAME\s*:\s*(.+?)(?:\n|$)",
+        "loan_amount": r"LOAN_AMOUNT\s*:\s*(\d+)",
+        "loan_duration": r"LOAN_DURATION\s*:\s*(\d+)",
+        "property_address": r"PROPERTY_ADDRESS\s*:\s*(.+?)(?:\n|$)",
+        "property_description": r"PROPERTY_DESCRIPTION\s*:\s*(.+?)(?:\n|$)",
+        "property_surface": r"PROPERTY_SURFACE\s*:\s*(\d+)",
+        "construction_year": r"CONSTRUCTION_YEAR\s*:\s*(\d{4})",
+    }
+    
+    def _reference(self, text):
+        # Référence: une recherche re.search par champ sur tout le texte (avant l'analyseur)
+        values = {}
+        for name, pattern in self.PATTERNS.items():
+            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            if match:
+                value = match.group(1).strip()
+                values[name] = (int(value) if value.isdigit() else value) or None
+        return {k: v for k, v in values.items() if v}
+    
+    def _found(self, text):
+        return {name: value for name, value in service_ie._parse_request(text).items() if value}
+    
+    def _variants(self, rnd, well_formed=False):
+        lines = []
+        for key, values in [("FULL_NAME", ["Jean Dupont", "", "  "]),
+                            ("LOAN_AMOUNT", ["350000", "350 000", "abc", "0", "350000 EUR"]),
+                            ("LOAN_DURATION", ["20", "45", "x"]),
+                            ("PROPERTY_ADDRESS", ["12 rue: Paris", "456 Elm St, NYC\r", ""]),
+                            ("PROPERTY_DESCRIPTION", ["Maison: 3 ch.", "Loft"]),
+                            ("PROPERTY_SURFACE", ["120", "12a", ""]),
+                            ("CONSTRUCTION_YEAR", ["1998", "199", "19999", "an 2000"])]:
+            for _ in range(rnd.choice([0, 1, 1, 2])):
+                name = rnd.choice([key, key.lower(), key.title(), f"  {key} "])
+                value = rnd.choice([v for v in values if v.strip()] if well_formed else values)
+                formats = [f"{name}: {value}", f"{name} :{value}"]
+                if not well_formed:
+                    formats += [f"{name}:\n{value}", f"- {name}: {value}"]
+                lines.append(rnd.choice(formats))
+        lines.append("Remarque: aucune")
+        rnd.shuffle(lines)
+        return "CLIENT_ID: client-002\n" + "\n".join(lines)
+    
+    def test_parity_with_pattern_search(self):
+        """Mêmes valeurs, y compris valeur sur la ligne suivante, clé en milieu de ligne, 0 ou vide"""
+        rnd = random.Random(12)
+        for _ in range(3000):
+            for well_formed in (True, False):
+                text = self._variants(rnd, well_formed).strip()
+                assert self._found(text) == self._reference(text), text
+    
+    def test_same_faults_and_missing_fields(self):
+        service = InformationExtractionService()
+        rnd = random.Random(13)
+        for _ in range(300):
+            text = self._variants(rnd)
+            values = self._reference(text.strip())
+            try:
+                result = service.extract_property_info(None, "client-002", text)
+            except Fault as e:
+                assert e.faultcode == "Property.IncompleteData"
+                assert len(values) < 7 - ("full_name" not in values)
+                continue
+            assert int(result.loan_amount) == values["loan_amount"]
+            assert result.construction_year == values["construction_year"]
+    
+    def test_single_pass_stops_when_complete(self):
+        """Champs en tête d'un très long texte: le reste n'est pas analysé"""
+        head = ("LOAN_AMOUNT: 1\nLOAN_DURATION: 2\nPROPERTY_ADDRESS: a\nPROPERTY_DESCRIPTION: b\n"
+                "PROPERTY_SURFACE: 3\nCONSTRUCTION_YEAR: 2001\nFULL_NAME: c\n")
+        assert service_ie._parse_request(head + "LOAN_AMOUNT: 9\n" * 100000)["loan_amount"] == 1
+
+
 class TestAppraisalService:
     """Tests d'évaluation de propriété"""
     
@@ -477,19 +1171,20 @@ class TestAppraisalService:
         assert result.is_compliant == True
     
     def test_evaluate_property_region_not_found(self):
-        """Région inconnue → RegionNotFound Fault"""
-        with pytest.raises(Fault) as exc_info:
-            self.service.evaluate_property(
-                None,
-                property_address="Unknown City, Unknown State",
-                property_description="Property",
-                client_id="client-002",
-                loan_amount=300000,
-                property_surface=1500,
-                construction_year=2015
-            )
+        """Région inconnue → repli national, confiance faible → EXPERT_REVIEW"""
+        result = self.service.evaluate_property(
+            None,
+            property_address="Unknown City, Unknown State",
+            property_description="Property",
+            client_id="client-002",
+            loan_amount=300000,
+            property_surface=1500,
+            construction_year=2015
+        )
         
-        assert "Property.RegionNotFound" in exc_info.value.faultcode
+        assert result.valuation_level == "national"
+        assert result.evaluation_status == "EXPERT_REVIEW"
+        assert result.estimated_value > 0 and result.confidence < 0.5
     
     def test_evaluate_property_invalid_address(self):
         """Adresse invalide (trop courte) → ValidationError"""
@@ -521,10 +1216,462 @@ class TestAppraisalService:
         assert result.is_compliant == False
 
 
+class TestMarketIndex:
+    """Tests de l'index de marché (agrégats précalculés par région)"""
+    
+    SALES = [{"price": 300000, "surface": 1000, "year": 2000},
+             {"price": 500000, "surface": 2000, "year": 2010},
+             {"price": 400000, "surface": 1000, "year": 1995}]
+    
+    def test_aggregates(self):
+        """Moyennes, médiane et quantiles du prix au m²"""
+        index = MarketIndex.from_regions({"Lyon": {"comparables": self.SALES}})
+        stats = index.get("lyon").stats
+        
+        assert stats["count"] == 3
+        assert stats["mean_price"] == 400000
+        assert stats["mean_surface"] == pytest.approx(4000 / 3)
+        assert stats["median_price"] == 400000
+        # Prix au m² triés: 250, 300, 400
+        assert stats["price_per_m2"][0.5] == 300
+        assert stats["price_per_m2"][0.25] == pytest.approx(275)
+        assert stats["price_per_m2"][0.9] == pytest.approx(380)
+    
+    def test_incremental_update(self):
+        """Ajout de ventes: agrégats et génération mis à jour sans reconstruction"""
+        index = MarketIndex.from_regions({"lyon": {"comparables": self.SALES}})
+        before = index.get("lyon").stats
+        index.add_sales("Lyon", [{"price": 800000, "surface": 2000, "year": 2020}])
+        after = index.get("lyon").stats
+        
+        assert after["count"] == 4 and after["mean_price"] == 500000
+        assert after["median_price"] == 450000
+        assert after["generation"] == before["generation"] + 1
+        assert before["count"] == 3
+    
+    def test_invalid_sale_rejected(self):
+        """Vente invalide: rien n'est ajouté"""
+        index = MarketIndex.from_regions({"lyon": {"comparables": self.SALES}})
+        with pytest.raises(ValueError):
+            index.add_sales("lyon", [{"price": 1, "surface": 1}, {"price": 0, "surface": 10}])
+        assert index.get("lyon").stats["count"] == 3
+    
+    def test_get_market_stats(self):
+        """Opération SOAP get_market_stats"""
+        result = MarketDataService().get_market_stats(None, "NYC")
+        assert result.sales_count == 3
+        assert result.mean_price == pytest.approx(550000)
+        assert result.median_price == 550000
+        
+        with pytest.raises(Fault) as exc_info:
+            MarketDataService().get_market_stats(None, "paris")
+        assert exc_info.value.faultcode == "Property.RegionNotFound"
+
+
+class TestComparables:
+    """Tests de la sélection des comparables (k plus proches voisins)"""
+    
+    def _random_sales(self, count, coordinates=False, seed=0):
+        rnd = random.Random(seed)
+        sales = []
+        for _ in range(count):
+            sale = {"price": rnd.randint(100000, 900000), "surface": rnd.randint(300, 3000),
+                    "year": rnd.randint(1950, 2023)}
+            if coordinates:
+                sale.update(lat=rnd.uniform(42.2, 42.4), lon=rnd.uniform(-71.2, -71.0))
+            sales.append(sale)
+        return sales
+    
+    def _brute_force(self, sales, surface, year, k, lat=None, lon=None):
+        def distance(sale):
+            total = ((sale["surface"] - surface) / 100) ** 2 + ((sale["year"] - year) / 5) ** 2
+            if lat is not None:
+                total += ((sale["lat"] - lat) / 0.01) ** 2 + ((sale["lon"] - lon) / 0.01) ** 2
+            return total ** 0.5
+        return sorted(distance(sale) for sale in sales)[:k]
+    
+    def test_nearest_matches_brute_force(self):
+        """KD-tree + ventes ajoutées ensuite: mêmes voisins qu'un parcours complet"""
+        sales = self._random_sales(3000)
+        index = MarketIndex.from_regions({"boston": {"comparables": sales[:2000]}})
+        index.add_sales("boston", sales[2000:])
+        market = index.get("boston")
+        
+        for surface, year in [(1500, 2000), (300, 1950), (5000, 2030)]:
+            distances, _ = market.nearest(surface, year, k=8)
+            assert distances.tolist() == pytest.approx(self._brute_force(sales, surface, year, 8))
+    
+    def test_coordinates_optional(self):
+        """Coordonnées prises en compte seulement si la requête en fournit"""
+        sales = self._random_sales(500, coordinates=True)
+        market = MarketIndex.from_regions({"boston": {"comparables": sales}}).get("boston")
+        
+        distances, _ = market.nearest(1500, 2000, k=5, lat=42.3, lon=-71.1)
+        assert distances.tolist() == pytest.approx(self._brute_force(sales, 1500, 2000, 5, 42.3, -71.1))
+        distances, _ = market.nearest(1500, 2000, k=5)
+        assert distances.tolist() == pytest.approx(self._brute_force(sales, 1500, 2000, 5))
+        
+        with pytest.raises(ValueError):
+            MarketIndex.from_regions({"boston": {"comparables": sales}}).add_sales(
+                "boston", [{"price": 300000, "surface": 1000, "year": 2000}])
+    
+    def test_valuation_weighted_by_similarity(self):
+        """Le comparable identique au bien pèse le plus dans l'estimation"""
+        sales = [{"price": 400000, "surface": 1000, "year": 2010},
+                 {"price": 1500000, "surface": 1000, "year": 1960}]
+        saved_index = service_appraisal.MARKET_INDEX
+        service_appraisal.MARKET_INDEX = MarketIndex.from_regions({"boston": {"comparables": sales}})
+        try:
+            result = AppraisalService().evaluate_property(
+                None, "1 Main St, Boston MA", "House", "client-001", 300000, 1000, 2010)
+        finally:
+            service_appraisal.MARKET_INDEX = saved_index
+        
+        # Prix au m² 400 (distance 0) et 1500 (distance 10): (400 + 1500/11) / (1 + 1/11)
+        assert result.estimated_value == int((400 + 1500 / 11) / (12 / 11) * 1000)
+        assert "Comparables: 2" in result.valuation_reason
+
+
+class TestAddressNormalizer:
+    """Tests de la reconnaissance de région dans l'adresse"""
+    
+    @pytest.mark.parametrize("address,region", [
+        ("123 Main St, Boston MA", "boston"),
+        ("456 Elm St, NYC", "nyc"),
+        ("789 Oak St, LA", "la"),
+        ("350 5th Ave, New York, NY 10118", "nyc"),
+        ("Manhattan, NY", "nyc"),
+        ("Los Ángeles, CA", "la"),
+        ("100 Main St, Springfield, MA 02108", "boston"),
+        ("22 Boston Road, Los Angeles CA", "la"),
+    ])
+    def test_known_regions(self, address, region):
+        """Noms, alias, accents et codes postaux"""
+        assert service_appraisal._extract_city_from_address(address) == region
+    
+    def test_short_alias_not_matched_inside_text(self):
+        """'la' n'est une région qu'en tête de segment"""
+        normalizer = service_appraisal.AddressNormalizer(service_appraisal.REGION_ALIASES)
+        assert normalizer.match("12 rue de la Paix, Paris") is None
+        assert normalizer.match("1 Rue de la Paix") is None
+        assert service_appraisal._extract_city_from_address("Unknown City, Unknown State") == "unknown"
+    
+    def test_evaluate_property_alias(self):
+        """Adresse sans le nom court de la région: évaluée sans expertise"""
+        result = AppraisalService().evaluate_property(
+            None, "1 Broadway, New York, NY 10004", "Apartment", "client-001", 300000, 1200, 2010)
+        assert "Nyc" in result.valuation_reason
+
+
+class TestRiskScanner:
+    """Tests du scanner de conformité (lexique de risques)"""
+    
+    def test_description_scanned(self):
+        """Les termes de la description rendent la propriété non conforme"""
+        result = AppraisalService().evaluate_property(
+            None, "123 Main St, Boston MA", "Flooded basement, fire-damage", "client-001",
+            300000, 2000, 2005)
+        assert result.is_compliant is False
+        assert result.risk_terms == ["flooded", "fire damage", "damage"]
+        assert "Risques: flooded" in result.valuation_reason
+    
+    def test_accents_and_whole_words(self):
+        """Insensible aux accents et à la ponctuation; mots entiers seulement"""
+        scanner = service_appraisal.RISK_SCANNER
+        assert scanner.scan("Zone-Rouge", "maison ENDOMMAGEE") == ["zone rouge", "endommagée"]
+        assert scanner.scan("1 Rue X", "undamaged, plomberie refaite, crown molding") == []
+        assert scanner.scan("zone", "rouge") == []
+    
+    def test_custom_lexicon(self, tmp_path):
+        """Lexique chargé depuis un fichier, en plus des termes intégrés"""
+        path = tmp_path / "lexicon.txt"
+        path.write_text("# termes locaux\nradon\nfissure traversante\n", encoding="utf-8")
+        scanner = service_appraisal.RiskScanner(service_appraisal.load_risk_lexicon(str(path)))
+        assert scanner.scan("1 Rue X", "Radon élevé, fissure traversante, flood") == [
+            "radon", "fissure traversante", "flood"]
+
+
+class TestValuationCache:
+    """Tests du cache des évaluations (index et cache isolés, horloge simulée)"""
+    
+    def setup_method(self):
+        self.now = 1000.0
+        self.saved = service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE
+        self.index = MarketIndex.from_regions(service_appraisal.LOCAL_REGION_CACHE)
+        self.cache = service_appraisal.ValuationCache(max_entries=2, ttl_seconds=60, clock=lambda: self.now)
+        self.index.subscribe(self.cache.invalidate_region)
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = self.index, self.cache
+    
+    def teardown_method(self):
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = self.saved
+    
+    def _evaluate(self, address="123 Main St, Boston MA", surface=2000):
+        return AppraisalService().evaluate_property(None, address, "House", "client-001", 300000, surface, 2005)
+    
+    def test_hit_on_same_property(self):
+        """Même bien (adresse normalisée): servi depuis le cache"""
+        first = self._evaluate()
+        second = self._evaluate("123 main st., BOSTON MA")
+        
+        assert second.estimated_value == first.estimated_value
+        assert second.property_address == "123 main st., BOSTON MA"
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+        self._evaluate(surface=2100)
+        assert self.cache.misses == 2
+    
+    def test_invalidated_by_new_sales(self):
+        """Ajout de ventes dans la région: entrées purgées, nouvelle valeur"""
+        first = self._evaluate()
+        self._evaluate("456 Elm St, NYC")
+        self.index.add_sales("boston", [{"price": 900000, "surface": 2000, "year": 2005}])
+        
+        assert len(self.cache._entries) == 1 and self.cache.invalidated == 1
+        assert self._evaluate().estimated_value > first.estimated_value
+    
+    def test_ttl_and_eviction(self):
+        """Entrée expirée après le TTL; LRU borné à max_entries"""
+        self._evaluate()
+        self.now += 61
+        self._evaluate()
+        assert self.cache.expired == 1 and self.cache.hits == 0
+        
+        self._evaluate("456 Elm St, NYC")
+        self._evaluate("789 Oak St, LA")
+        assert self.cache.evicted == 1
+        
+        stats = service_appraisal.ValuationCacheService().get_valuation_cache_stats(None)
+        assert stats.entries == 2 and stats.misses == 4 and stats.hit_rate == 0
+
+
+class TestMarketDataFile:
+    """Tests du fichier de marché mappé (mmap)"""
+    
+    def test_round_trip_matches_in_memory_index(self, tmp_path):
+        """Même agrégats et mêmes comparables que l'index construit en mémoire"""
+        path = str(tmp_path / "market.bin")
+        assert service_appraisal.write_market_data(service_appraisal.LOCAL_REGION_CACHE, path) == (3, 9)
+        mapped = MarketIndex.from_file(path)
+        reference = MarketIndex.from_regions(service_appraisal.LOCAL_REGION_CACHE)
+        
+        for region in ("boston", "nyc", "la"):
+            stats, expected_stats = mapped.get(region).stats, reference.get(region).stats
+            assert stats["price_per_m2"] == pytest.approx(expected_stats.pop("price_per_m2"))
+            recent, expected_recent = stats["recent"], expected_stats.pop("recent")
+            assert recent["price_per_m2"] == pytest.approx(expected_recent["price_per_m2"])
+            assert recent["age_counts"] == expected_recent["age_counts"] and recent["trend"] == 1.0
+            assert {k: v for k, v in stats.items() if k not in ("price_per_m2", "recent")} \
+                == pytest.approx(expected_stats)
+            assert mapped.get(region).base_price_m2 == reference.get(region).base_price_m2
+            distances, values = mapped.get(region).nearest(1500, 2005, k=2)
+            expected = reference.get(region).nearest(1500, 2005, k=2)
+            assert distances.tolist() == pytest.approx(expected[0].tolist())
+            assert values.tolist() == pytest.approx(expected[1].tolist())
+    
+    def test_add_sales_to_mapped_region(self, tmp_path):
+        """Ajout de ventes: le fichier reste en lecture seule, les agrégats suivent"""
+        path = str(tmp_path / "market.bin")
+        service_appraisal.write_market_data(service_appraisal.LOCAL_REGION_CACHE, path)
+        index = MarketIndex.from_file(path)
+        index.add_sales("NYC", [{"price": 650000, "surface": 1300, "year": 2020}])
+        
+        stats = index.get("nyc").stats
+        assert stats["count"] == 4 and stats["mean_price"] == pytest.approx(575000)
+        assert stats["generation"] == 2
+        assert index.get("nyc").nearest(1300, 2020, k=1)[1].tolist() == [500.0]
+    
+    def test_convert_csv(self, tmp_path):
+        """Conversion CSV: régions regroupées, coordonnées optionnelles"""
+        source = tmp_path / "sales.csv"
+        source.write_text("region,price,surface,year,lat,lon,base_price_m2\n"
+                          "Lyon,300000,1000,2000,,,4000\n"
+                          "lyon,500000,2000,2010,,,\n"
+                          "Paris,900000,900,1990,48.85,2.35,\n", encoding="utf-8")
+        path = str(tmp_path / "market.bin")
+        assert service_appraisal.convert_market_data(str(source), path) == (2, 3)
+        
+        index = MarketIndex.from_file(path)
+        assert index.get("lyon").stats["count"] == 2
+        assert index.get("lyon").base_price_m2 == 4000
+        assert index.get("paris").knn.dims == 4
+    
+    def test_rejects_unknown_file(self, tmp_path):
+        """Fichier d'un autre format: refusé au chargement"""
+        path = tmp_path / "market.bin"
+        path.write_bytes(b"\0" * 128)
+        with pytest.raises(ValueError):
+            MarketIndex.from_file(str(path))
+
+
 # ============================================================
 # APPROVAL SERVICE TESTS
 # ============================================================
 
+class TestValuationFallback:
+    """Tests du repli hiérarchique (ville → état → national) et du score de confiance"""
+    
+    def setup_method(self):
+        self.saved = service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE
+        self.index = MarketIndex.from_regions(service_appraisal.LOCAL_REGION_CACHE)
+        service_appraisal.MARKET_INDEX = self.index
+        service_appraisal.VALUATION_CACHE = service_appraisal.ValuationCache()
+    
+    def teardown_method(self):
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = self.saved
+    
+    def _evaluate(self, address):
+        return AppraisalService().evaluate_property(None, address, "House", "client-001", 300000, 1500, 2015)
+    
+    def test_known_city_is_confident(self):
+        result = self._evaluate("123 Main St, Boston MA")
+        assert (result.valuation_level, result.evaluation_status) == ("city", "COMPLETED")
+        assert 0.5 <= result.confidence < 1
+    
+    def test_state_fallback(self):
+        """Ville inconnue du Massachusetts: agrégat de l'état; confiant avec assez de ventes"""
+        result = self._evaluate("12 Elm St, Cambridge, MA")
+        assert (result.valuation_level, result.evaluation_status) == ("state", "EXPERT_REVIEW")
+        assert "Référence: prix au m² de l'état" in result.valuation_reason
+        
+        rnd = random.Random(3)
+        self.index.add_sales("boston", [{"price": 200 * surface, "surface": surface, "year": 2010}
+                                        for surface in (rnd.randint(800, 2500) for _ in range(40))])
+        result = self._evaluate("12 Elm St, Cambridge, Massachusetts")
+        assert (result.valuation_level, result.evaluation_status) == ("state", "COMPLETED")
+        assert result.estimated_value == pytest.approx(200 * 1500, rel=0.05)
+    
+    def test_aggregates_follow_additions(self):
+        """Agrégats mis à jour par différence = agrégats recalculés depuis zéro"""
+        self.index.add_sales("nyc", [{"price": 900000, "surface": 1000, "year": 2020}])
+        self.index.add_sales("paris", [{"price": 500000, "surface": 50, "year": 1900}])
+        reference = MarketAggregate()
+        for region in self.index.regions():
+            reference = reference.with_region(None, self.index.get(region).stats)
+        national = self.index.aggregate("national")
+        
+        assert (national.count, national.regions) == (reference.count, 4)
+        assert national.price_per_m2 == pytest.approx(reference.price_per_m2)
+        assert national.dispersion == pytest.approx(reference.dispersion)
+        assert self.index.aggregate("state", "ny").count == 4
+        assert self.index.aggregate("state", "tx") is None
+    
+    def test_no_market_data(self):
+        """Index vide: aucun niveau de repli → RegionNotFound"""
+        service_appraisal.MARKET_INDEX = MarketIndex()
+        with pytest.raises(Fault) as exc_info:
+            self._evaluate("Unknown City, Unknown State")
+        assert exc_info.value.faultcode == "Property.RegionNotFound"
+
+
+class TestValuationBands:
+    """Tests des intervalles d'évaluation Monte-Carlo"""
+    
+    def setup_method(self):
+        self.saved = service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE
+        self.index = MarketIndex.from_regions(service_appraisal.LOCAL_REGION_CACHE)
+        service_appraisal.MARKET_INDEX = self.index
+        service_appraisal.VALUATION_CACHE = service_appraisal.ValuationCache()
+    
+    def teardown_method(self):
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = self.saved
+    
+    def _evaluate(self, address):
+        return AppraisalService().evaluate_property(None, address, "House", "client-002", 300000, 1400, 2015)
+    
+    def test_band_brackets_estimate(self):
+        result = self._evaluate("456 Elm St, NYC")
+        assert result.value_low < result.estimated_value < result.value_high
+        assert "intervalle 90%" in result.valuation_reason
+        assert self._evaluate("456 Elm St, NYC").value_low == result.value_low
+    
+    def test_band_narrows_with_consistent_comparables(self):
+        """Comparables nombreux et homogènes: intervalle plus étroit; repli national: plus large"""
+        self.index.add_sales("scattered", [{"price": price * 1400, "surface": 1400, "year": 2015}
+                                           for price in (300, 450, 600)])
+        self.index.add_sales("steady", [{"price": 450 * 1400, "surface": 1400, "year": 2015}] * 30)
+        
+        def width(address):
+            result = self._evaluate(address)
+            return (result.value_high - result.value_low) / result.estimated_value
+        assert width("1 Main St, Steady") < width("1 Main St, Scattered") < width("Unknown City, Unknown State")
+    
+    def test_band_vectorized_draws(self):
+        """Bootstrap des comparables: bornes proches des quantiles attendus"""
+        low, high = service_appraisal._valuation_band(100, 1.0, distances=np.zeros(2),
+                                                      prices_per_m2=np.array([1000.0, 1000.0]))
+        assert low < 100000 < high and high / low < 1.25
+
+
+class TestRollingMarketStats:
+    """Tests des statistiques glissantes et de l'ingestion de ventes (horloge simulée)"""
+    
+    DAY = 86400
+    
+    def setup_method(self):
+        self.now = 0.0
+        self.saved = service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE
+        self.index = MarketIndex.from_regions(service_appraisal.LOCAL_REGION_CACHE, clock=lambda: self.now)
+        service_appraisal.MARKET_INDEX = self.index
+        service_appraisal.VALUATION_CACHE = service_appraisal.ValuationCache()
+    
+    def teardown_method(self):
+        service_appraisal.MARKET_INDEX, service_appraisal.VALUATION_CACHE = self.saved
+    
+    def test_recent_sales_weigh_more(self):
+        """Une vente d'il y a une demi-vie pèse moitié moins qu'une vente du jour"""
+        rolling = service_appraisal.RollingMarketStats(90 * self.DAY, 0.0)
+        rolling.add([100.0], [2020], 0.0)
+        rolling.add([400.0], [2000], 90 * self.DAY)
+        summary = rolling.summary()
+        
+        assert summary["price_per_m2"] == pytest.approx((100 * 0.5 + 400) / 1.5)
+        assert summary["trend"] == pytest.approx(min(300 / 250, 1.25))
+        assert summary["age_counts"] == [1, 0, 1, 0]
+        assert summary["quantiles"][0.9] == pytest.approx(400, rel=0.01)
+    
+    def test_rescale_keeps_weights(self):
+        """Renormalisation des poids sur longue période: résultat inchangé"""
+        rolling = service_appraisal.RollingMarketStats(self.DAY, 0.0)
+        rolling.add([100.0, 200.0], [2010, 2010], 0.0)
+        rolling.add([300.0], [2010], 100 * self.DAY)
+        
+        assert rolling.summary()["price_per_m2"] == pytest.approx(300.0)
+        assert math.isfinite(rolling._weight)
+    
+    def test_ingest_sales_updates_stats(self):
+        """ingest_sales: ventes ajoutées, statistiques récentes et tendance à jour"""
+        self.now = 180 * self.DAY
+        sales = [service_appraisal.SaleRecord(price=700000, surface=1000, year=2022) for _ in range(5)]
+        report = MarketDataService().ingest_sales(None, "Boston", sales)
+        
+        assert (report.region, report.accepted, report.sales_count, report.generation) == ("boston", 5, 8, 2)
+        assert report.sales_per_second > 0
+        stats = MarketDataService().get_market_stats(None, "boston")
+        assert float(stats.recent_price_per_m2_p50) == pytest.approx(700, rel=0.01)
+        assert stats.recent_price_per_m2 > stats.price_per_m2_p25
+        assert stats.market_trend > 1 and stats.sales_age_0_5 == 5
+    
+    def test_ingest_invalid_sale(self):
+        """Vente invalide: lot refusé, région inchangée"""
+        sales = [service_appraisal.SaleRecord(price=500000, surface=1000, year=2010),
+                 service_appraisal.SaleRecord(price=-1, surface=1000, year=2010)]
+        with pytest.raises(Fault) as exc:
+            MarketDataService().ingest_sales(None, "boston", sales)
+        assert exc.value.faultcode == "Market.ValidationError"
+        assert self.index.get("boston").generation == 1
+    
+    def test_trend_adjusts_valuation(self):
+        """Hausse récente des prix: valeur relevée et tendance expliquée"""
+        before = AppraisalService().evaluate_property(None, "123 Main St, Boston MA", "House",
+                                                      "client-001", 300000, 2000, 2005)
+        self.now = 365 * self.DAY
+        self.index.add_sales("boston", [{"price": 400000, "surface": 1000, "year": 1990}] * 3)
+        after = AppraisalService().evaluate_property(None, "123 Main St, Boston MA", "House",
+                                                     "client-001", 300000, 2000, 2005)
+        
+        assert "Tendance du marché: +" in after.valuation_reason
+        assert "Tendance" not in before.valuation_reason
+
+
 class TestApprovalService:
     """Tests de décision d'approbation"""
     
@@ -582,6 +1729,14 @@ class TestApprovalService:
         
         assert result.approved == False
     
+    def test_approve_loan_lower_valuation_band(self):
+        """Borne basse de l'évaluation fournie: LTV calculé dessus"""
+        args = dict(credit_score=800, solvency_status="solvent", property_value=420000,
+                    loan_amount=300000, property_compliant=True, monthly_income=5500, monthly_expenses=2500)
+        assert self.service.approve_loan(None, **args).approved
+        assert not self.service.approve_loan(None, **args, property_value_low=310000).approved
+        assert self.service.approve_loan(None, **args, property_value_low=500000).approved
+    
     def test_approve_loan_property_not_compliant(self):
         """Propriété non conforme → rejected"""
         result = self.service.approve_loan(
@@ -597,6 +1752,16 @@ class TestApprovalService:
         
         assert result.approved == False
     
+    def test_approve_loan_without_explanation(self):
+        """include_explanation=False: même décision, explication non générée"""
+        args = (None, 720, "solvent", 420000, 300000, True, 5500, 2500)
+        full = self.service.approve_loan(*args)
+        lean = self.service.approve_loan(*args, include_explanation=False)
+        
+        assert full.simple_explanation != "" and lean.simple_explanation == ""
+        assert (lean.approved, lean.interest_rate, lean.risk_level) == (
+            full.approved, full.interest_rate, full.risk_level)
+    
     def test_approve_loan_interest_rate_calculation(self):
         """Taux intérêt : varie selon risk level"""
         # Good risk
@@ -628,10 +1793,529 @@ class TestApprovalService:
             assert worse.interest_rate >= good.interest_rate
 
 
+class TestAmortization:
+    """Tests du moteur d'amortissement et du DTI après prêt"""
+    
+    def test_terms_scalar_and_batch(self):
+        payment, interest = service_approval.amortization_terms(300000, 5.5, 20)
+        assert payment == pytest.approx(2063.66, abs=0.01)
+        assert interest == pytest.approx(payment * 240 - 300000)
+        
+        payments, interests = service_approval.amortization_terms(
+            np.array([300000, 120000]), np.array([5.5, 0.0]), np.array([20, 10]))
+        assert payments.tolist() == pytest.approx([payment, 1000.0])
+        assert interests[1] == pytest.approx(0.0)
+    
+    def test_schedule_chunks(self):
+        """40 ans: tranches de 120 mois, capital remboursé en entier, solde final nul"""
+        chunks = service_approval.amortization_schedule(300000, 4.0, 40)
+        first = next(chunks)
+        assert first["month"].tolist() == list(range(1, 121))
+        assert first["interest"][0] == pytest.approx(1000.0)
+        rest = list(chunks)
+        assert len(rest) == 3
+        assert sum(c["principal"].sum() for c in [first, *rest]) == pytest.approx(300000)
+        assert rest[-1]["balance"][-1] == 0.0
+        
+        # Page au milieu du prêt: même solde que le tableau complet
+        page = next(service_approval.amortization_schedule(300000, 4.0, 40, first_month=250, chunk_months=5))
+        assert page["balance"].tolist() == pytest.approx(rest[1]["balance"][9:14].tolist())
+    
+    def test_get_amortization_schedule(self):
+        result = service_approval.AmortizationService().get_amortization_schedule(None, 300000, 5.5, 20, 239, 10)
+        assert (result.total_months, result.first_month, len(result.rows)) == (240, 239, 2)
+        assert result.rows[-1].balance == 0
+        with pytest.raises(Fault) as exc:
+            service_approval.AmortizationService().get_amortization_schedule(None, 300000, 5.5, 0)
+        assert exc.value.faultcode == "Amortization.ValidationError"
+    
+    def test_post_loan_dti(self):
+        """Durée fournie: mensualité au taux proposé ajoutée aux dépenses"""
+        args = (None, 800, "solvent", 629500, 300000, True, 5500, 2500, None, None)
+        long_loan = ApprovalService().approve_loan(*args, 20)
+        assert long_loan.approved
+        assert long_loan.post_loan_dti == pytest.approx((2500 + long_loan.monthly_payment) / 5500 * 100, abs=0.01)
+        
+        short_loan = ApprovalService().approve_loan(*args, 10)
+        assert not short_loan.approved and "DTI après prêt" in short_loan.justification
+        assert ApprovalService().approve_loan(*args).monthly_payment is None
+        
+        # Palier FAIBLE refusé: taux du niveau de risque du refus, mensualité recalculée à ce taux
+        args = (None, 800, "solvent", 629500, 300000, True, 5500, 1900, None, None)
+        assert ApprovalService().approve_loan(*args, 20).risk_level == "FAIBLE"
+        rejected = ApprovalService().approve_loan(*args, 8)
+        assert not rejected.approved and rejected.risk_level == "ÉLEVÉ"
+        assert rejected.interest_rate == service_approval._calculate_interest_rate(
+            800, "ÉLEVÉ", 300000 / 629500 * 100, 1900 / 5500 * 100, service_approval._RULES)
+        payment, _ = service_approval.amortization_terms(300000, rejected.interest_rate, 8)
+        assert rejected.monthly_payment == round(payment, 2)
+
+
+class TestPortfolioStress:
+    """Tests du stress test du portefeuille de prêts approuvés"""
+    
+    def _loans(self, count=400, seed=3):
+        rnd = random.Random(seed)
+        return [{
+            "loan_amount": rnd.uniform(50000, 400000),
+            "loan_duration": rnd.choice([10, 15, 20, 25]),
+            "property_value": rnd.uniform(450000, 900000),
+            "region": rnd.choice(["Paris", "Lyon"]),
+            "property_compliant": True,
+            "credit_score": rnd.randint(650, 1000),
+            "monthly_income": rnd.uniform(4000, 9000),
+            "monthly_expenses": rnd.uniform(1000, 3000),
+        } for _ in range(count)]
+    
+    def test_neutral_scenario_matches_approve_loan(self):
+        """Sans choc: mêmes décisions et taux qu'approve_loan prêt par prêt"""
+        loans = self._loans()
+        rules = service_approval.load_rules()
+        for loan in loans:
+            # Solvabilité comme decide_solvency (service Business)
+            loan["solvency"] = ("solvent" if loan["credit_score"] >= rules.solvency_min_score and
+                                loan["monthly_income"] > loan["monthly_expenses"] + rules.min_monthly_savings
+                                else "not_solvent")
+        [report] = service_approval.stress_test(service_approval.Portfolio.from_records(loans),
+                                                [{"name": "base"}], workers=1, chunk_loans=128)
+        decisions = [ApprovalService().approve_loan(
+            None, l["credit_score"], l["solvency"],
+            l["property_value"], l["loan_amount"], True, l["monthly_income"], l["monthly_expenses"],
+            False, None, l["loan_duration"]) for l in loans]
+        
+        assert report["approved"] == sum(d.approved for d in decisions)
+        assert report["mean_interest_rate"] == pytest.approx(
+            sum(d.interest_rate for d in decisions) / len(loans), abs=1e-4)
+        assert report["mean_payment_increase"] == pytest.approx(0, abs=0.01)
+        assert report["negative_equity"] == 0
+    
+    def test_regional_value_drop_and_rate_shock(self):
+        """Baisse de valeur limitée à une région, hausse de taux et de mensualité"""
+        portfolio = service_approval.Portfolio.from_records(self._loans())
+        lyon = sum(1 for l in self._loans() if l["region"] == "Lyon")
+        base, crash, shock = service_approval.stress_test(portfolio, [
+            {"name": "base"},
+            {"name": "krach Lyon", "value_drop_pct": {"*": 0, "lyon": 60}},
+            {"name": "taux", "rate_bp": 200, "income_drop_pct": 10},
+        ], workers=1)
+        
+        assert crash["mean_ltv"] > base["mean_ltv"]
+        assert 0 < crash["negative_equity"] <= lyon
+        assert crash["negative_equity_shortfall"] > 0
+        assert shock["mean_interest_rate"] > base["mean_interest_rate"] + 1.5
+        assert shock["mean_payment_increase"] > 0
+        assert shock["mean_post_loan_dti"] > base["mean_post_loan_dti"]
+        assert sum(shock["risk_levels"].values()) + sum(shock["rejections"].values()) == shock["loans"]
+    
+    def test_process_pool_matches_inline(self):
+        portfolio = service_approval.Portfolio.from_records(self._loans())
+        scenarios = [{"rate_bp": bp, "value_drop_pct": 20} for bp in (0, 100, 300)]
+        inline = service_approval.stress_test(portfolio, scenarios, workers=1, chunk_loans=100)
+        pooled = service_approval.stress_test(portfolio, scenarios, workers=2, chunk_loans=100)
+        for a, b in zip(inline, pooled):
+            assert (a["approved"], a["risk_levels"]) == (b["approved"], b["risk_levels"])
+            assert a["mean_ltv"] == pytest.approx(b["mean_ltv"])
+    
+    def test_load_portfolio_from_decisions_log(self, tmp_path, monkeypatch):
+        """Journal des décisions: dernière décision par demande, prêts approuvés, période couverte"""
+        log_path = tmp_path / "decisions.log"
+        monkeypatch.setattr(service_approval, "DECISIONS_LOG", service_approval.DecisionLog(str(log_path)))
+        monkeypatch.setattr(service_approval, "EXPOSURE_BOOK", service_approval.ExposureBook())
+        loans = self._loans(3)
+        for i, loan in enumerate(loans):
+            ApprovalService().approve_loan(
+                None, 900, "solvent", loan["property_value"], loan["loan_amount"], True,
+                loan["monthly_income"], 500, False, None, loan["loan_duration"], loan["region"], f"REQ-{i}")
+        # Nouvelle décision de REQ-2: refusée, sortie du portefeuille
+        ApprovalService().approve_loan(None, 300, "not_solvent", 500000, 100000, True, 5000, 500,
+                                       False, None, 20, "Paris", "REQ-2")
+        service_approval.DECISIONS_LOG.close()
+        
+        portfolio = service_approval.load_portfolio(str(log_path))
+        assert len(portfolio) == 2
+        assert sorted(portfolio.loan_amount.tolist()) == pytest.approx(sorted(l["loan_amount"] for l in loans[:2]))
+        assert set(portfolio.regions) <= {"paris", "lyon"}
+        [report] = service_approval.stress_test(portfolio, [{"name": "base"}], workers=1)
+        assert report["decided_to"] is not None
+        assert report["decided_from"] <= report["decided_to"]
+    
+    def test_invalid_scenarios(self):
+        portfolio = service_approval.Portfolio.from_records(self._loans(5))
+        for scenarios in ([], [{"value_drop_pct": 100}], [{"rate_bp": "beaucoup"}]):
+            with pytest.raises(ValueError):
+                service_approval.stress_test(portfolio, scenarios, workers=1)
+        with pytest.raises(ValueError):
+            service_approval.Portfolio.from_records([{"loan_amount": 1000}])
+
+
+class TestPortfolioExposure:
+    """Tests des agrégats de concentration et des plafonds d'exposition"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_book(self, monkeypatch):
+        monkeypatch.setattr(service_approval, "EXPOSURE_BOOK", service_approval.ExposureBook())
+        spec = json.loads(json.dumps(service_approval.DEFAULT_RULES))
+        spec["approval"]["concentration"] = {"max_region_exposure": {"*": 1_000_000, "Lyon": 250_000},
+                                             "max_risk_exposure": {"ÉLEVÉ": 400_000}}
+        monkeypatch.setattr(service_approval, "_RULES", service_approval.DecisionRules(spec))
+    
+    def _approve(self, loan_amount, region, score=850, value=1_000_000, correlation_id=None):
+        self.requests = getattr(self, "requests", 0) + 1
+        return ApprovalService().approve_loan(None, score, "solvent", value, loan_amount, True, 6000, 1500,
+                                              False, None, None, region,
+                                              correlation_id or f"REQ-{self.requests}")
+    
+    def test_aggregates_and_weighted_ltv(self):
+        assert self._approve(200000, "Paris").approved
+        assert self._approve(600000, " paris ").approved
+        assert not self._approve(100000, "Paris", score=500).approved
+        
+        exposure = service_approval.ExposureService().get_portfolio_exposure(None)
+        assert (exposure.count, exposure.exposure) == (2, 800000)
+        # LTV pondéré par le montant: (200k × 20% + 600k × 60%) / 800k
+        assert exposure.weighted_ltv == pytest.approx(50.0)
+        [paris] = exposure.regions
+        assert (paris.key, paris.count, paris.cap) == ("paris", 2, 1_000_000)
+        assert [(b.key, b.count) for b in exposure.risk_levels] == [("FAIBLE", 2)]
+        
+        only = service_approval.ExposureService().get_portfolio_exposure(None, "PARIS", "FAIBLE")
+        assert [b.count for b in only.regions] == [2] and [b.key for b in only.risk_levels] == ["FAIBLE"]
+    
+    def test_region_and_risk_caps(self):
+        assert self._approve(200000, "Lyon").approved
+        capped = self._approve(100000, "Lyon")
+        assert not capped.approved and "région" in capped.justification
+        # Taux du refus (ÉLEVÉ), pas celui du palier approuvé avant le plafond
+        assert capped.interest_rate == service_approval._calculate_interest_rate(
+            850, "ÉLEVÉ", 10.0, 25.0, service_approval._RULES)
+        # Le refus n'ajoute rien à l'encours
+        assert service_approval.EXPOSURE_BOOK.snapshot("region", "lyon")["lyon"][:2] == (1, 200000)
+        
+        # ÉLEVÉ: LTV > 90 (palier par défaut)
+        assert self._approve(380000, "Nice", value=400000).risk_level == "ÉLEVÉ"
+        risky = self._approve(50000, "Nice", value=54000)
+        assert not risky.approved and "niveau de risque" in risky.justification
+    
+    def test_retries_booked_once(self):
+        """Même demande décidée plusieurs fois: encours compté une fois, libéré par un refus"""
+        assert self._approve(200000, "Lyon", correlation_id="REQ-A").approved
+        assert self._approve(200000, "Lyon", correlation_id="REQ-A").approved
+        # Remplacement: le plafond lyonnais (250k) tient compte de l'ancienne réservation
+        assert self._approve(240000, "Lyon", correlation_id="REQ-A").approved
+        assert service_approval.EXPOSURE_BOOK.snapshot("region", "lyon")["lyon"][:2] == (1, 240000)
+        
+        assert not self._approve(240000, "Lyon", score=500, correlation_id="REQ-A").approved
+        assert service_approval.EXPOSURE_BOOK.snapshot("region") == {}
+        
+        # Sans correlation_id: simple cotation, rien n'est réservé
+        assert ApprovalService().approve_loan(None, 850, "solvent", 1_000_000, 200000, True, 6000, 1500,
+                                              False, None, None, "Lyon").approved
+        assert service_approval.EXPOSURE_BOOK.snapshot("region") == {}
+    
+    def test_quotes_checked_but_never_booked(self):
+        """Cotation: plafonds appliqués; réserver exige un correlation_id"""
+        book = service_approval.EXPOSURE_BOOK
+        assert self._approve(200000, "Lyon").approved
+        quote = ApprovalService().approve_loan(None, 850, "solvent", 1_000_000, 100000, True, 6000, 1500,
+                                               False, None, None, "Lyon")
+        assert not quote.approved and "région" in quote.justification
+        assert book.check("lyon", "FAIBLE", 50000, 250_000) is None
+        assert book.snapshot("region", "lyon")["lyon"][:2] == (1, 200000)
+        
+        with pytest.raises(ValueError):
+            book.book(None, "lyon", "FAIBLE", 50000, 5.0)
+        with pytest.raises(ValueError):
+            book.book("", "lyon", "FAIBLE", 50000, 5.0)
+    
+    def test_seeded_from_decisions_log(self, tmp_path, monkeypatch):
+        """Au démarrage, l'encours est reconstruit depuis les dernières décisions journalisées"""
+        log_path = tmp_path / "decisions.log"
+        monkeypatch.setattr(service_approval, "DECISIONS_LOG", service_approval.DecisionLog(str(log_path)))
+        self._approve(200000, "Paris", correlation_id="REQ-1")
+        self._approve(100000, "Lyon", correlation_id="REQ-2")
+        self._approve(100000, "Lyon", correlation_id="REQ-2")
+        self._approve(300000, "Paris", score=500, correlation_id="REQ-3")
+        service_approval.DECISIONS_LOG.close()
+        
+        book = service_approval.ExposureBook()
+        book.seed(service_approval.latest_decisions(str(log_path)))
+        assert book.snapshot("region") == service_approval.EXPOSURE_BOOK.snapshot("region")
+        assert {key: value[:2] for key, value in book.snapshot("region").items()} == {
+            "paris": (1, 200000), "lyon": (1, 100000)}
+    
+    def test_concurrent_updates(self):
+        """Approbations concurrentes (verrous par bandes): aucun incrément perdu"""
+        import threading
+        book = service_approval.ExposureBook(stripes=4)
+        
+        def worker(i):
+            for j in range(2000):
+                book.book(f"REQ-{i}-{j}", f"région-{(i + j) % 7}", ("FAIBLE", "MOYEN")[j % 2], 1.0, 50.0)
+                # Nouvelle tentative de la même demande: sans effet sur l'encours
+                book.book(f"REQ-{i}-{j}", f"région-{(i + j) % 7}", ("FAIBLE", "MOYEN")[j % 2], 1.0, 50.0)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sum(c for c, _, _ in book.snapshot("region").values()) == 16000
+        assert sum(e for _, e, _ in book.snapshot("risk_level").values()) == 16000.0
+    
+    def test_invalid_caps(self):
+        spec = json.loads(json.dumps(service_approval.DEFAULT_RULES))
+        spec["approval"]["concentration"] = {"max_region_exposure": "beaucoup"}
+        with pytest.raises(ValueError):
+            service_approval.DecisionRules(spec)
+
+
+class TestApprovalBatch:
+    """Tests des décisions par lot (colonnes, masques numpy)"""
+    
+    def _rows(self, count=3000, seed=11):
+        rnd = random.Random(seed)
+        rows = []
+        for _ in range(count):
+            value = rnd.choice([0.0, float(rnd.randint(100000, 900000)), rnd.uniform(100000, 900000)])
+            rows.append((
+                rnd.choice([rnd.randint(550, 1000), rnd.randint(-100, 1300), 600, 800]),
+                rnd.choice(["solvent", "solvent", "not_solvent", None]),
+                value,
+                rnd.choice([float(rnd.randint(50, 100)) * 4000, rnd.uniform(50000, 500000)]),
+                rnd.random() < 0.95,
+                rnd.choice([0.0, rnd.uniform(2000, 9000)]),
+                rnd.uniform(500, 4000),
+                rnd.choice([0.0, value * 0.9, value * 1.1]),
+                rnd.choice([0, 10, 20, 25]),
+            ))
+        return rows
+    
+    def test_matches_scalar_path(self):
+        """Mêmes issues, taux, mensualités et explications qu'approve_loan, ligne par ligne"""
+        rows = self._rows()
+        columns = [list(c) for c in zip(*rows)]
+        columns[1] = [s or "not_solvent" for s in columns[1]]
+        result = service_approval.ApprovalService().approve_loans_batch(None, service_approval.LoanBatch(
+            credit_scores=columns[0], solvency_statuses=columns[1], property_values=columns[2],
+            loan_amounts=columns[3], property_compliant=columns[4], monthly_incomes=columns[5],
+            monthly_expenses=columns[6], property_values_low=columns[7], loan_durations=columns[8]), True)
+        
+        for i, row in enumerate(rows):
+            expected = ApprovalService().approve_loan(None, *row[:7], None, *row[7:])
+            outcome = result.outcomes[result.outcome_codes[i]]
+            assert (result.approved[i], outcome.risk_level, outcome.justification) == \
+                (expected.approved, expected.risk_level, expected.justification)
+            assert result.interest_rates[i] == expected.interest_rate
+            assert (result.monthly_payments[i], result.post_loan_dti[i]) == \
+                (expected.monthly_payment, expected.post_loan_dti)
+            assert result.explanations[i] == expected.simple_explanation
+    
+    def test_without_durations_or_explanations(self):
+        result = service_approval.approve_loans_batch([800, 500], ["solvent", "solvent"], [400000, 400000],
+                                                      [300000, 300000], [True, True], [6000, 6000], [2000, 2000])
+        assert result["approved"].tolist() == [True, False]
+        assert "monthly_payments" not in result
+        batch = service_approval.ApprovalService().approve_loans_batch(None, service_approval.LoanBatch(
+            credit_scores=[800], solvency_statuses=["solvent"], property_values=[400000], loan_amounts=[300000],
+            property_compliant=[True], monthly_incomes=[6000], monthly_expenses=[2000]))
+        assert batch.explanations is None and batch.monthly_payments is None
+    
+    def test_column_length_mismatch(self):
+        with pytest.raises(Fault) as exc:
+            service_approval.ApprovalService().approve_loans_batch(None, service_approval.LoanBatch(
+                credit_scores=[800, 700], solvency_statuses=["solvent"], property_values=[1], loan_amounts=[1],
+                property_compliant=[True], monthly_incomes=[1], monthly_expenses=[1]))
+        assert exc.value.faultcode == "Batch.ValidationError"
+
+
+class TestWhatIfGrid:
+    """Tests de la grille de sensibilité (chaîne complète vectorisée)"""
+    
+    PROFILE = dict(debt=2000, late_payments=1, has_bankruptcy=False, monthly_income=5500,
+                   monthly_expenses=2500, loan_amount=300000, property_value=420000,
+                   property_compliant=True)
+    
+    def setup_method(self):
+        self.service = ApprovalService()
+    
+    def test_grid_matches_unit_chain(self):
+        """Chaque point = compute_credit_score -> decide_solvency -> approve_loan"""
+        axes = [WhatIfAxis(name="late_payments", start=0, stop=7, steps=8),
+                WhatIfAxis(name="monthly_expenses", start=1500, stop=6000, steps=10),
+                WhatIfAxis(name="loan_amount", start=250000, stop=420000, steps=6)]
+        grid = self.service.what_if_grid(None, WhatIfProfile(**self.PROFILE), axes)
+        assert grid.shape == [8, 10, 6] and len(grid.scores) == 480
+        
+        point = 0
+        for late in range(8):
+            for expenses in [1500 + 500 * i for i in range(10)]:
+                for loan in [250000 + 34000 * i for i in range(6)]:
+                    score = CreditScoringService().compute_credit_score(None, "x", 2000, late, False)
+                    solvency = SolvencyDecisionService().decide_solvency(None, 5500, expenses, score.score)
+                    decision = self.service.approve_loan(None, score.score, solvency.status, 420000,
+                                                         loan, True, 5500, expenses)
+                    outcome = grid.outcomes[grid.outcome_codes[point]]
+                    assert grid.scores[point] == score.score
+                    assert grid.is_solvent[point] == solvency.is_solvent
+                    assert (outcome.approved, outcome.risk_level, outcome.justification) == (
+                        decision.approved, decision.risk_level, decision.justification)
+                    assert grid.interest_rates[point] == decision.interest_rate
+                    point += 1
+    
+    def test_grid_invalid_axis(self):
+        """Axe inconnu ou en double -> WhatIf.ValidationError"""
+        for axes in ([WhatIfAxis(name="age", start=0, stop=1, steps=2)],
+                     [WhatIfAxis(name="debt", start=0, stop=1, steps=2)] * 2, []):
+            with pytest.raises(Fault) as exc_info:
+                self.service.what_if_grid(None, WhatIfProfile(**self.PROFILE), axes)
+            assert exc_info.value.faultcode == "WhatIf.ValidationError"
+
+
+class TestDecisionRules:
+    """Tests du moteur de règles (Business + Approval) et du rechargement à chaud"""
+    
+    RULES = {
+        "version": "test",
+        "grades": [{"grade": "OK", "min_score": 500}, {"grade": "KO", "min_score": 0}],
+        "solvency": {"min_score": 500, "min_monthly_savings": 1000},
+        "approval": {
+            "min_score": 500, "max_ltv": 90, "max_dti": 40,
+            "tiers": [{"min_score": 500, "max_ltv": 70, "max_dti": 30,
+                       "risk_level": "FAIBLE", "justification": "Palier test"}],
+            "fallback": {"risk_level": "ÉLEVÉ", "justification": "Hors palier"}
+        }
+    }
+    
+    def teardown_method(self):
+        service_business.reload_rules("")
+        service_approval.reload_rules("")
+    
+    def _write_rules(self, tmp_path, rules):
+        path = tmp_path / "decision_rules.json"
+        path.write_text(json.dumps(rules), encoding="utf-8")
+        return str(path)
+    
+    def test_default_tier_boundaries(self):
+        """Bornes incluses des paliers LTV/DTI (règles par défaut)"""
+        assert service_approval._make_decision(800, "solvent", 80, 35, True)[1] == "FAIBLE"
+        assert service_approval._make_decision(800, "solvent", 80.01, 35, True)[1] == "MOYEN"
+        assert service_approval._make_decision(699, "solvent", 70, 30, True)[1] == "MOYEN_ÉLEVÉ"
+        assert service_approval._make_decision(1200, "solvent", 95, 50, True)[1] == "ÉLEVÉ"
+        assert service_approval._make_decision(800, "solvent", 95.5, 30, True)[2] == "Ratio LTV trop élevé (> 95%)"
+    
+    def test_hot_reload_changes_thresholds(self, tmp_path, monkeypatch):
+        """reload_rules applique le fichier sans redémarrage (sections absentes -> défaut)"""
+        path = self._write_rules(tmp_path, self.RULES)
+        monkeypatch.setattr(service_business, "RULES_FILE", path)
+        monkeypatch.setattr(service_approval, "RULES_FILE", path)
+        
+        status = service_business.RulesAdminService().reload_rules(None)
+        assert status.version == "test" and status.source == path
+        assert CreditScoringService().compute_credit_score(None, "client-001", 5000, 0, False).grade == "OK"
+        assert SolvencyDecisionService().decide_solvency(None, 3000, 2500, 550).is_solvent is False
+        assert SolvencyDecisionService().decide_solvency(None, 3600, 2500, 550).is_solvent is True
+        
+        service_approval.RulesAdminService().reload_rules(None)
+        result = ApprovalService().approve_loan(None, 550, "solvent", 400000, 260000, True, 5000, 1400)
+        assert result.approved and result.risk_level == "FAIBLE"
+        assert "(> 90%)" in service_approval._make_decision(550, "solvent", 91, 20, True)[2]
+        # Tarification non surchargée: base 3.0 + 0 + (800-550)/100*0.3
+        assert float(result.interest_rate) == pytest.approx(3.75)
+    
+    def test_hot_reload_scoring_formula(self, tmp_path, monkeypatch):
+        """La section "scoring" change le score unitaire, le lot et what_if_grid"""
+        rules = dict(self.RULES, scoring={"base": 900, "debt_weight": 0.2,
+                                          "late_payment_penalty": 100, "bankruptcy_penalty": 300})
+        path = self._write_rules(tmp_path, rules)
+        default_version = service_business._RULES.scoring_version
+        service_business.reload_rules(path)
+        service_approval.reload_rules(path)
+        
+        result = CreditScoringService().compute_credit_score(None, "client-001", 1000, 1, True)
+        assert result.score == 900 - 200 - 100 - 300
+        assert result.scoring_version != default_version
+        batch = service_business.compute_credit_scores_batch([1000], [1], [True])
+        assert batch["scores"].tolist() == [result.score]
+        grid = service_approval.what_if_grid(
+            {"debt": 1000.0, "late_payments": 1, "monthly_income": 5000.0, "monthly_expenses": 1000.0,
+             "loan_amount": 100000.0, "property_value": 200000.0},
+            [("debt", np.array([1000.0, 5000.0]))], True, True
+        )
+        assert grid["scores"].tolist() == [300, 0]
+    
+    def test_invalid_rules_keep_current_version(self, tmp_path, monkeypatch):
+        """Fichier invalide -> Rules.ValidationError, règles actives inchangées"""
+        broken = dict(self.RULES, grades=[{"grade": "A", "min_score": 700}])
+        monkeypatch.setattr(service_business, "RULES_FILE", self._write_rules(tmp_path, broken))
+        
+        with pytest.raises(Fault) as exc_info:
+            service_business.RulesAdminService().reload_rules(None)
+        assert exc_info.value.faultcode == "Rules.ValidationError"
+        assert service_business.RulesAdminService().get_rules_status(None).version == "défaut"
+        assert CreditScoringService().compute_credit_score(None, "client-001", 2500, 0, False).grade == "B"
+
+
 # ============================================================
 # INTEGRATION CROSS-SERVICE TESTS
 # ============================================================
 
+class TestPricingGrid:
+    """Tests de la grille de tarification précalculée et de la grille publiée"""
+    
+    @staticmethod
+    def _formula(credit_score, risk_level, ltv, dti, rules):
+        # Référence: formule calculée à chaque appel (avant la grille)
+        score_adj = (rules.score_pivot - credit_score) / 100 * rules.score_per_100
+        ltv_adj = max(0, (ltv - rules.ltv_pivot) / 100 * rules.ltv_per_100)
+        dti_adj = max(0, (dti - rules.dti_pivot) / 100 * rules.dti_per_100)
+        final_rate = rules.base_rate + rules.risk_premiums.get(risk_level, 0.0) + score_adj + ltv_adj + dti_adj
+        return max(rules.min_rate, min(rules.max_rate, final_rate))
+    
+    def test_exact_parity_with_formula(self):
+        """Taux identiques au bit près, y compris scores hors bornes et niveau inconnu"""
+        rnd = random.Random(7)
+        levels = [*service_approval._RULES.risk_premiums, "INCONNU"]
+        for rules in (service_approval._RULES, service_approval.DecisionRules(
+                dict(service_approval.DEFAULT_RULES, pricing=dict(service_approval.DEFAULT_RULES["pricing"],
+                                                                  base_rate=3, min_rate=0, max_rate=99)))):
+            for _ in range(20000):
+                args = (rnd.choice([rnd.randint(0, 1000), rnd.randint(-50, 1200)]), rnd.choice(levels),
+                        rnd.uniform(0, 120), rnd.uniform(0, 120))
+                assert service_approval._calculate_interest_rate(*args, rules) == self._formula(*args, rules)
+    
+    def test_batch_rates_match_scalar(self):
+        """_decide_batch lit la même grille (what_if_grid, stress test)"""
+        rnd = np.random.default_rng(8)
+        rules = service_approval._RULES
+        scores = rnd.integers(0, 1001, 5000)
+        ltv, dti = rnd.uniform(0, 110, 5000), rnd.uniform(0, 60, 5000)
+        codes, rates = service_approval._decide_batch(scores, np.ones(5000, dtype=bool), ltv, dti,
+                                                      np.ones(5000, dtype=bool), rules)
+        for i in range(0, 5000, 7):
+            risk_level = rules.outcomes[codes[i]][1]
+            assert rates[i] == self._formula(int(scores[i]), risk_level, ltv[i], dti[i], rules)
+    
+    def test_rate_sheet_brackets_decisions(self):
+        """Toute décision approuvée tombe dans une cellule de même niveau, taux dans [rate_min, rate_max]"""
+        sheet = service_approval.PricingService().get_rate_sheet(None)
+        assert len(sheet.cells) == 4 * 4 * 4
+        assert sheet.cells[0].score_min == 600 and sheet.cells[-1].score_max == 1000
+        
+        rnd = random.Random(9)
+        checked = 0
+        for _ in range(3000):
+            score, ltv, dti = rnd.randint(550, 1000), rnd.uniform(10, 100), rnd.uniform(5, 55)
+            decision = ApprovalService().approve_loan(None, score, "solvent", 100, ltv, True, 100, dti, False)
+            if not decision.approved:
+                continue
+            [cell] = [c for c in sheet.cells if c.score_min <= score <= c.score_max
+                      and c.ltv_min < ltv <= c.ltv_max and c.dti_min < dti <= c.dti_max]
+            assert cell.risk_level == decision.risk_level
+            assert cell.rate_min - 1e-4 <= decision.interest_rate <= cell.rate_max + 1e-4
+            checked += 1
+        assert checked > 1000
+
+
 class TestCrossServiceConsistency:
     """Tests de cohérence entre services"""
     